@@ -0,0 +1,55 @@
+"""
+Compare deux rapports JSON de benchmarks.run, étape par étape.
+
+Usage :
+    python -m benchmarks.compare bench_results/base.json bench_results/head.json --threshold 0.1
+"""
+import argparse
+import json
+import re
+import sys
+from collections import defaultdict
+
+
+def stage_timings(report):
+    """
+    Temps médian par étape (les répétitions query_x#n sont regroupées sous query_x)
+    """
+    timings = defaultdict(list)
+    for stage in report["stages"]:
+        if stage.get("status") == "success":
+            timings[re.sub(r"#\d+$", "", stage["stage"])].append(stage["seconds"])
+    return {stage: sorted(values)[len(values) // 2] for stage, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare deux rapports de benchmark")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Ralentissement relatif toléré")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    base_timings, head_timings = stage_timings(base), stage_timings(head)
+    # commit vaut null pour un rapport produit hors d'un dépôt git
+    print(f"base {(base.get('commit') or '')[:10]} ({base['scale']})  head {(head.get('commit') or '')[:10]} ({head['scale']})")
+
+    regressions = []
+    for stage in sorted(base_timings.keys() & head_timings.keys()):
+        before, after = base_timings[stage], head_timings[stage]
+        change = (after - before) / before if before else 0
+        flag = ""
+        if change > args.threshold:
+            regressions.append(stage)
+            flag = "  <-- régression"
+        print(f"{stage:<40} {before:>10.3f}s {after:>10.3f}s {change:>+8.1%}{flag}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
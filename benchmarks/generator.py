@@ -0,0 +1,218 @@
+"""
+Générateur de données synthétiques reproduisant les extraits Salesforce bruts.
+
+Les colonnes suivent celles lues par bronze_opportunites.sql et bronze_propositions.sql.
+Les cardinalités et les distributions sont volontairement asymétriques (origines,
+banques partenaires en loi de Zipf, nombre de propositions par opportunité) afin que
+les jointures et agrégations se comportent comme sur les données réelles.
+La génération est vectorisée par blocs et reproductible pour une graine donnée.
+"""
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+ORIGINES = np.array(["Site web", "Comparateur", "Partenaire", "Agence", "Téléphone", "Parrainage"])
+ORIGINES_WEIGHTS = np.array([0.45, 0.25, 0.12, 0.08, 0.06, 0.04])
+
+ETAPES = np.array([
+    "1-Découverte", "2-Qualification", "3-Proposition", "4-Négociation",
+    "5-Contractualisation", "6-Perdue", "7-Gagnée",
+])
+ETAPES_WEIGHTS = np.array([0.22, 0.18, 0.15, 0.08, 0.05, 0.24, 0.08])
+
+CATEGORIES_PROFESSIONNELLES = np.array([
+    "Salarié du privé", "Fonctionnaire", "Travailleur indépendant", "Profession libérale",
+    "Retraité", "Sans emploi", "Chef d'entreprise",
+])
+CATEGORIES_WEIGHTS = np.array([0.55, 0.18, 0.09, 0.07, 0.06, 0.02, 0.03])
+
+CONTRATS = np.array(["CDI", "CDD", "Fonctionnaire titulaire", "Intérim", "Autre"])
+CONTRATS_WEIGHTS = np.array([0.7, 0.1, 0.12, 0.03, 0.05])
+
+TYPES_BIEN = np.array(["Appartement", "Maison", "Terrain", "Local commercial"])
+TYPES_BIEN_WEIGHTS = np.array([0.55, 0.38, 0.05, 0.02])
+
+TYPES_PROJET = np.array(["Acquisition", "Acquisition+travaux", "Construction", "Rachat de crédit"])
+TYPES_PROJET_WEIGHTS = np.array([0.62, 0.18, 0.1, 0.1])
+
+USAGES_BIEN = np.array(["Résidence principale", "Investissement locatif", "Résidence secondaire"])
+USAGES_BIEN_WEIGHTS = np.array([0.72, 0.2, 0.08])
+
+SITUATIONS = np.array(["Locataire", "Propriétaire", "Hébergé"])
+SITUATIONS_WEIGHTS = np.array([0.6, 0.3, 0.1])
+
+BANQUES = np.array([
+    "BNP Paribas", "Crédit Agricole", "Société Générale", "LCL", "Caisse d'Épargne",
+    "Banque Populaire", "Crédit Mutuel", "CIC", "La Banque Postale", "Boursorama",
+])
+
+ETAPES_SOURCE = np.array([
+    "Source: SICM - Dossier éligible", "Source: SICM - Non éligible",
+    "Source: BPI - Dossier éligible", "Source: BPI - Non éligible", "Saisie manuelle",
+])
+ETAPES_SOURCE_WEIGHTS = np.array([0.42, 0.12, 0.28, 0.08, 0.1])
+
+NOMBRE_PARTENAIRES = 80
+DEBUT_PERIODE = np.datetime64("2022-01-01T00:00:00", "s")
+DUREE_PERIODE_SECONDES = 3 * 365 * 24 * 3600
+CHUNK_ROWS = 500_000
+
+
+def _ids(prefix, start, count):
+    """Identifiants de 18 caractères au format Salesforce (préfixe + numéro)"""
+    numbers = np.arange(start, start + count).astype(str)
+    return np.char.add(prefix, np.char.zfill(numbers, 18 - len(prefix)))
+
+
+def _choice(rng, values, weights, size):
+    return values[rng.choice(len(values), size=size, p=weights / weights.sum())]
+
+
+def _with_nulls(rng, values, rate):
+    """Remplace une fraction rate des valeurs par des nulls"""
+    mask = rng.random(len(values)) < rate
+    return pa.array(values, mask=mask)
+
+
+def _created_dates(rng, size):
+    # Croissance de l'activité : plus d'opportunités sur les mois récents
+    offsets = (np.sqrt(rng.random(size)) * DUREE_PERIODE_SECONDES).astype("int64")
+    return DEBUT_PERIODE + offsets.astype("timedelta64[s]")
+
+
+def generate_opportunites(rng, start, count):
+    """
+    Génère count opportunités à partir de l'index start, au schéma de source.raw_opportunites
+    """
+    age = rng.normal(38, 10, count).clip(18, 80).round()
+    revenus = rng.lognormal(8.3, 0.5, count).round(2)
+    charges = (revenus * rng.uniform(0.05, 0.4, count)).round(2)
+    montant_principal = rng.lognormal(12.2, 0.5, count).round(-2)
+    montant_ptz = np.where(rng.random(count) < 0.15, rng.uniform(10_000, 80_000, count).round(-2), 0)
+    montant_pel = np.where(rng.random(count) < 0.05, rng.uniform(5_000, 90_000, count).round(-2), 0)
+    montant_cel = np.where(rng.random(count) < 0.02, rng.uniform(5_000, 15_000, count).round(-2), 0)
+    montant_relais = np.where(rng.random(count) < 0.04, rng.uniform(50_000, 300_000, count).round(-2), 0)
+    apport = (montant_principal * rng.beta(2, 8, count)).round(-2)
+    duree = rng.choice([120, 180, 240, 300], size=count, p=[0.05, 0.2, 0.45, 0.3])
+    taux_endettement = (charges / revenus * 100 + rng.uniform(5, 25, count)).round(2)
+    nombre_banques = rng.poisson(2.5, count)
+    esperance = rng.gamma(2, 450, count).round(2)
+    points = rng.integers(0, 100, count)
+
+    return pa.table({
+        "Id": _ids("006", start, count),
+        "RecordTypeId": _choice(rng, np.array(["0121t000000AbCdAAK", "0121t000000AbCeAAK"]), np.array([0.9, 0.1]), count),
+        "Id_ApporteurWeb__c": _with_nulls(rng, np.char.add("AW", rng.integers(0, 5_000, count).astype(str)), 0.6),
+        "Age_emprunteur__c": _with_nulls(rng, age.astype("int64"), 0.03),
+        "BanquePrincipaleEmp__c": _choice(rng, BANQUES, np.linspace(2, 1, len(BANQUES)), count),
+        "TechMail_CategorieProfessionnelleEmpru__c": _choice(rng, CATEGORIES_PROFESSIONNELLES, CATEGORIES_WEIGHTS, count),
+        "TechMail_ContratDeTravailEmprunteur__c": _choice(rng, CONTRATS, CONTRATS_WEIGHTS, count),
+        "TechMail_CategorieProfessionnelleCoEmpru__c": _with_nulls(rng, _choice(rng, CATEGORIES_PROFESSIONNELLES, CATEGORIES_WEIGHTS, count), 0.55),
+        "TechMail_ContratDeTravailCoEmprunteur__c": _with_nulls(rng, _choice(rng, CONTRATS, CONTRATS_WEIGHTS, count), 0.55),
+        "SituActu__c": _choice(rng, SITUATIONS, SITUATIONS_WEIGHTS, count),
+        "TypBien__c": _choice(rng, TYPES_BIEN, TYPES_BIEN_WEIGHTS, count),
+        "TypProj__c": _choice(rng, TYPES_PROJET, TYPES_PROJET_WEIGHTS, count),
+        "UsagBien__c": _choice(rng, USAGES_BIEN, USAGES_BIEN_WEIGHTS, count),
+        "Deja_souscrit_credit_immo__c": rng.random(count) < 0.35,
+        "Connaissances_en_immobilier__c": rng.integers(0, 5, count).astype("float64"),
+        "MontPretPricip__c": montant_principal,
+        "MontPretTxZero__c": montant_ptz,
+        "MontPretPel__c": montant_pel,
+        "MontPretCEL__c": montant_cel,
+        "MontPretRel__c": montant_relais,
+        "MontAppPerso__c": apport,
+        "MontEstimTravaux__c": np.where(rng.random(count) < 0.18, rng.uniform(5_000, 120_000, count).round(-2), 0),
+        "DurSouhaitePret__c": duree.astype("float64"),
+        "MensuSouhaitePret__c": (montant_principal / duree * 1.25).round(2),
+        "Taux_d_apport__c": (apport / montant_principal * 100).round(2),
+        "TxEndetApres__c": taux_endettement,
+        "TotRev__c": _with_nulls(rng, revenus, 0.02),
+        "TotCharges__c": charges,
+        "Residuel__c": (revenus - charges).round(2),
+        "CreatedDate": _created_dates(rng, count),
+        "Origine__c": _choice(rng, ORIGINES, ORIGINES_WEIGHTS, count),
+        "StageName": _choice(rng, ETAPES, ETAPES_WEIGHTS, count),
+        "Avancement__c": rng.integers(0, 101, count).astype("float64"),
+        "Nombre_de_banques_consultees__c": nombre_banques.astype("float64"),
+        "A_une_proposition_de_sa_banque__c": rng.random(count) < 0.3,
+        "TotalProposition__c": np.zeros(count),
+        "PropFinal__c": _with_nulls(rng, _choice(rng, BANQUES, np.ones(len(BANQUES)), count), 0.8),
+        "Points_profil__c": points.astype("float64"),
+        "Points_profil_initiaux__c": (points * rng.uniform(0.8, 1.0, count)).round(),
+        "Points_profil_franchise__c": (points * rng.uniform(0.5, 1.0, count)).round(),
+        "Points_profil_initiaux_franchise__c": (points * rng.uniform(0.4, 1.0, count)).round(),
+        "Esperance_de_gain_plateforme__c": esperance,
+        "Esperance_de_gain_plateforme_initiale__c": (esperance * rng.uniform(0.8, 1.2, count)).round(2),
+        "Esperance_de_gain_franchise__c": (esperance * 0.4).round(2),
+        "Esperance_de_gain_franchise_initiale__c": (esperance * 0.4 * rng.uniform(0.8, 1.2, count)).round(2),
+        "HonorairMTX__c": np.where(rng.random(count) < 0.3, rng.choice([990.0, 1490.0, 1990.0], count), 0),
+    })
+
+
+def generate_propositions(rng, opportunites, start):
+    """
+    Génère les propositions bancaires des opportunités fournies, à partir de l'index start.
+    Le nombre de propositions par opportunité suit une loi de Poisson : beaucoup
+    d'opportunités n'en ont aucune, quelques-unes en ont une dizaine.
+    """
+    per_opportunity = rng.poisson(1.6, opportunites.num_rows)
+    count = int(per_opportunity.sum())
+
+    opportunity_ids = np.repeat(opportunites.column("Id").to_numpy(zero_copy_only=False), per_opportunity)
+    opportunity_dates = np.repeat(
+        opportunites.column("CreatedDate").to_numpy().astype("datetime64[s]"), per_opportunity
+    )
+    # Banques partenaires en loi de Zipf : quelques grands réseaux concentrent les propositions
+    partenaires = (rng.zipf(1.6, count) - 1) % NOMBRE_PARTENAIRES
+    taux = (rng.normal(3.9, 0.45, count) + partenaires * 0.004).clip(1.5, 7).round(2)
+    delais = (rng.exponential(6, count) * 24 * 3600).astype("int64").astype("timedelta64[s]")
+
+    propositions = pa.table({
+        "Id": _ids("a0P", start, count),
+        "Opportunity__c": opportunity_ids,
+        "Partenaire__c": np.char.add("001PART", partenaires.astype(str)),
+        "TXHA__c": taux,
+        "DureePret_Mois__c": rng.choice([120, 180, 240, 300], size=count, p=[0.05, 0.2, 0.45, 0.3]),
+        "TauxAss__c": rng.uniform(0.08, 0.45, count).round(2),
+        "Etape_Source__c": _choice(rng, ETAPES_SOURCE, ETAPES_SOURCE_WEIGHTS, count),
+        "CreatedDate": opportunity_dates + delais,
+    })
+    return propositions, per_opportunity
+
+
+def write_dataset(directory, rows, seed=42, chunk_rows=CHUNK_ROWS):
+    """
+    Écrit opportunites.csv et propositions.csv dans directory pour rows opportunités.
+    Chaque bloc utilise sa propre graine dérivée de seed : le résultat ne dépend pas de chunk_rows
+    au-delà du découpage. Retourne le nombre de lignes écrites par fichier.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {
+        "opportunites": os.path.join(directory, "opportunites.csv"),
+        "propositions": os.path.join(directory, "propositions.csv"),
+    }
+    written = {"opportunites": 0, "propositions": 0}
+    writers = {}
+    try:
+        for index, start in enumerate(range(0, rows, chunk_rows)):
+            rng = np.random.default_rng([seed, index])
+            opportunites = generate_opportunites(rng, start, min(chunk_rows, rows - start))
+            propositions, per_opportunity = generate_propositions(rng, opportunites, written["propositions"])
+            opportunites = opportunites.set_column(
+                opportunites.schema.get_field_index("TotalProposition__c"),
+                "TotalProposition__c",
+                pa.array(per_opportunity.astype("float64")),
+            )
+
+            for name, table in (("opportunites", opportunites), ("propositions", propositions)):
+                if name not in writers:
+                    writers[name] = pacsv.CSVWriter(paths[name], table.schema)
+                writers[name].write_table(table)
+                written[name] += table.num_rows
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    return written
\ No newline at end of file
@@ -0,0 +1,268 @@
+"""
+Benchmark de bout en bout du pipeline sur un fichier DuckDB local.
+
+Étapes chronométrées :
+  - download_parse : lecture HTTP + parsing Arrow des CSV générés (sans chargement)
+  - load           : ingestion en flux dans source.raw_* (téléchargement inclus)
+  - dbt_<couche>   : dbt build des modèles bronze, silver puis gold
+  - query_<nom>    : requêtes du dashboard sur main_gold
+
+Usage :
+    python -m benchmarks.run --scale 1M --output bench_results/1M.json
+"""
+import argparse
+import functools
+import http.server
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DBT_PROJECT_DIR = ROOT_DIR / "immobilier_courtage"
+sys.path.insert(0, str(ROOT_DIR / "data-pipeline" / "src"))
+
+from benchmarks.generator import write_dataset  # noqa: E402
+from config.memory import MemorySampler  # noqa: E402
+
+SCALES = {
+    "100k": 100_000,
+    "1M": 1_000_000,
+    "10M": 10_000_000,
+    "100M": 100_000_000,
+}
+
+DBT_LAYERS = ["bronze", "silver", "gold"]
+
+
+def dashboard_queries():
+    """
+    Requêtes émises par streamlit/app.py, construites par streamlit/queries.py : (sql, paramètres) par nom
+    """
+    # Le dossier streamlit/ du dépôt (un paquet) masquerait le paquet streamlit installé
+    sys.path[:] = [path for path in sys.path if Path(path or ".").resolve() != ROOT_DIR]
+    sys.path.insert(0, str(ROOT_DIR / "streamlit"))
+    import queries
+
+    return {
+        "kpis_banques": queries.kpis_banques_query().build(),
+        "apercu_banques": queries.metrics_banques_query(limit=10).build(),
+        "durees_pret": queries.durees_pret_query().build(),
+        "kpis_opportunites": queries.kpis_opportunites_query(365).build(),
+        "performance_source": queries.performance_source_query(365).build(),
+        "conversion_mensuelle": queries.conversion_mensuelle_query(365).build(),
+        "taux_par_segment_age": queries.taux_par_dimension_query(("segment_age",)).build(),
+        "taux_par_projet_usage": queries.taux_par_dimension_query(
+            ("type_projet", "usage_bien"), segment_revenus="Revenus moyens",
+        ).build(),
+    }
+
+
+def children_cpu_seconds():
+    """Temps CPU cumulé des sous-processus terminés"""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Timer:
+    """
+    Chronomètre une étape et l'ajoute aux résultats. Le CPU inclut celui des sous-processus
+    terminés pendant l'étape ; peak_rss_mb est le pic de mémoire résidente du processus courant
+    échantillonné pendant l'étape (MemorySampler), sauf si l'étape le fixe elle-même
+    (pic d'un sous-processus). ru_maxrss, pic depuis le démarrage, répéterait celui de l'étape
+    la plus gourmande sur toutes les suivantes.
+    """
+
+    def __init__(self, results, stage):
+        self.results = results
+        self.stage = stage
+        self.rows = None
+        self.peak_rss_mb = None
+        self.memory = MemorySampler()
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.cpu_start = time.process_time() + children_cpu_seconds()
+        self.memory.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.memory.__exit__(exc_type, exc, tb)
+        seconds = time.perf_counter() - self.start
+        peak_rss_mb = self.peak_rss_mb if self.peak_rss_mb is not None else self.memory.peak_mb
+        self.results.append({
+            "stage": self.stage,
+            "status": "failed" if exc_type else "success",
+            "seconds": round(seconds, 4),
+            "cpu_seconds": round(time.process_time() + children_cpu_seconds() - self.cpu_start, 4),
+            "rows": self.rows,
+            "rows_per_second": round(self.rows / seconds) if self.rows and seconds > 0 else None,
+            "peak_rss_mb": round(peak_rss_mb, 1) if peak_rss_mb is not None else None,
+            "error": str(exc) if exc else None,
+        })
+        print(f"{self.stage:<40} {seconds:>10.3f}s  rows={self.rows}", flush=True)
+        return False
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_directory(directory):
+    """
+    Sert directory en HTTP sur un port libre, dans un thread, et retourne l'URL de base
+    """
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_ingestion(results, base_url, database_path):
+    from config.database import connect_to_motherduck, create_schema_if_not_exists, stream_data_to_motherduck
+    from config.schema import load_columns, load_schema, select_columns
+    from etl_process import fetch_from_github, open_csv_stream, read_stream_header
+
+    # Parsing typé comme l'ETL : types, colonnes catégorielles et colonnes ingérées déclarés dans sources.yml
+    schema, declared_columns = load_schema(), load_columns()
+    for name, table in (("opportunites", "raw_opportunites"), ("propositions", "raw_propositions")):
+        url = f"{base_url}/{name}.csv"
+        dtypes = schema.get(table, {})
+        columns, required_columns = declared_columns.get(table, ((), ()))
+
+        with Timer(results, f"download_parse_{name}") as timer:
+            response = fetch_from_github(url, stream=True)
+            header, reader = read_stream_header(response.raw)
+            usecols = select_columns(header, columns, required_columns, table)
+            timer.rows = sum(batch.num_rows for batch in open_csv_stream(reader, dtypes=dtypes, columns=usecols))
+
+        conn = connect_to_motherduck(database_path)
+        try:
+            create_schema_if_not_exists(conn)
+            with Timer(results, f"load_{name}") as timer:
+                response = fetch_from_github(url, stream=True)
+                _, reader = read_stream_header(response.raw)
+                timer.rows = stream_data_to_motherduck(
+                    conn, open_csv_stream(reader, dtypes=dtypes, columns=usecols), table, datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                )
+        finally:
+            conn.close()
+
+
+def bench_dbt(results, database_path):
+    dbt = shutil.which("dbt")
+    if dbt is None:
+        print("dbt introuvable, étapes dbt ignorées", flush=True)
+        for layer in DBT_LAYERS:
+            results.append({"stage": f"dbt_{layer}", "status": "skipped"})
+        return
+
+    env = {**os.environ, "DUCKDB_PATH": str(database_path)}
+    base_args = ["--project-dir", str(DBT_PROJECT_DIR), "--profiles-dir", str(DBT_PROJECT_DIR), "--target", "local"]
+    if not (DBT_PROJECT_DIR / "dbt_packages").exists():
+        subprocess.run([dbt, "deps", *base_args], env=env, check=True, capture_output=True)
+
+    for layer in DBT_LAYERS:
+        args = [dbt, "build", "--select", f"tag:{layer}", *base_args]
+        try:
+            with Timer(results, f"dbt_{layer}") as timer:
+                # Pic RSS échantillonné sur le processus dbt lui-même, pendant son exécution
+                process = subprocess.Popen(args, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                with MemorySampler(pid=process.pid) as memory:
+                    output, _ = process.communicate()
+                timer.peak_rss_mb = memory.peak_mb
+                if process.returncode:
+                    raise subprocess.CalledProcessError(process.returncode, args, output)
+        except subprocess.CalledProcessError as e:
+            # Les couches suivantes dépendent de celle-ci : inutile de continuer
+            print(e.stdout.decode(errors="replace")[-2000:], file=sys.stderr)
+            return
+
+
+def bench_queries(results, database_path, repeat):
+    import duckdb
+
+    conn = duckdb.connect(str(database_path), read_only=True)
+    try:
+        for name, (sql, params) in dashboard_queries().items():
+            for iteration in range(repeat):
+                with Timer(results, f"query_{name}#{iteration}") as timer:
+                    timer.rows = len(conn.execute(sql, list(params)).fetchdf())
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline immobilier_courtage")
+    parser.add_argument("--scale", choices=SCALES, default="100k", help="Nombre d'opportunités générées")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", help="Répertoire des CSV et de la base (temporaire par défaut)")
+    parser.add_argument("--repeat", type=int, default=3, help="Exécutions de chaque requête du dashboard")
+    parser.add_argument("--skip-dbt", action="store_true")
+    parser.add_argument("--output", help="Fichier JSON de résultats (stdout par défaut)")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="immo_bench_"))
+    database_path = workdir / "benchmark.duckdb"
+    database_path.unlink(missing_ok=True)
+    results = []
+
+    with Timer(results, "generate") as timer:
+        written = write_dataset(str(workdir / "data"), SCALES[args.scale], args.seed)
+        timer.rows = sum(written.values())
+
+    server, base_url = serve_directory(str(workdir / "data"))
+    try:
+        bench_ingestion(results, base_url, str(database_path))
+    finally:
+        server.shutdown()
+
+    if args.skip_dbt:
+        results.extend({"stage": f"dbt_{layer}", "status": "skipped"} for layer in DBT_LAYERS)
+    else:
+        bench_dbt(results, database_path)
+
+    dbt_stages = [result for result in results if result["stage"].startswith("dbt_")]
+    if len(dbt_stages) == len(DBT_LAYERS) and all(result["status"] == "success" for result in dbt_stages):
+        bench_queries(results, database_path, args.repeat)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "scale": args.scale,
+        "seed": args.seed,
+        "rows": written,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "stages": results,
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
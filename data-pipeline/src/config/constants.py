@@ -11,6 +11,43 @@ GITHUB_PROPOSITIONS_URL = os.getenv(
 )
 MOTHERDUCK_TOKEN = os.getenv('MOTHERDUCK_TOKEN', '')
 DATABASE_NAME = os.getenv('DATABASE_NAME', 'immobilier_courtage')
+# Chemin DuckDB cible : MotherDuck par défaut, ou un fichier local pour les tests
+DATABASE_PATH = os.getenv('DATABASE_PATH', f"md:{DATABASE_NAME}")
+# Mode de chargement : 'batch' (DataFrame pandas) ou 'stream' (lots Arrow, mémoire bornée)
+LOAD_MODE = os.getenv('LOAD_MODE', 'batch')
+STREAM_BLOCK_SIZE = int(os.getenv('STREAM_BLOCK_SIZE', 8 * 1024 * 1024))
+# Chargement incrémental : fusion sur MERGE_KEY, watermark et colonne de suppression logique
+INCREMENTAL = os.getenv('INCREMENTAL', 'false').lower() == 'true'
+FULL_REFRESH = os.getenv('FULL_REFRESH', 'false').lower() == 'true'
+MERGE_KEY = os.getenv('MERGE_KEY', 'Id')
+WATERMARK_COLUMN = os.getenv('WATERMARK_COLUMN', 'CreatedDate')
+TOMBSTONE_COLUMN = os.getenv('TOMBSTONE_COLUMN', 'IsDeleted')
+# Exécution concurrente des sources déclarées dans config/sources.py
+SOURCES_FILE = os.getenv('SOURCES_FILE', '')
+# Schéma typé des extraits (data_type, meta.categorical) : sources.yml du projet dbt
+SOURCES_SCHEMA_FILE = os.getenv('SOURCES_SCHEMA_FILE', os.path.join(
+    os.path.dirname(__file__), '..', '..', '..', 'immobilier_courtage', 'models', 'sources.yml'
+))
+# Modèles bronze, seuls lecteurs des tables brutes (contrôle des colonnes utilisées)
+BRONZE_MODELS_DIR = os.getenv('BRONZE_MODELS_DIR', os.path.join(
+    os.path.dirname(__file__), '..', '..', '..', 'immobilier_courtage', 'models', 'bronze'
+))
+# Ingestion limitée aux colonnes déclarées dans sources.yml (false : toutes les colonnes de l'extrait)
+PRUNE_COLUMNS = os.getenv('PRUNE_COLUMNS', 'true').lower() == 'true'
+MAX_WORKERS = int(os.getenv('MAX_WORKERS', 4))
+SOURCE_RETRIES = int(os.getenv('SOURCE_RETRIES', 2))
+RETRY_BACKOFF_SECONDS = float(os.getenv('RETRY_BACKOFF_SECONDS', 5))
+STRICT_MODE = os.getenv('STRICT_MODE', 'false').lower() == 'true'
+# Cache des requêtes conditionnelles (ETag / Last-Modified / empreinte du contenu)
+FETCH_CACHE_ENABLED = os.getenv('FETCH_CACHE_ENABLED', 'true').lower() == 'true'
+FETCH_CACHE_DIR = os.getenv('FETCH_CACHE_DIR', os.path.expanduser('~/.cache/immobilier_courtage/fetch'))
+# Téléchargements en cours, repris par requêtes Range après une coupure
+PARTIAL_DOWNLOAD_DIR = os.getenv('PARTIAL_DOWNLOAD_DIR', os.path.join(FETCH_CACHE_DIR, 'partial'))
+# Publication des sources chargées même si une autre source a échoué (false : aucune n'est publiée)
+PUBLISH_PARTIAL = os.getenv('PUBLISH_PARTIAL', 'false').lower() == 'true'
+# Profilage DuckDB des modèles dbt (opt-in) : nombre d'opérateurs les plus coûteux conservés
+PROFILE_DBT_MODELS = os.getenv('PROFILE_DBT_MODELS', 'false').lower() == 'true'
+PROFILE_TOP_OPERATORS = int(os.getenv('PROFILE_TOP_OPERATORS', 5))
 LOAD_TIMESTAMP = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
 
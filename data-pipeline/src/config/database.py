@@ -1,18 +1,30 @@
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+
 import duckdb
+import pyarrow as pa
 from config.logger import logger
-from config.constants import DATABASE_NAME
+from config.memory import MemorySampler
+from config.constants import DATABASE_PATH, MERGE_KEY, WATERMARK_COLUMN, TOMBSTONE_COLUMN
+from config.incremental import (
+    apply_merge, create_state_table_if_not_exists, delete_tombstones, reset_watermark, save_watermark, stage_merge,
+    stage_replacement, staging_relation,
+)
 
 
-def connect_to_motherduck():
+def connect_to_motherduck(database_path=DATABASE_PATH):
     """
-    Établit une connexion à MotherDuck et attache la base de données
+    Établit une connexion à MotherDuck et attache la base de données.
+    Un chemin de fichier DuckDB local peut être fourni à la place de md:
     """
     try:
         logger.info("Connexion à MotherDuck")
 
-        conn = duckdb.connect(f"md:{DATABASE_NAME}", read_only=False)
+        conn = duckdb.connect(database_path, read_only=False)
 
-        logger.info(f"Base de données active: {DATABASE_NAME}")
+        logger.info(f"Base de données active: {database_path}")
 
         return conn
     except Exception as e:
@@ -22,38 +34,180 @@ def connect_to_motherduck():
 
 def create_schema_if_not_exists(conn):
     """
-    Crée le schéma source s'il n'existe pas déjà
+    Crée le schéma source et la table d'état du pipeline s'ils n'existent pas déjà
     """
     try:
         logger.info("Création du schéma source si nécessaire")
         conn.execute("CREATE SCHEMA IF NOT EXISTS source")
+        create_state_table_if_not_exists(conn)
     except Exception as e:
         logger.error(f"Erreur lors de la création du schéma: {e}")
         raise
 
 
-def load_data_to_motherduck(conn, df, table_name, load_timestamp):
+@dataclass
+class StagedTable:
+    """
+    Chargement d'une source écrit dans sa table de staging, en attente de publication.
+    mode 'replace' : la table de staging remplace source.{table_name} ;
+    mode 'merge' : elle contient les lignes nouvelles, modifiées ou supprimées à appliquer.
+    """
+    table_name: str
+    mode: str
+    rows: int
+    key: str = MERGE_KEY
+    watermark_column: str = WATERMARK_COLUMN
+
+    @property
+    def relation(self):
+        return staging_relation(self.table_name)
+
+
+def stage_dataframe(conn, df, table_name, load_timestamp, incremental=False,
+                    key=MERGE_KEY, watermark_column=WATERMARK_COLUMN):
+    """
+    Écrit un DataFrame dans la table de staging de source.{table_name}, via Parquet.
+    En mode incrémental, seules les lignes nouvelles ou modifiées sont écrites ; sinon tout
+    l'extrait, sans les lignes supprimées logiquement (colonne de suppression).
+    """
+    try:
+        if incremental:
+            logger.info(f"Chargement incrémental de source.{table_name}")
+            # Via Arrow, les colonnes category sont vues en VARCHAR et non en ENUM :
+            # une table source créée depuis le staging accepte ensuite de nouvelles valeurs
+            conn.register("_extract_df", pa.Table.from_pandas(df, preserve_index=False))
+            mode, record_count = stage_merge(
+                conn, "_extract_df", table_name, load_timestamp, key, watermark_column, TOMBSTONE_COLUMN
+            )
+            conn.unregister("_extract_df")
+            return StagedTable(table_name, mode, record_count, key, watermark_column)
+
+        logger.info(f"Écriture de source.{table_name} en staging")
+
+        # Fichier Parquet temporaire propre à ce chargement : deux chargements concurrents ne partagent jamais un chemin
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_parquet_path = os.path.join(temp_dir, f"{table_name}.parquet")
+            df.to_parquet(temp_parquet_path, index=False)
+
+            # Crée ou remplace la table de staging depuis le Parquet, avec les colonnes de suivi
+            record_count = stage_replacement(
+                conn, f"read_parquet('{temp_parquet_path}')", table_name, load_timestamp, TOMBSTONE_COLUMN
+            )
+
+        return StagedTable(table_name, "replace", record_count, key, watermark_column)
+    except Exception as e:
+        logger.error(f"Erreur lors de l'écriture de source.{table_name} en staging: {e}")
+        raise
+
+
+def publish_staged(conn, staged_tables):
+    """
+    Publie les tables de staging dans une seule transaction : les lecteurs voient toutes les sources
+    dans leur version précédente ou toutes dans la nouvelle, jamais un mélange. Une table remplacée
+    est échangée par renommage, une fusion est appliquée à la table publiée. Les watermarks sont
+    enregistrés dans la même transaction.
+    """
+    conn.begin()
+    try:
+        for staged in staged_tables:
+            target = f"source.{staged.table_name}"
+            if staged.mode == "replace":
+                conn.execute(f"DROP TABLE IF EXISTS {target}")
+                conn.execute(f"ALTER TABLE {staged.relation} RENAME TO {staged.table_name}")
+                # Un rechargement complet réinitialise le watermark de la table
+                reset_watermark(conn, staged.table_name)
+                save_watermark(conn, staged.table_name, target, staged.watermark_column, staged.rows)
+            else:
+                apply_merge(conn, staged.table_name, staged.key, TOMBSTONE_COLUMN)
+                save_watermark(conn, staged.table_name, staged.relation, staged.watermark_column, staged.rows)
+                conn.execute(f"DROP TABLE {staged.relation}")
+        conn.commit()
+        logger.info(f"Sources publiées: {', '.join(staged.table_name for staged in staged_tables)}")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Erreur lors de la publication des sources: {e}")
+        raise
+
+
+def discard_staged(conn, staged_tables):
+    """Supprime des tables de staging qui ne seront pas publiées"""
+    for staged in staged_tables:
+        conn.execute(f"DROP TABLE IF EXISTS {staged.relation}")
+
+
+def append_batches(conn, reader, create_clause, relation, extra_columns="", params=None):
+    """
+    Crée relation à partir du schéma du lecteur puis y ajoute chaque RecordBatch
+    """
+    params = params or []
+    record_count = 0
+
+    conn.register("_stream_batch", reader.schema.empty_table())
+    conn.execute(f"{create_clause} {relation} AS SELECT *{extra_columns} FROM _stream_batch", params)
+    for batch in reader:
+        conn.register("_stream_batch", batch)
+        conn.execute(f"INSERT INTO {relation} SELECT *{extra_columns} FROM _stream_batch", params)
+        record_count += batch.num_rows
+    conn.unregister("_stream_batch")
+
+    return record_count
+
+
+def stage_stream(conn, reader, table_name, load_timestamp, incremental=False,
+                 key=MERGE_KEY, watermark_column=WATERMARK_COLUMN):
     """
-    Loads DataFrame to MotherDuck after converting to Parquet
+    Écrit un RecordBatchReader Arrow dans la table de staging de source.{table_name}, lot par lot,
+    sans matérialiser l'extrait complet ni écrire de fichier temporaire.
+    En mode incrémental, seules les lignes nouvelles ou modifiées sont écrites ; sinon les lignes
+    supprimées logiquement (colonne de suppression) sont retirées de l'extrait.
     """
     try:
-        logger.info(f"Loading data into source.{table_name}")
-        
-        # Add tracking columns
-        df['_loaded_at'] = load_timestamp
-        df['_source_file'] = table_name
-        
-        # Write to temporary parquet file
-        temp_parquet_path = f"/tmp/{table_name}.parquet"
-        df.to_parquet(temp_parquet_path, index=False)
-        
-        # Create or replace table using Parquet
-        conn.execute(f"CREATE OR REPLACE TABLE source.{table_name} AS SELECT * FROM read_parquet('{temp_parquet_path}')")
-        
-        record_count = conn.execute(f"SELECT COUNT(*) FROM source.{table_name}").fetchone()[0]
-        logger.info(f"{record_count} records loaded into source.{table_name}")
-        
-        return record_count
+        logger.info(f"Écriture en flux de source.{table_name} en staging")
+        start = time.perf_counter()
+
+        with MemorySampler() as memory:
+            conn.begin()
+            try:
+                if incremental:
+                    extract = f"_extract_{table_name}"
+                    streamed = append_batches(conn, reader, "CREATE OR REPLACE TEMP TABLE", extract)
+                    mode, record_count = stage_merge(
+                        conn, extract, table_name, load_timestamp, key, watermark_column, TOMBSTONE_COLUMN
+                    )
+                    conn.execute(f"DROP TABLE {extract}")
+                else:
+                    mode = "replace"
+                    streamed = record_count = append_batches(
+                        conn, reader, "CREATE OR REPLACE TABLE", staging_relation(table_name),
+                        ", ?::VARCHAR AS _loaded_at, ?::VARCHAR AS _source_file", [load_timestamp, table_name],
+                    )
+                    record_count -= delete_tombstones(conn, staging_relation(table_name), TOMBSTONE_COLUMN)
+                conn.commit()
+            except Exception:
+                # Seule la transaction ouverte ici est annulée : une erreur avant begin() ou après commit()
+                # n'est pas masquée par un rollback sans transaction active
+                conn.rollback()
+                raise
+
+        elapsed = time.perf_counter() - start
+        rows_per_second = streamed / elapsed if elapsed > 0 else 0
+        logger.info(
+            f"{record_count} lignes écrites en flux pour source.{table_name} "
+            f"({rows_per_second:,.0f} lignes/s, pic RSS {memory.peak_mb:,.0f} Mo)"
+        )
+
+        return StagedTable(table_name, mode, record_count, key, watermark_column)
     except Exception as e:
-        logger.error(f"Error loading source.{table_name}: {e}")
-        raise
\ No newline at end of file
+        logger.error(f"Erreur lors de l'écriture en flux de source.{table_name}: {e}")
+        raise
+
+
+def stream_data_to_motherduck(conn, reader, table_name, load_timestamp, incremental=False,
+                              key=MERGE_KEY, watermark_column=WATERMARK_COLUMN):
+    """
+    Charge un RecordBatchReader Arrow dans source.{table_name} (staging, puis publication).
+    La table est remplacée, ou fusionnée en mode incrémental.
+    """
+    staged = stage_stream(conn, reader, table_name, load_timestamp, incremental, key, watermark_column)
+    publish_staged(conn, [staged])
+    return staged.rows
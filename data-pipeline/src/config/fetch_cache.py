@@ -0,0 +1,265 @@
+import fcntl
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from config.constants import FETCH_CACHE_DIR, PARTIAL_DOWNLOAD_DIR
+from config.logger import logger
+
+
+class HashingReader:
+    """
+    Enveloppe un flux binaire et calcule son empreinte SHA-256 au fil de la lecture
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.hasher = hashlib.sha256()
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        self.hasher.update(chunk)
+        self.bytes_read += len(chunk)
+        return chunk
+
+    @property
+    def closed(self):
+        return self.raw.closed
+
+    def close(self):
+        self.raw.close()
+
+    def hexdigest(self):
+        return self.hasher.hexdigest()
+
+
+class ResumableDownload:
+    """
+    Téléchargement conservé dans un fichier partiel local et repris là où il s'était arrêté.
+    Une nouvelle tentative relit les octets déjà reçus et ne demande au serveur que la suite
+    (Range, validée par If-Range sur l'ETag ou le Last-Modified de la première réponse) ;
+    un fichier complet est réutilisé tant que le serveur répond 304.
+    Se lit comme un flux binaire, du premier au dernier octet de l'extrait.
+    Un verrou exclusif sur le fichier partiel est tenu jusqu'à close() : deux exécutions de l'ETL
+    sur la même URL se succèdent au lieu d'écrire le même fichier en même temps.
+    """
+
+    def __init__(self, url, directory=PARTIAL_DOWNLOAD_DIR):
+        os.makedirs(directory, exist_ok=True)
+        name = hashlib.sha256(url.encode()).hexdigest()
+        self.url = url
+        self.path = os.path.join(directory, name + ".part")
+        self.meta_path = os.path.join(directory, name + ".json")
+        self.lock_path = os.path.join(directory, name + ".lock")
+        self.lock = None
+        # Fichier partiel et métadonnées sont lus sous le verrou : l'exécution précédente a pu les modifier
+        self._acquire()
+        self.meta = self._load_meta()
+        self.size = os.path.getsize(self.path) if self.meta and os.path.exists(self.path) else 0
+        # Octets reçus du serveur pendant cette tentative
+        self.downloaded = 0
+        self.local = self.remote = self.sink = None
+
+    def _acquire(self):
+        self.lock = open(self.lock_path, "w")
+        fcntl.flock(self.lock, fcntl.LOCK_EX)
+
+    def _release(self):
+        if self.lock is not None:
+            fcntl.flock(self.lock, fcntl.LOCK_UN)
+            self.lock.close()
+            self.lock = None
+
+    def _load_meta(self):
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return meta if meta.get("url") == self.url else {}
+
+    def _save_meta(self):
+        temp_path = self.meta_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(temp_path, self.meta_path)
+
+    @property
+    def resuming(self):
+        """Vrai si un fichier partiel validable existe : la requête reprend ou revalide ce fichier"""
+        return self.size > 0 and bool(self.meta.get("etag") or self.meta.get("last_modified"))
+
+    @property
+    def complete(self):
+        return self.size > 0 and self.meta.get("total") == self.size
+
+    def request_headers(self):
+        """
+        En-têtes de la requête. Le contenu est demandé sans compression : les plages d'une reprise
+        portent sur les octets du fichier.
+        """
+        headers = {"Accept-Encoding": "identity"}
+        if not self.resuming:
+            return headers
+        if self.complete:
+            if self.meta.get("etag"):
+                headers["If-None-Match"] = self.meta["etag"]
+            else:
+                headers["If-Modified-Since"] = self.meta["last_modified"]
+        else:
+            headers["Range"] = f"bytes={self.size}-"
+            headers["If-Range"] = self.meta.get("etag") or self.meta["last_modified"]
+        return headers
+
+    def attach(self, response):
+        """
+        Associe la réponse du serveur : 304 relit le fichier complet, 206 le relit puis le complète,
+        toute autre réponse (premier essai, contenu modifié depuis) repart du début
+        """
+        content_range = response.headers.get("Content-Range", "")
+        if response.status_code == 304 and self.resuming and self.complete:
+            logger.info(f"Fichier partiel complet de {self.url} toujours à jour, réutilisé")
+            self.local = open(self.path, "rb")
+        elif response.status_code == 206 and content_range.startswith(f"bytes {self.size}-"):
+            logger.info(f"Reprise du téléchargement de {self.url} à l'octet {self.size}")
+            total = content_range.rsplit("/", 1)[-1]
+            self.meta["total"] = int(total) if total.isdigit() else None
+            self._save_meta()
+            self.local = open(self.path, "rb")
+            self.remote, self.sink = response.raw, open(self.path, "ab")
+        else:
+            self.size = 0
+            # Un contenu compressé malgré la demande est décompressé et ne pourra pas être repris
+            encoded = response.headers.get("Content-Encoding", "identity") != "identity"
+            response.raw.decode_content = encoded
+            length = response.headers.get("Content-Length")
+            self.meta = {
+                "url": self.url,
+                "etag": None if encoded else response.headers.get("ETag"),
+                "last_modified": None if encoded else response.headers.get("Last-Modified"),
+                "total": int(length) if length and not encoded else None,
+            }
+            self._save_meta()
+            self.remote, self.sink = response.raw, open(self.path, "wb")
+        return self
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b"".join(iter(lambda: self.read(1024 * 1024), b""))
+
+        if self.local is not None:
+            chunk = self.local.read(size)
+            if chunk:
+                return chunk
+            self.local.close()
+            self.local = None
+
+        if self.remote is None:
+            return b""
+        chunk = self.remote.read(size)
+        if chunk:
+            # Écrit aussitôt : une coupure laisse dans le fichier partiel tout ce qui a été reçu
+            self.sink.write(chunk)
+            self.sink.flush()
+            self.size += len(chunk)
+            self.downloaded += len(chunk)
+        else:
+            self.meta["total"] = self.size
+            self._save_meta()
+            self.sink.close()
+            self.remote = self.sink = None
+        return chunk
+
+    @property
+    def closed(self):
+        return self.local is None and self.remote is None
+
+    def _close_files(self):
+        for handle in (self.local, self.sink):
+            if handle is not None:
+                handle.close()
+        self.local = self.remote = self.sink = None
+
+    def close(self):
+        """Ferme les fichiers et libère le verrou"""
+        self._close_files()
+        self._release()
+
+    def discard(self):
+        """
+        Supprime le fichier partiel, une fois son contenu publié ou reconnu inchangé.
+        Après close() (publication en fin d'ETL), le verrou est repris le temps de la suppression.
+        """
+        self._close_files()
+        if self.lock is None:
+            self._acquire()
+        try:
+            for path in (self.path, self.meta_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        finally:
+            self._release()
+
+
+class FetchCache:
+    """
+    Cache sur disque des validateurs HTTP (ETag, Last-Modified) et des empreintes de contenu, par URL.
+    Une entrée n'est enregistrée qu'une fois le chargement correspondant réussi.
+    """
+
+    def __init__(self, directory=FETCH_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def get(self, url):
+        try:
+            with open(self._path(url)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def conditional_headers(self, url):
+        """
+        En-têtes de requête conditionnelle pour url, vides si rien n'est en cache
+        """
+        entry = self.get(url)
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def is_unchanged(self, url, response, content_hash=None):
+        """
+        Vrai si le serveur répond 304 ou si le contenu reçu a la même empreinte qu'en cache
+        """
+        if response.status_code == 304:
+            return True
+        return self.same_content(url, content_hash)
+
+    def same_content(self, url, content_hash):
+        """Vrai si content_hash est l'empreinte du dernier contenu chargé pour url"""
+        return content_hash is not None and content_hash == self.get(url).get("content_hash")
+
+    def store(self, url, response, content_hash, table_name):
+        entry = {
+            "url": url,
+            "table": table_name,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": content_hash,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        temp_path = self._path(url) + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(entry, f, indent=2)
+        os.replace(temp_path, self._path(url))
+        logger.info(f"Cache de téléchargement mis à jour pour {table_name}")
@@ -0,0 +1,179 @@
+from config.logger import logger
+
+
+def create_state_table_if_not_exists(conn):
+    """
+    Crée la table d'état du pipeline qui conserve le watermark de chaque table source
+    """
+    conn.execute("CREATE SCHEMA IF NOT EXISTS pipeline")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline.load_state (
+            table_name VARCHAR PRIMARY KEY,
+            watermark TIMESTAMP,
+            rows_written BIGINT,
+            updated_at TIMESTAMP
+        )
+    """)
+
+
+def get_watermark(conn, table_name):
+    """
+    Retourne le dernier watermark enregistré pour source.{table_name}, ou None
+    """
+    row = conn.execute(
+        "SELECT watermark FROM pipeline.load_state WHERE table_name = ?", [table_name]
+    ).fetchone()
+    return row[0] if row else None
+
+
+def save_watermark(conn, table_name, relation, watermark_column, rows_written):
+    """
+    Enregistre le maximum de watermark_column observé dans relation.
+    Le watermark ne recule jamais, même si l'extrait reçu est plus ancien.
+    """
+    if watermark_column not in get_columns(conn, relation):
+        return
+
+    conn.execute(f"""
+        INSERT OR REPLACE INTO pipeline.load_state
+        SELECT
+            ? AS table_name,
+            GREATEST(
+                (SELECT MAX(CAST("{watermark_column}" AS TIMESTAMP)) FROM {relation}),
+                (SELECT watermark FROM pipeline.load_state WHERE table_name = ?)
+            ) AS watermark,
+            ? AS rows_written,
+            CURRENT_TIMESTAMP AS updated_at
+    """, [table_name, table_name, rows_written])
+
+
+def reset_watermark(conn, table_name):
+    """
+    Supprime le watermark d'une table, utilisé lors d'un rechargement complet
+    """
+    conn.execute("DELETE FROM pipeline.load_state WHERE table_name = ?", [table_name])
+
+
+def get_columns(conn, relation):
+    """
+    Retourne la liste des colonnes d'une table ou d'une vue
+    """
+    return [column[0] for column in conn.execute(f"SELECT * FROM {relation} LIMIT 0").description]
+
+
+def table_exists(conn, schema, table_name):
+    return conn.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = ? AND table_name = ?",
+        [schema, table_name],
+    ).fetchone()[0] > 0
+
+
+def staging_relation(table_name):
+    """Table de staging d'une source, publiée ensuite dans source.{table_name}"""
+    return f"source._staging_{table_name}"
+
+
+def tombstone_filter(conn, relation, tombstone_column):
+    """Expression vraie pour les lignes supprimées logiquement, FALSE sans colonne de suppression"""
+    if tombstone_column in get_columns(conn, relation):
+        return f'COALESCE(TRY_CAST("{tombstone_column}" AS BOOLEAN), FALSE)'
+    return "FALSE"
+
+
+def stage_merge(conn, extract, table_name, load_timestamp, key, watermark_column, tombstone_column):
+    """
+    Calcule, depuis la relation extract, les lignes à fusionner dans source.{table_name}
+    et les écrit dans sa table de staging, appliquée ensuite par apply_merge.
+
+    Les lignes plus récentes que le watermark enregistré sont toujours retenues ; les plus
+    anciennes seulement si elles diffèrent de la version stockée. Les lignes marquées dans
+    tombstone_column seront supprimées de la cible. Rechargement complet si la cible n'existe pas
+    ou si son schéma a changé. Retourne (mode, lignes), mode 'merge' ou 'replace'.
+    """
+    target = f"source.{table_name}"
+    staging = staging_relation(table_name)
+    extract_columns = get_columns(conn, extract)
+
+    if not table_exists(conn, "source", table_name):
+        logger.info(f"{target} n'existe pas encore, chargement initial complet")
+        return "replace", stage_replacement(conn, extract, table_name, load_timestamp, tombstone_column)
+
+    target_columns = get_columns(conn, target)
+    if not set(extract_columns) <= set(target_columns) or key not in extract_columns:
+        logger.warning(f"Le schéma de {target} a changé en amont, rechargement complet")
+        return "replace", stage_replacement(conn, extract, table_name, load_timestamp, tombstone_column)
+
+    column_list = ", ".join(f'"{column}"' for column in extract_columns)
+    watermark = get_watermark(conn, table_name) if watermark_column in extract_columns else None
+
+    if watermark is None:
+        delta_query = f"""
+            SELECT {column_list} FROM {extract}
+            EXCEPT
+            SELECT {column_list} FROM {target}
+        """
+        params = []
+    else:
+        watermark_expr = f'CAST("{watermark_column}" AS TIMESTAMP)'
+        delta_query = f"""
+            SELECT {column_list} FROM {extract} WHERE {watermark_expr} > ?
+            UNION ALL
+            (
+                SELECT {column_list} FROM {extract} WHERE {watermark_expr} <= ? OR {watermark_expr} IS NULL
+                EXCEPT
+                SELECT {column_list} FROM {target} WHERE {watermark_expr} <= ? OR {watermark_expr} IS NULL
+            )
+        """
+        params = [watermark, watermark, watermark]
+
+    conn.execute(f"""
+        CREATE OR REPLACE TABLE {staging} AS
+        SELECT *, ?::VARCHAR AS _loaded_at, ?::VARCHAR AS _source_file
+        FROM ({delta_query})
+    """, [load_timestamp, table_name, *params])
+    changed, deleted = conn.execute(
+        f"SELECT COUNT(*), COUNT(*) FILTER (WHERE {tombstone_filter(conn, staging, tombstone_column)}) FROM {staging}"
+    ).fetchone()
+    logger.info(f"{changed} lignes nouvelles ou modifiées en staging pour {target} (dont {deleted} supprimées)")
+
+    return "merge", changed
+
+
+def stage_replacement(conn, extract, table_name, load_timestamp, tombstone_column):
+    """
+    Écrit dans la table de staging le contenu complet de source.{table_name}, sans les lignes supprimées
+    """
+    staging = staging_relation(table_name)
+    conn.execute(f"""
+        CREATE OR REPLACE TABLE {staging} AS
+        SELECT *, ?::VARCHAR AS _loaded_at, ?::VARCHAR AS _source_file
+        FROM {extract} WHERE NOT {tombstone_filter(conn, extract, tombstone_column)}
+    """, [load_timestamp, table_name])
+
+    record_count = conn.execute(f"SELECT COUNT(*) FROM {staging}").fetchone()[0]
+    logger.info(f"{record_count} lignes en staging pour source.{table_name}")
+    return record_count
+
+
+def delete_tombstones(conn, relation, tombstone_column):
+    """
+    Supprime de relation les lignes supprimées logiquement et retourne leur nombre
+    """
+    condition = tombstone_filter(conn, relation, tombstone_column)
+    if condition == "FALSE":
+        return 0
+    return conn.execute(f"DELETE FROM {relation} WHERE {condition}").fetchone()[0]
+
+
+def apply_merge(conn, table_name, key, tombstone_column):
+    """
+    Applique à source.{table_name} les lignes de sa table de staging : les versions stockées
+    des clés reçues sont supprimées, puis les lignes non supprimées logiquement insérées
+    """
+    target = f"source.{table_name}"
+    staging = staging_relation(table_name)
+    conn.execute(f'DELETE FROM {target} WHERE "{key}" IN (SELECT "{key}" FROM {staging})')
+    conn.execute(f"""
+        INSERT INTO {target} BY NAME
+        SELECT * FROM {staging} WHERE NOT {tombstone_filter(conn, staging, tombstone_column)}
+    """)
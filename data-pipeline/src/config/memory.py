@@ -0,0 +1,71 @@
+"""
+Mesure de la mémoire résidente (RSS) d'un processus, pour la télémétrie du pipeline,
+les benchmarks et le test de charge du dashboard.
+
+Le module n'importe rien du paquet config : streamlit/loadtest.py le charge par son chemin,
+le config.py du dashboard masquant ce paquet.
+"""
+import os
+import resource
+import threading
+
+
+def rss_mb(pid="self"):
+    """
+    Retourne la mémoire résidente (RSS) actuelle du processus pid (par défaut le processus courant) en Mo.
+    Hors Linux : le pic depuis le démarrage du processus courant, None pour un autre processus
+    (ou un processus terminé).
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if pid == "self" else None
+
+
+class MemorySampler:
+    """
+    Échantillonne la mémoire résidente du processus pid (par défaut le processus courant)
+    dans un thread pendant un bloc with. peak_mb est le pic observé pendant le bloc, et non
+    depuis le démarrage du processus (ru_maxrss), qui reste figé sur l'étape la plus gourmande
+    d'un processus Dagster ; mean_mb la moyenne des échantillons.
+    La mesure porte sur tout le processus : des étapes exécutées en même temps dans d'autres
+    threads comptent dans le pic du bloc.
+    """
+
+    def __init__(self, interval=0.05, pid="self"):
+        self.interval = interval
+        self.pid = pid
+        self.peak_mb = None
+        self.total_mb = 0.0
+        self.samples = 0
+        self.stop = threading.Event()
+        self.thread = None
+
+    def sample(self):
+        current = rss_mb(self.pid)
+        if current is not None:
+            self.peak_mb = max(self.peak_mb or 0, current)
+            self.total_mb += current
+            self.samples += 1
+
+    @property
+    def mean_mb(self):
+        return self.total_mb / self.samples if self.samples else None
+
+    def __enter__(self):
+        self.sample()
+
+        def run():
+            while not self.stop.wait(self.interval):
+                self.sample()
+
+        self.thread = threading.Thread(target=run, name="memory-sampler", daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop.set()
+        self.thread.join()
+        self.sample()
+        return False
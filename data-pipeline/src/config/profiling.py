@@ -0,0 +1,149 @@
+import json
+import os
+import subprocess
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from config.constants import PROFILE_TOP_OPERATORS
+from config.logger import logger
+
+# Informations d'opérateur conservées dans l'historique, selon le type d'opérateur
+OPERATOR_DETAILS = ("Table", "Join Type", "Conditions", "Groups", "Aggregates", "Function")
+
+
+@dataclass
+class QueryProfile:
+    """
+    Profil d'exécution DuckDB d'une requête : totaux et opérateurs les plus coûteux
+    """
+    latency: float
+    cpu_time: float
+    rows_scanned: int
+    peak_buffer_memory: int
+    operators: list = field(default_factory=list)
+
+    def as_markdown(self):
+        lines = ["| # | Opérateur | Temps (s) | Lignes | Détail |", "|---|---|---|---|---|"]
+        for operator in self.operators:
+            lines.append(
+                f"| {operator['rank']} | {operator['operator']} | {operator['seconds']:.4f} "
+                f"| {operator['cardinality']} | {operator['detail'] or ''} |"
+            )
+        return "\n".join(lines)
+
+
+def collect_operators(node):
+    """
+    Aplatit l'arbre d'opérateurs du profil JSON de DuckDB
+    """
+    operators = []
+    name = node.get("operator_name")
+    if name and name not in ("EXPLAIN_ANALYZE", "QUERY"):
+        extra_info = node.get("extra_info") or {}
+        detail = {key: extra_info[key] for key in OPERATOR_DETAILS if key in extra_info}
+        operators.append({
+            "operator": name,
+            "seconds": node.get("operator_timing", 0.0),
+            "cardinality": node.get("operator_cardinality"),
+            "rows_scanned": node.get("operator_rows_scanned"),
+            "detail": json.dumps(detail, ensure_ascii=False) if detail else None,
+        })
+    for child in node.get("children", []):
+        operators.extend(collect_operators(child))
+    return operators
+
+
+def parse_profile(profile, top=PROFILE_TOP_OPERATORS):
+    """
+    Retourne le QueryProfile d'un profil JSON de DuckDB, avec les top opérateurs les plus lents
+    """
+    operators = sorted(collect_operators(profile), key=lambda operator: operator["seconds"], reverse=True)[:top]
+    for rank, operator in enumerate(operators, start=1):
+        operator["rank"] = rank
+    return QueryProfile(
+        latency=profile.get("latency"),
+        cpu_time=profile.get("cpu_time"),
+        rows_scanned=profile.get("cumulative_rows_scanned"),
+        peak_buffer_memory=profile.get("system_peak_buffer_memory"),
+        operators=operators,
+    )
+
+
+def load_profile(path, top=PROFILE_TOP_OPERATORS):
+    """
+    Lit le profil JSON écrit par DuckDB (enable_profiling = 'json', profiling_output = path)
+    pendant l'exécution d'une requête et retourne son QueryProfile
+    """
+    with open(path) as f:
+        return parse_profile(json.load(f), top)
+
+
+def code_version():
+    """
+    Commit du code profilé : GIT_COMMIT s'il est défini, sinon HEAD du dépôt
+    """
+    if os.getenv("GIT_COMMIT"):
+        return os.getenv("GIT_COMMIT")
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(__file__), text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def create_profile_table_if_not_exists(conn):
+    """
+    Crée la table d'historique des profils de requêtes si elle n'existe pas déjà
+    """
+    conn.execute("CREATE SCHEMA IF NOT EXISTS pipeline")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline.query_profiles (
+            run_id VARCHAR,
+            target VARCHAR,
+            code_version VARCHAR,
+            profiled_at TIMESTAMP,
+            latency DOUBLE,
+            cpu_time DOUBLE,
+            rows_scanned BIGINT,
+            peak_buffer_memory BIGINT,
+            rank INTEGER,
+            operator VARCHAR,
+            operator_seconds DOUBLE,
+            operator_cardinality BIGINT,
+            operator_rows_scanned BIGINT,
+            operator_detail VARCHAR,
+            window_start TIMESTAMP,
+            window_end TIMESTAMP
+        )
+    """)
+
+
+def save_profiles(conn, run_id, profiles, version=None, window=(None, None)):
+    """
+    Enregistre les profils {cible: QueryProfile}, une ligne par opérateur conservé,
+    avec la fenêtre (début, fin) de la partition construite par l'exécution
+    """
+    columns = (
+        "run_id", "target", "code_version", "profiled_at", "latency", "cpu_time", "rows_scanned",
+        "peak_buffer_memory", "rank", "operator", "operator_seconds", "operator_cardinality",
+        "operator_rows_scanned", "operator_detail", "window_start", "window_end",
+    )
+    try:
+        create_profile_table_if_not_exists(conn)
+        profiled_at = datetime.now()
+        conn.executemany(
+            f"INSERT INTO pipeline.query_profiles ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+            [
+                [
+                    run_id, target, version, profiled_at,
+                    profile.latency, profile.cpu_time, profile.rows_scanned, profile.peak_buffer_memory,
+                    operator["rank"], operator["operator"], operator["seconds"], operator["cardinality"],
+                    operator["rows_scanned"], operator["detail"], *window,
+                ]
+                for target, profile in profiles.items()
+                for operator in profile.operators
+            ],
+        )
+    except Exception as e:
+        logger.warning(f"Impossible d'enregistrer les profils de l'exécution {run_id}: {e}")
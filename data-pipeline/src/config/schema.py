@@ -0,0 +1,130 @@
+import csv
+import io
+import os
+import re
+
+import pandas as pd
+import yaml
+
+from config.constants import BRONZE_MODELS_DIR, SOURCES_SCHEMA_FILE
+from config.logger import logger
+
+# Type de lecture du CSV selon le data_type DuckDB déclaré dans sources.yml.
+# Les nombres sont lus en float64 (tolère « 27.0 » pour un entier) puis typés exactement en bronze
+# (DECIMAL, INTEGER). Les dates sont lues en chaînes puis converties par parse_dates, dans le même
+# type que les lots Arrow du mode stream : une table a les mêmes types quel que soit LOAD_MODE.
+PANDAS_TYPES = {
+    "VARCHAR": "string",
+    "BOOLEAN": "boolean",
+    "INTEGER": "float64",
+    "BIGINT": "float64",
+    "FLOAT": "float64",
+    "DOUBLE": "float64",
+    "DECIMAL": "float64",
+    "TIMESTAMP": "datetime64[us]",
+    "DATE": "date32[pyarrow]",
+}
+
+# Types pandas convertis après lecture du CSV (read_csv ne les accepte pas dans dtype)
+DATE_TYPES = {"datetime64[us]", "date32[pyarrow]"}
+
+
+class MissingColumnsError(ValueError):
+    """Colonnes requises absentes de l'en-tête d'un extrait"""
+
+
+def column_dtype(column):
+    """
+    Type pandas d'une colonne déclarée : 'category' pour meta.categorical, None si non typée
+    """
+    if (column.get("meta") or {}).get("categorical"):
+        return "category"
+    data_type = str(column.get("data_type", "")).upper().split("(")[0].strip()
+    return PANDAS_TYPES.get(data_type)
+
+
+def parse_dates(df, dtypes):
+    """
+    Convertit en place les colonnes de df déclarées avec un type date (DATE_TYPES), lues en chaînes
+    """
+    for column, dtype in dtypes.items():
+        if dtype in DATE_TYPES and column in df.columns:
+            df[column] = pd.to_datetime(df[column]).astype(dtype)
+    return df
+
+
+def declared_tables(path=SOURCES_SCHEMA_FILE):
+    """
+    Tables déclarées dans les sources dbt (immobilier_courtage/models/sources.yml), {nom: table}.
+    Sans fichier, retourne {} : colonnes et types sont alors inférés.
+    """
+    try:
+        with open(path) as f:
+            declared = yaml.safe_load(f)
+    except FileNotFoundError:
+        logger.warning(f"Schéma des sources introuvable ({path}), colonnes et types inférés")
+        return {}
+    return {table["name"]: table for source in declared.get("sources", []) for table in source.get("tables", [])}
+
+
+def load_schema(path=SOURCES_SCHEMA_FILE):
+    """
+    Retourne {table: {colonne: type pandas}} pour les colonnes déclarées des sources dbt
+    """
+    schema = {}
+    for name, table in declared_tables(path).items():
+        dtypes = {column["name"]: column_dtype(column) for column in table.get("columns", [])}
+        schema[name] = {column: dtype for column, dtype in dtypes.items() if dtype}
+    return schema
+
+
+def load_columns(path=SOURCES_SCHEMA_FILE):
+    """
+    Retourne {table: (colonnes ingérées, colonnes requises)} d'après les colonnes déclarées
+    des sources dbt. Une colonne est requise sauf meta.required: false.
+    """
+    columns = {}
+    for name, table in declared_tables(path).items():
+        declared = table.get("columns", [])
+        columns[name] = (
+            tuple(column["name"] for column in declared),
+            tuple(column["name"] for column in declared if (column.get("meta") or {}).get("required", True)),
+        )
+    return columns
+
+
+def parse_header(content):
+    """Noms de colonnes de la première ligne d'un contenu CSV (octets)"""
+    first_line = content.split(b"\n", 1)[0].decode("utf-8-sig")
+    return next(csv.reader(io.StringIO(first_line)), [])
+
+
+def select_columns(header, columns, required, table):
+    """
+    Colonnes de header à lire : les colonnes déclarées, dans l'ordre du fichier.
+    Toutes les colonnes sont lues si aucune n'est déclarée (retourne None).
+    Lève MissingColumnsError si une colonne requise a disparu de l'extrait.
+    """
+    missing = [column for column in required if column not in header]
+    if missing:
+        raise MissingColumnsError(f"Colonnes requises absentes de l'extrait {table}: {', '.join(missing)}")
+    if not columns:
+        return None
+    return [column for column in header if column in columns]
+
+
+def bronze_references(models_dir=BRONZE_MODELS_DIR):
+    """
+    Identifiants SQL des modèles bronze, par table source lue ({table: {identifiants}}) :
+    les colonnes d'un en-tête qui y figurent sont celles que le projet dbt utilise
+    """
+    references = {}
+    for filename in sorted(os.listdir(models_dir)):
+        if not filename.endswith(".sql"):
+            continue
+        with open(os.path.join(models_dir, filename)) as f:
+            sql = f.read()
+        identifiers = set(re.findall(r"\w+", sql))
+        for table in re.findall(r"source\(\s*'source'\s*,\s*'(\w+)'\s*\)", sql):
+            references.setdefault(table, set()).update(identifiers)
+    return references
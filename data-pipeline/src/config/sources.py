@@ -0,0 +1,64 @@
+import json
+from dataclasses import dataclass, field, replace
+
+from config.constants import (
+    GITHUB_OPPORTUNITIES_URL,
+    GITHUB_PROPOSITIONS_URL,
+    MERGE_KEY,
+    PRUNE_COLUMNS,
+    SOURCES_FILE,
+    WATERMARK_COLUMN,
+)
+from config.schema import load_columns, load_schema
+
+
+@dataclass(frozen=True)
+class Source:
+    """
+    Déclaration d'un extrait CSV à charger dans source.{table}
+    """
+    name: str
+    url: str
+    table: str
+    key: str = MERGE_KEY
+    watermark_column: str = WATERMARK_COLUMN
+    # Types pandas par colonne ('string', 'category', 'float64', 'boolean', ...), complétés par
+    # le schéma déclaré dans sources.yml, inférés sinon
+    dtypes: dict = field(default_factory=dict)
+    # Colonnes lues et stockées (toutes si vide) et colonnes dont l'absence fait échouer le chargement,
+    # complétées par les colonnes déclarées dans sources.yml
+    columns: tuple = ()
+    required_columns: tuple = ()
+
+
+SOURCES = [
+    Source(name="opportunites", url=GITHUB_OPPORTUNITIES_URL, table="raw_opportunites"),
+    Source(name="propositions", url=GITHUB_PROPOSITIONS_URL, table="raw_propositions"),
+]
+
+
+def load_sources(path=SOURCES_FILE):
+    """
+    Retourne le registre des sources, typé et restreint aux colonnes déclarées dans sources.yml.
+    Un fichier JSON (liste d'objets Source) peut ajouter ou remplacer des sources par nom.
+    Les dtypes et colonnes déclarés sur une source priment sur ceux du schéma.
+    """
+    sources = list(SOURCES)
+    if path:
+        with open(path) as f:
+            declared = [Source(**entry) for entry in json.load(f)]
+
+        names = {source.name for source in declared}
+        sources = [source for source in sources if source.name not in names] + declared
+
+    schema, declared_columns = load_schema(), load_columns()
+    typed = []
+    for source in sources:
+        columns, required_columns = declared_columns.get(source.table, ((), ()))
+        typed.append(replace(
+            source,
+            dtypes={**schema.get(source.table, {}), **source.dtypes},
+            columns=(tuple(source.columns) or columns) if PRUNE_COLUMNS else (),
+            required_columns=tuple(source.required_columns) or required_columns,
+        ))
+    return typed
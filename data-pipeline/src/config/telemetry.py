@@ -0,0 +1,148 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+
+from config.memory import MemorySampler
+from config.logger import logger
+
+
+@dataclass
+class StageMetrics:
+    """
+    Mesures d'une étape du pipeline (téléchargement, parsing, chargement, modèle dbt...)
+    """
+    run_id: str
+    stage: str
+    target: str = None
+    status: str = "success"
+    started_at: datetime = None
+    wall_seconds: float = None
+    cpu_seconds: float = None
+    rows: int = None
+    bytes: int = None
+    peak_rss_mb: float = None
+    error: str = None
+
+    def as_metadata(self):
+        """Mesures non vides, préfixées par le nom de l'étape, pour les métadonnées Dagster"""
+        metrics = {
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "peak_rss_mb": self.peak_rss_mb,
+        }
+        return {
+            f"{self.stage}_{name}": round(value, 3) if isinstance(value, float) else value
+            for name, value in metrics.items() if value is not None
+        }
+
+
+class Telemetry:
+    """
+    Collecte les mesures des étapes d'une exécution, depuis plusieurs threads,
+    et les enregistre dans pipeline.pipeline_runs / pipeline.pipeline_stage_metrics
+    """
+
+    def __init__(self, pipeline, run_id=None):
+        self.pipeline = pipeline
+        self.run_id = run_id or str(uuid.uuid4())
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.stages = []
+        self.lock = threading.Lock()
+
+    def record(self, stage, target=None, **measures):
+        """Ajoute une étape mesurée ailleurs (ex. temps d'exécution rapportés par dbt)"""
+        metrics = StageMetrics(self.run_id, stage, target, **measures)
+        with self.lock:
+            self.stages.append(metrics)
+        return metrics
+
+    @contextmanager
+    def stage(self, stage, target=None):
+        """
+        Chronomètre une étape : temps réel, temps CPU du thread appelant et pic RSS du processus
+        échantillonné pendant l'étape (y compris les étapes concurrentes d'autres threads).
+        Le bloc renseigne rows et bytes sur l'objet retourné.
+        """
+        metrics = StageMetrics(self.run_id, stage, target, started_at=datetime.now())
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        memory = MemorySampler()
+        try:
+            with memory:
+                yield metrics
+        except Exception as e:
+            metrics.status, metrics.error = "failed", str(e)
+            raise
+        finally:
+            metrics.wall_seconds = time.perf_counter() - start
+            metrics.cpu_seconds = time.thread_time() - cpu_start
+            metrics.peak_rss_mb = memory.peak_mb
+            with self.lock:
+                self.stages.append(metrics)
+
+    def for_target(self, target):
+        return [metrics for metrics in self.stages if metrics.target == target]
+
+    def write(self, conn, status="success"):
+        """
+        Enregistre l'exécution et ses étapes. Une erreur d'écriture est journalisée
+        sans interrompre le pipeline.
+        """
+        try:
+            create_telemetry_tables_if_not_exist(conn)
+            conn.execute(
+                "INSERT INTO pipeline.pipeline_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    self.run_id, self.pipeline, self.started_at, time.perf_counter() - self.start, status,
+                    sum(metrics.rows or 0 for metrics in self.stages if metrics.stage == "load"),
+                    sum(metrics.bytes or 0 for metrics in self.stages if metrics.stage == "download"),
+                    max((metrics.peak_rss_mb for metrics in self.stages if metrics.peak_rss_mb is not None), default=None),
+                ],
+            )
+            columns = [field.name for field in fields(StageMetrics)]
+            conn.executemany(
+                f"INSERT INTO pipeline.pipeline_stage_metrics ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                [list(asdict(metrics).values()) for metrics in self.stages],
+            )
+        except Exception as e:
+            logger.warning(f"Impossible d'enregistrer la télémétrie de l'exécution {self.run_id}: {e}")
+
+
+def create_telemetry_tables_if_not_exist(conn):
+    """
+    Crée les tables de télémétrie du pipeline si elles n'existent pas déjà
+    """
+    conn.execute("CREATE SCHEMA IF NOT EXISTS pipeline")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline.pipeline_runs (
+            run_id VARCHAR PRIMARY KEY,
+            pipeline VARCHAR,
+            started_at TIMESTAMP,
+            wall_seconds DOUBLE,
+            status VARCHAR,
+            rows BIGINT,
+            bytes BIGINT,
+            peak_rss_mb DOUBLE
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline.pipeline_stage_metrics (
+            run_id VARCHAR,
+            stage VARCHAR,
+            target VARCHAR,
+            status VARCHAR,
+            started_at TIMESTAMP,
+            wall_seconds DOUBLE,
+            cpu_seconds DOUBLE,
+            rows BIGINT,
+            bytes BIGINT,
+            peak_rss_mb DOUBLE,
+            error VARCHAR
+        )
+    """)
\ No newline at end of file
@@ -1,51 +1,431 @@
-from config.database import connect_to_motherduck, create_schema_if_not_exists, load_data_to_motherduck
-from config.constants import GITHUB_OPPORTUNITIES_URL, GITHUB_PROPOSITIONS_URL, LOAD_TIMESTAMP
+from config.database import (
+    StagedTable, connect_to_motherduck, create_schema_if_not_exists, discard_staged, publish_staged, stage_dataframe,
+    stage_stream,
+)
+from config.constants import (
+    LOAD_TIMESTAMP, LOAD_MODE, STREAM_BLOCK_SIZE, INCREMENTAL, FULL_REFRESH,
+    MAX_WORKERS, SOURCE_RETRIES, RETRY_BACKOFF_SECONDS, STRICT_MODE, FETCH_CACHE_ENABLED, PUBLISH_PARTIAL,
+)
+from config.fetch_cache import FetchCache, HashingReader, ResumableDownload
+from config.incremental import table_exists
 from config.logger import logger
+from config.schema import (
+    DATE_TYPES, MissingColumnsError, bronze_references, load_columns, parse_dates, parse_header, select_columns,
+)
+from config.sources import load_sources
+from config.telemetry import Telemetry
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Callable
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import requests
 import io
+import time
 
-def download_from_github(url):
+# Correspondance entre les types pandas déclarés dans le registre et les types Arrow
+ARROW_TYPES = {
+    "string": pa.string(),
+    "object": pa.string(),
+    # Colonne catégorielle : lots Arrow encodés en dictionnaire, chargés en VARCHAR
+    "category": pa.dictionary(pa.int32(), pa.string()),
+    "boolean": pa.bool_(),
+    "bool": pa.bool_(),
+    "Int64": pa.int64(),
+    "int64": pa.int64(),
+    "float64": pa.float64(),
+    "datetime64[ns]": pa.timestamp("ns"),
+    # Dates déclarées dans sources.yml, du même type qu'en mode batch (config.schema.parse_dates)
+    "datetime64[us]": pa.timestamp("us"),
+    "date32[pyarrow]": pa.date32(),
+}
+
+# Type DuckDB proposé pour une colonne non déclarée, d'après le type Arrow inféré (VARCHAR sinon)
+DUCKDB_TYPES = {
+    "bool": "BOOLEAN",
+    "int64": "BIGINT",
+    "double": "DOUBLE",
+    "timestamp[s]": "TIMESTAMP",
+    "date32[day]": "DATE",
+}
+
+
+@dataclass
+class SourceResult:
+    """
+    Résultat du chargement d'une source pour le résumé d'exécution
+    """
+    source: str
+    table: str
+    status: str
+    rows: int = 0
+    bytes: int = 0
+    attempts: int = 0
+    duration: float = 0.0
+    error: str = None
+    # Chargement en attente de publication, pour une source chargée avec succès
+    publication: "Publication" = None
+
+
+@dataclass
+class Publication:
+    """
+    Table de staging d'une source et action à exécuter une fois celle-ci publiée
+    """
+    staged: StagedTable
+    on_published: Callable[[], None]
+
+
+def fetch_from_github(url, headers=None, stream=False):
+    """
+    Envoie la requête GET vers GitHub, éventuellement conditionnelle, et retourne la réponse.
+    Une réponse 304 (Not Modified) est retournée telle quelle.
+    """
+    response = requests.get(url, headers=headers or {}, stream=stream)
+    response.raise_for_status()
+    return response
+
+class PrefixedReader:
+    """
+    Flux binaire qui relit prefix (octets déjà consommés, ex. l'en-tête) avant la suite de raw
     """
-    Télécharge un fichier CSV depuis GitHub et retourne un DataFrame pandas
+
+    def __init__(self, prefix, raw):
+        self.prefix = prefix
+        self.raw = raw
+
+    def read(self, size=-1):
+        if not self.prefix:
+            return self.raw.read(size)
+        if size is None or size < 0:
+            chunk, self.prefix = self.prefix + self.raw.read(), b""
+        else:
+            chunk, self.prefix = self.prefix[:size], self.prefix[size:]
+        return chunk
+
+    @property
+    def closed(self):
+        # raw se ferme de lui-même en fin de réponse, alors que prefix reste à lire (petit extrait)
+        return not self.prefix and self.raw.closed
+
+    def close(self):
+        self.raw.close()
+
+def read_stream_header(raw, chunk_size=64 * 1024):
+    """
+    Lit l'en-tête d'un flux CSV. Retourne (colonnes, flux à lire depuis le début)
+    """
+    prefix = b""
+    while b"\n" not in prefix:
+        chunk = raw.read(chunk_size)
+        if not chunk:
+            break
+        prefix += chunk
+    return parse_header(prefix), PrefixedReader(prefix, raw)
+
+def read_csv_content(content, dtypes=None, columns=None):
+    """
+    Convertit le contenu CSV téléchargé en DataFrame pandas, limité à columns si défini.
+    Les colonnes de type date sont lues en chaînes puis converties.
+    """
+    dtypes = dtypes or {}
+    read_types = {column: "string" if dtype in DATE_TYPES else dtype for column, dtype in dtypes.items()}
+    df = pd.read_csv(io.BytesIO(content), sep=',', dtype=read_types or None, usecols=columns)
+    return parse_dates(df, dtypes)
+
+def open_csv_stream(raw, block_size=STREAM_BLOCK_SIZE, dtypes=None, columns=None):
+    """
+    Retourne un lecteur de RecordBatch Arrow sur un flux binaire CSV.
+    Avec columns, les autres colonnes ne sont ni converties ni chargées.
+    Comme pandas en mode batch, un champ vide (entre guillemets ou non) est lu NULL et non ''.
+    """
+    column_types = {column: ARROW_TYPES[dtype] for column, dtype in (dtypes or {}).items()}
+    return pacsv.open_csv(
+        raw,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        convert_options=pacsv.ConvertOptions(
+            column_types=column_types, include_columns=columns or [],
+            strings_can_be_null=True, quoted_strings_can_be_null=True,
+        ),
+    )
+
+def ingest_source(conn, source, incremental=False, fetch_cache=None, skip_unchanged=True, telemetry=None):
     """
+    Télécharge une source et l'écrit dans sa table de staging, sur un curseur dédié,
+    utilisable depuis un thread. La source n'est visible des lecteurs qu'une fois publiée
+    par publish_results, avec les autres sources de l'exécution.
+    Avec un cache et skip_unchanged, une source inchangée depuis le dernier chargement
+    n'est pas rechargée. Un téléchargement interrompu reprend à la tentative suivante.
+    Retourne (statut, lignes, octets, publication), statut 'success' ou 'no-op' ;
+    publication (None pour un no-op) regroupe la table de staging et la mise à jour du cache.
+    Seules les colonnes déclarées de la source sont lues ; lève MissingColumnsError
+    si une colonne requise manque à l'en-tête, avant tout chargement.
+    Les étapes download, parse et load sont mesurées dans telemetry
+    (en mode stream, le parsing est compris dans load).
+    """
+    telemetry = telemetry or Telemetry("etl")
+    # Curseur et téléchargement sont fermés en sortie, y compris si l'ouverture du second échoue
+    with ExitStack() as resources:
+        cursor = conn.cursor()
+        resources.callback(cursor.close)
+        download = ResumableDownload(source.url)
+        resources.callback(download.close)
+        stream = LOAD_MODE == "stream"
+        # Si la table cible a disparu, le cache ne doit pas empêcher son rechargement
+        skip_unchanged = (
+            skip_unchanged and fetch_cache is not None and table_exists(cursor, "source", source.table)
+        )
+        # Un fichier partiel est repris (ou revalidé) : la requête porte alors sur lui et non sur le cache ;
+        # son contenu, une fois relu, est comparé à l'empreinte en cache comme un téléchargement complet
+        headers = download.request_headers()
+        if skip_unchanged and not download.resuming:
+            headers.update(fetch_cache.conditional_headers(source.url))
+
+        logger.info(f"Téléchargement du fichier depuis {source.url}")
+        with telemetry.stage("download", source.table) as download_stage:
+            try:
+                response = fetch_from_github(source.url, headers, stream=True)
+            except requests.HTTPError as e:
+                # Plage refusée : le fichier partiel ne correspond plus, la tentative suivante repart de zéro
+                if e.response is not None and e.response.status_code == 416:
+                    download.discard()
+                raise
+            unchanged = skip_unchanged and not download.resuming and fetch_cache.is_unchanged(source.url, response)
+            if not unchanged:
+                raw = HashingReader(download.attach(response))
+                if not stream:
+                    content = raw.read()
+                    download_stage.bytes = download.downloaded
+        if unchanged:
+            logger.info(f"{source.name} inchangée depuis le dernier chargement (304), aucun rechargement")
+            download.discard()
+            return "no-op", 0, 0, None
+
+        if stream:
+            header, reader = read_stream_header(raw)
+            columns = select_columns(header, source.columns, source.required_columns, source.table)
+            with telemetry.stage("load", source.table) as load:
+                staged = stage_stream(
+                    cursor, open_csv_stream(reader, dtypes=source.dtypes, columns=columns), source.table, LOAD_TIMESTAMP,
+                    incremental, source.key, source.watermark_column,
+                )
+                load.rows, load.bytes = staged.rows, raw.bytes_read
+                download_stage.bytes = download.downloaded
+            content_hash, size = raw.hexdigest(), raw.bytes_read
+            # L'empreinte n'est connue qu'une fois le flux lu : le staging est abandonné si elle est inchangée
+            if skip_unchanged and fetch_cache.same_content(source.url, content_hash):
+                logger.info(f"{source.name} inchangée depuis le dernier chargement (même empreinte), aucun rechargement")
+                discard_staged(cursor, [staged])
+                download.discard()
+                return "no-op", 0, size, None
+        else:
+            content_hash, size = raw.hexdigest(), len(content)
+            if skip_unchanged and fetch_cache.same_content(source.url, content_hash):
+                logger.info(f"{source.name} inchangée depuis le dernier chargement (même empreinte), aucun rechargement")
+                download.discard()
+                return "no-op", 0, size, None
+
+            columns = select_columns(parse_header(content), source.columns, source.required_columns, source.table)
+            with telemetry.stage("parse", source.table) as parse:
+                df = read_csv_content(content, source.dtypes, columns)
+                parse.rows, parse.bytes = len(df), size
+            logger.info(f"Données téléchargées pour {source.name}: {len(df)} lignes")
+            with telemetry.stage("load", source.table) as load:
+                staged = stage_dataframe(
+                    cursor, df, source.table, LOAD_TIMESTAMP, incremental, source.key, source.watermark_column
+                )
+                load.rows = staged.rows
+
+        def published():
+            # Le cache et le fichier partiel ne reflètent la source qu'une fois celle-ci publiée
+            if fetch_cache is not None:
+                fetch_cache.store(source.url, response, content_hash, source.table)
+            download.discard()
+
+        return "success", staged.rows, size, Publication(staged, published)
+
+def ingest_with_retries(conn, source, incremental=False, retries=SOURCE_RETRIES, fetch_cache=None, skip_unchanged=True,
+                        telemetry=None):
+    """
+    Charge une source dans sa table de staging en réessayant jusqu'à retries fois avec un délai exponentiel.
+    Une colonne requise manquante n'est pas réessayée : l'extrait ne changera pas d'ici là.
+    """
+    start = time.perf_counter()
+    for attempt in range(1, retries + 2):
+        try:
+            status, rows, size, publication = ingest_source(conn, source, incremental, fetch_cache, skip_unchanged, telemetry)
+            return SourceResult(
+                source.name, source.table, status, rows, size, attempt, time.perf_counter() - start, None, publication
+            )
+        except MissingColumnsError as e:
+            logger.error(str(e))
+            return SourceResult(source.name, source.table, "failed", 0, 0, attempt, time.perf_counter() - start, str(e))
+        except Exception as e:
+            if attempt > retries:
+                return SourceResult(source.name, source.table, "failed", 0, 0, attempt, time.perf_counter() - start, str(e))
+            delay = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            logger.warning(f"Échec du chargement de {source.name} (tentative {attempt}), nouvel essai dans {delay:.0f}s")
+            time.sleep(delay)
+
+def publish_results(conn, results, complete, telemetry, publish_partial=PUBLISH_PARTIAL):
+    """
+    Publie ensemble, dans une transaction, les sources chargées avec succès. Si une source a échoué
+    ou n'a pas été chargée (complete faux), rien n'est publié, sauf avec publish_partial : les
+    lecteurs ne voient jamais des sources issues d'exécutions différentes. Les sources non publiées
+    passent au statut 'discarded' ; leur téléchargement complet reste disponible pour la prochaine exécution.
+    """
+    pending = [result for result in results if result.publication is not None]
+    if not pending:
+        return
+
+    failed = [result.source for result in results if result.status == "failed"]
+    staged = [result.publication.staged for result in pending]
+    if (failed or not complete) and not publish_partial:
+        reason = f"échec de {', '.join(failed)}" if failed else "exécution interrompue"
+        logger.error(f"Aucune source publiée ({reason}): {', '.join(result.source for result in pending)} écartées")
+        discard_staged(conn, staged)
+        for result in pending:
+            result.status, result.error = "discarded", f"Non publiée: {reason}"
+        return
+
     try:
-        logger.info(f"Téléchargement du fichier depuis {url}")
-        response = requests.get(url)
-        response.raise_for_status()
-
-        # Convertir le contenu en objet lisible par pandas
-        csv_data = io.StringIO(response.text)
-        
-        return pd.read_csv(csv_data, sep=',')
+        with telemetry.stage("publish") as publish:
+            publish_staged(conn, staged)
+            publish.rows = sum(table.rows for table in staged)
     except Exception as e:
-        logger.error(f"Erreur lors du téléchargement depuis {url}: {e}")
-        raise
+        discard_staged(conn, staged)
+        for result in pending:
+            result.status, result.error = "failed", f"Publication impossible: {e}"
+        return
+
+    for result in pending:
+        result.publication.on_published()
+
+def log_summary(results):
+    """
+    Affiche le résumé de l'exécution, une ligne par source
+    """
+    logger.info("Résumé de l'exécution ETL:")
+    for result in sorted(results, key=lambda r: r.source):
+        line = (
+            f"  {result.source:<20} {result.status:<8} {result.rows:>10} lignes {result.bytes / 1024 / 1024:>9.1f} Mo "
+            f"{result.duration:>8.1f}s {result.attempts} tentative(s)"
+        )
+        if result.error:
+            logger.error(f"{line} - {result.error}")
+        else:
+            logger.info(line)
+
+def check_columns(sources=None):
+    """
+    Compare, pour chaque source, l'en-tête de l'extrait, les colonnes déclarées dans sources.yml
+    et les colonnes utilisées par les modèles bronze.
+    Retourne (complet, déclarations) : complet est False si une colonne utilisée n'est pas déclarée
+    ou si une colonne requise manque ; déclarations est le YAML à ajouter à sources.yml (type inféré
+    sur le premier bloc) pour les colonnes utilisées mais non déclarées, vide sinon.
+    """
+    sources = sources if sources is not None else load_sources()
+    declared_columns, references = load_columns(), bronze_references()
+    complete, declarations = True, []
+    for source in sources:
+        response = fetch_from_github(source.url, stream=True)
+        try:
+            response.raw.decode_content = True
+            header, reader = read_stream_header(response.raw)
+            columns, required_columns = declared_columns.get(source.table, ((), ()))
+            used = [column for column in header if column in references.get(source.table, set())]
+            undeclared = [column for column in used if column not in columns]
+            missing = [column for column in required_columns if column not in header]
+            unused = [column for column in columns if column not in used and column in header]
+            ignored = [column for column in header if column not in columns] if columns else []
+            logger.info(
+                f"{source.table}: {len(header)} colonnes dans l'extrait, {len(used)} utilisées par bronze, "
+                f"{len(columns)} déclarées, {len(ignored)} ignorées à l'ingestion"
+            )
+            if missing:
+                logger.error(f"{source.table}: colonnes requises absentes de l'extrait: {', '.join(missing)}")
+            if unused:
+                logger.warning(f"{source.table}: colonnes déclarées non utilisées par bronze: {', '.join(unused)}")
+            if undeclared:
+                logger.error(f"{source.table}: colonnes utilisées par bronze non déclarées dans sources.yml")
+                schema = open_csv_stream(reader, columns=undeclared).read_next_batch().schema
+                declarations.append(f"      - name: {source.table}\n        columns:")
+                for column in schema:
+                    declarations.append(
+                        f"          - name: {column.name}\n            data_type: {DUCKDB_TYPES.get(str(column.type), 'VARCHAR')}"
+                    )
+            complete = complete and not missing and not undeclared
+        finally:
+            response.close()
+    return complete, "\n".join(declarations)
 
-def run_etl():
+def run_etl(full_refresh=FULL_REFRESH, sources=None, max_workers=MAX_WORKERS, retries=SOURCE_RETRIES, strict=STRICT_MODE,
+            telemetry=None):
     """
-    Exécute le processus ETL complet
+    Exécute le processus ETL complet.
+    Les sources du registre sont chargées en parallèle sur max_workers threads, chacune dans sa table
+    de staging, puis publiées ensemble dans une transaction ;
+    celles qui n'ont pas changé depuis le dernier chargement sont ignorées (statut 'no-op').
+    En mode strict, le premier échec annule les sources restantes.
+    En mode incrémental, full_refresh force un rechargement complet des tables.
+    Les mesures de chaque étape sont collectées dans telemetry puis enregistrées
+    dans pipeline.pipeline_runs et pipeline.pipeline_stage_metrics.
+    Retourne la liste des SourceResult.
     """
+    telemetry = telemetry or Telemetry("etl")
+    results = []
     try:
-        logger.info("Démarrage du processus ETL GitHub → MotherDuck")
-        
-        opportunities_df = download_from_github(GITHUB_OPPORTUNITIES_URL)
-        propositions_df = download_from_github(GITHUB_PROPOSITIONS_URL)
-        
-        logger.info(f"Données téléchargées: {len(opportunities_df)} opportunités, {len(propositions_df)} propositions")
-        
+        incremental = INCREMENTAL and not full_refresh
+        sources = sources if sources is not None else load_sources()
+        logger.info(
+            f"Démarrage du processus ETL GitHub → MotherDuck (mode {LOAD_MODE}, incrémental: {incremental}, "
+            f"{len(sources)} sources, {max_workers} workers)"
+        )
+
         conn = connect_to_motherduck()
         create_schema_if_not_exists(conn)
-        
-        opps_count = load_data_to_motherduck(conn, opportunities_df, "raw_opportunites", LOAD_TIMESTAMP)
-        props_count = load_data_to_motherduck(conn, propositions_df, "raw_propositions", LOAD_TIMESTAMP)
-                                                                                                        
-        logger.info(f"Processus ETL terminé avec succès: {opps_count} opportunités et {props_count} propositions chargées")
-        
+        # Un rechargement complet ignore le cache mais le met à jour
+        fetch_cache = FetchCache() if FETCH_CACHE_ENABLED else None
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = [
+                executor.submit(
+                    ingest_with_retries, conn, source, incremental, retries, fetch_cache, not full_refresh, telemetry
+                )
+                for source in sources
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if strict and result.status == "failed":
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    raise RuntimeError(f"Échec de la source {result.source} en mode strict: {result.error}")
+        finally:
+            executor.shutdown(wait=True)
+            publish_results(conn, results, len(results) == len(sources), telemetry)
+            log_summary(results)
+
+        unchanged = [result.table for result in results if result.status == "no-op"]
+        if unchanged:
+            logger.info(f"Tables inchangées (no-op): {', '.join(unchanged)}")
+
+        failed = [result.source for result in results if result.status == "failed"]
+        if failed:
+            logger.error(f"Processus ETL terminé avec des erreurs: {', '.join(failed)}")
+        else:
+            logger.info(f"Processus ETL terminé avec succès: {sum(result.rows for result in results)} lignes chargées")
+
+        return results
+
     except Exception as e:
         logger.error(f"Erreur dans le processus ETL: {e}")
         raise
     finally:
         if 'conn' in locals():
+            incomplete = any(result.status == "failed" for result in results) or len(results) < len(sources)
+            telemetry.write(conn, "failed" if incomplete else "success")
             conn.close()
-            logger.info("Connexion à MotherDuck fermée")
+            logger.info("Connexion à MotherDuck fermée")
\ No newline at end of file
@@ -1,4 +1,31 @@
-from etl_process import run_etl
+import argparse
+import sys
+
+from config.constants import FULL_REFRESH, MAX_WORKERS, STRICT_MODE
+from etl_process import check_columns, run_etl
 
 if __name__ == "__main__":
-    run_etl()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ETL GitHub → MotherDuck")
+    parser.add_argument("--full-refresh", action="store_true", help="Force un rechargement complet en mode incrémental")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Nombre de sources chargées en parallèle")
+    parser.add_argument("--strict", action="store_true", help="Annule les sources restantes au premier échec")
+    parser.add_argument(
+        "--check-columns", action="store_true",
+        help="Compare les colonnes des extraits, de sources.yml et des modèles bronze, sans rien charger",
+    )
+    args = parser.parse_args()
+
+    if args.check_columns:
+        complete, declarations = check_columns()
+        # Déclarations à copier dans sources.yml, seules sur la sortie standard (les journaux vont sur stderr)
+        if declarations:
+            print(declarations)
+        sys.exit(0 if complete else 1)
+
+    results = run_etl(
+        full_refresh=args.full_refresh or FULL_REFRESH,
+        max_workers=args.workers,
+        strict=args.strict or STRICT_MODE,
+    )
+    if any(result.status == "failed" for result in results):
+        sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Fixtures communes aux tests de l'ETL : modules de data-pipeline/src importables
+et serveur HTTP local servant les extraits CSV.
+"""
+import hashlib
+import os
+import sys
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """Sert les fichiers d'un répertoire sans journaliser chaque requête"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ValidatingHandler(QuietHandler):
+    """
+    Sert les fichiers avec un ETag dérivé de leur contenu : 304 sur If-None-Match à jour,
+    206 sur une plage dont l'If-Range est à jour, 200 sinon.
+    Chaque requête est ajoutée à requests avec le statut de la réponse.
+    """
+
+    def __init__(self, *args, requests, **kwargs):
+        # La requête est traitée par le constructeur parent : requests doit être défini avant
+        self.requests = requests
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        with open(os.path.join(self.directory, self.path.lstrip("/")), "rb") as f:
+            body = f.read()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        byte_range = self.headers.get("Range")
+
+        if self.headers.get("If-None-Match") == etag:
+            status, start = 304, None
+        elif byte_range and self.headers.get("If-Range") == etag:
+            status, start = 206, int(byte_range.removeprefix("bytes=").rstrip("-"))
+        else:
+            status, start = 200, 0
+        self.requests.append((dict(self.headers), status))
+
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        if start is not None:
+            self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        if start is not None:
+            self.wfile.write(body[start:])
+
+
+@pytest.fixture
+def serve():
+    """
+    Démarre un serveur HTTP local, sur un port libre, servant directory et retourne son URL de base
+    """
+    servers = []
+
+    def start(directory, handler=QuietHandler):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=str(directory)))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def serve_validated(serve):
+    """
+    Démarre un serveur ValidatingHandler sur directory et retourne (URL de base, requêtes reçues)
+    """
+    def start(directory):
+        requests = []
+        return serve(directory, handler=partial(ValidatingHandler, requests=requests)), requests
+
+    return start
@@ -0,0 +1,128 @@
+"""
+Contrôle des colonnes (main.py --check-columns) : déclarations YAML des colonnes utilisées par
+bronze mais absentes de sources.yml, échec si une colonne requise manque à l'extrait.
+"""
+import json
+import os
+import subprocess
+import sys
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+import etl_process
+from config.schema import bronze_references, load_columns
+from config.sources import Source
+
+MAIN = Path(__file__).resolve().parents[1] / "src" / "main.py"
+
+SOURCES_YML = """
+version: 2
+sources:
+  - name: source
+    tables:
+      - name: raw_agences
+        columns:
+          - name: Id
+            data_type: VARCHAR
+          - name: CreatedDate
+            data_type: TIMESTAMP
+          - name: Region__c
+            data_type: VARCHAR
+            meta:
+              required: false
+"""
+
+BRONZE_AGENCES = """
+SELECT Id AS agence_id, CreatedDate AS date_creation, Region__c AS region, Effectif__c AS effectif
+FROM {{ source('source', 'raw_agences') }}
+"""
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """sources.yml et modèles bronze d'un projet dbt minimal, lus par check_columns"""
+    bronze = tmp_path / "models" / "bronze"
+    bronze.mkdir(parents=True)
+    (tmp_path / "models" / "sources.yml").write_text(SOURCES_YML, encoding="utf-8")
+    (bronze / "bronze_agences.sql").write_text(BRONZE_AGENCES, encoding="utf-8")
+    schema_file, models_dir = str(tmp_path / "models" / "sources.yml"), str(bronze)
+    monkeypatch.setattr(etl_process, "load_columns", partial(load_columns, schema_file))
+    monkeypatch.setattr(etl_process, "bronze_references", partial(bronze_references, models_dir))
+    return {"SOURCES_SCHEMA_FILE": schema_file, "BRONZE_MODELS_DIR": models_dir}
+
+
+def serve_extract(serve, tmp_path, content):
+    directory = tmp_path / "www"
+    directory.mkdir()
+    (directory / "agences.csv").write_text(content, encoding="utf-8")
+    return serve(directory)
+
+
+def test_undeclared_columns_are_declared_in_yaml(project, serve, tmp_path):
+    base_url = serve_extract(
+        serve, tmp_path,
+        "Id,CreatedDate,Region__c,Effectif__c,Commentaire__c\n"
+        "a-1,2024-01-05 10:00:00,Nord,12,x\n"
+        "a-2,2024-01-06 10:00:00,Sud,7,y\n",
+    )
+
+    complete, declarations = etl_process.check_columns(
+        [Source(name="agences", url=f"{base_url}/agences.csv", table="raw_agences")]
+    )
+
+    # Effectif__c est lu par bronze sans être déclaré ; Commentaire__c n'est pas utilisé
+    assert not complete
+    assert declarations == (
+        "      - name: raw_agences\n"
+        "        columns:\n"
+        "          - name: Effectif__c\n"
+        "            data_type: BIGINT"
+    )
+
+
+def test_missing_required_column_is_incomplete(project, serve, tmp_path):
+    # Region__c n'est pas requise (meta.required: false), CreatedDate l'est
+    base_url = serve_extract(serve, tmp_path, "Id,Effectif__c\na-1,12\n")
+
+    complete, declarations = etl_process.check_columns(
+        [Source(name="agences", url=f"{base_url}/agences.csv", table="raw_agences")]
+    )
+
+    assert not complete
+    assert "Effectif__c" in declarations
+
+
+def test_complete_columns(project, serve, tmp_path):
+    # Effectif__c, absente de l'extrait, n'est pas comptée comme utilisée par bronze
+    base_url = serve_extract(serve, tmp_path, "Id,CreatedDate\na-1,2024-01-05 10:00:00\n")
+
+    assert etl_process.check_columns(
+        [Source(name="agences", url=f"{base_url}/agences.csv", table="raw_agences")]
+    ) == (True, "")
+
+
+@pytest.mark.parametrize("content, exit_code, stdout", [
+    ("Id,CreatedDate,Effectif__c\na-1,2024-01-05 10:00:00,12\n", 1, "      - name: raw_agences\n"),
+    ("Id,CreatedDate\na-1,2024-01-05 10:00:00\n", 0, ""),
+])
+def test_main_exit_code(project, serve, tmp_path, content, exit_code, stdout):
+    base_url = serve_extract(serve, tmp_path, content)
+    registry = tmp_path / "sources.json"
+    # Les deux sources par défaut sont remplacées : aucune requête vers GitHub
+    registry.write_text(json.dumps([
+        {"name": name, "url": f"{base_url}/agences.csv", "table": "raw_agences"}
+        for name in ("opportunites", "propositions")
+    ]), encoding="utf-8")
+
+    process = subprocess.run(
+        [sys.executable, str(MAIN), "--check-columns"],
+        env={**os.environ, **project, "SOURCES_FILE": str(registry)},
+        capture_output=True, text=True, timeout=60,
+    )
+
+    assert process.returncode == exit_code, process.stderr
+    # Seules les déclarations YAML vont sur la sortie standard
+    assert process.stdout.startswith(stdout)
+    assert bool(process.stdout) == bool(stdout)
@@ -0,0 +1,119 @@
+"""
+Cache des validateurs HTTP et des empreintes (FetchCache) : une source inchangée n'est pas
+rechargée, un contenu modifié invalide l'entrée. Serveur HTTP local gérant ETag et If-None-Match.
+"""
+import os
+from functools import partial
+
+import duckdb
+import pytest
+
+import etl_process
+from config.database import create_schema_if_not_exists, publish_staged
+from config.fetch_cache import FetchCache, ResumableDownload
+from config.incremental import table_exists
+from config.schema import load_schema
+from config.sources import Source
+
+CSV = (
+    "Id,RecordTypeId,Id_ApporteurWeb__c,Age_emprunteur__c,Deja_souscrit_credit_immo__c,"
+    "MontPretPricip__c,TechMail_CategorieProfessionnelleCoEmpru__c,PropFinal__c,CreatedDate\n"
+    "006A,0121a,AW1,34,true,185000.50,Fonctionnaire,P1,2024-01-05 10:15:00\n"
+    "006B,0121a,AW2,41,false,92000,Retraité,P2,2024-02-11 08:00:00\n"
+)
+
+
+@pytest.fixture
+def extract(tmp_path):
+    path = tmp_path / "www" / "opportunites.csv"
+    path.parent.mkdir()
+    path.write_text(CSV, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def server(extract, serve_validated):
+    base_url, requests = serve_validated(extract.parent)
+    return base_url + "/opportunites.csv", requests
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(etl_process, "ResumableDownload", partial(ResumableDownload, directory=str(tmp_path / "partial")))
+    with duckdb.connect(str(tmp_path / "fetch_cache.duckdb")) as conn:
+        create_schema_if_not_exists(conn)
+        yield conn
+
+
+@pytest.fixture
+def fetch_cache(tmp_path):
+    return FetchCache(str(tmp_path / "cache"))
+
+
+def ingest(conn, url, fetch_cache):
+    """Charge puis publie url dans source.raw_opportunites et retourne le statut"""
+    source = Source(
+        name="opportunites", url=url, table="raw_opportunites", dtypes=load_schema()["raw_opportunites"]
+    )
+    status, rows, size, publication = etl_process.ingest_source(conn, source, fetch_cache=fetch_cache)
+    if publication is not None:
+        publish_staged(conn, [publication.staged])
+        publication.on_published()
+    return status
+
+
+def test_unchanged_source_is_noop(conn, server, fetch_cache, tmp_path):
+    url, requests = server
+    assert ingest(conn, url, fetch_cache) == "success"
+    etag = fetch_cache.get(url)["etag"]
+
+    assert ingest(conn, url, fetch_cache) == "no-op"
+    headers, status = requests[-1]
+    assert (headers["If-None-Match"], status) == (etag, 304)
+    # Aucun fichier partiel ne reste après un no-op
+    assert not [path for path in (tmp_path / "partial").iterdir() if path.suffix != ".lock"]
+
+
+def test_changed_content_invalidates_etag(conn, server, extract, fetch_cache):
+    url, requests = server
+    assert ingest(conn, url, fetch_cache) == "success"
+    etag = fetch_cache.get(url)["etag"]
+
+    extract.write_text(CSV.replace("185000.50", "190000.00"), encoding="utf-8")
+    assert ingest(conn, url, fetch_cache) == "success"
+
+    headers, status = requests[-1]
+    assert (headers["If-None-Match"], status) == (etag, 200)
+    assert fetch_cache.get(url)["etag"] != etag
+    amount = conn.execute("SELECT MontPretPricip__c FROM source.raw_opportunites WHERE Id = '006A'").fetchone()[0]
+    assert float(amount) == 190000.0
+
+
+@pytest.mark.parametrize("mode", ["batch", "stream"])
+def test_identical_content_is_noop(conn, extract, serve, fetch_cache, monkeypatch, mode):
+    monkeypatch.setattr(etl_process, "LOAD_MODE", mode)
+    url = serve(extract.parent) + "/opportunites.csv"
+    assert ingest(conn, url, fetch_cache) == "success"
+
+    # Fichier réécrit à l'identique : nouveau Last-Modified, le serveur répond 200 avec les mêmes octets
+    stat = extract.stat()
+    os.utime(extract, (stat.st_atime, stat.st_mtime + 60))
+
+    assert ingest(conn, url, fetch_cache) == "no-op"
+    assert not table_exists(conn, "source", "_staging_raw_opportunites")
+
+
+@pytest.mark.parametrize("mode", ["batch", "stream"])
+def test_revalidated_partial_file_with_same_content_is_noop(conn, server, fetch_cache, tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(etl_process, "LOAD_MODE", mode)
+    url, requests = server
+    assert ingest(conn, url, fetch_cache) == "success"
+
+    # Fichier partiel complet laissé par une exécution dont les sources n'ont pas été publiées
+    download = etl_process.ResumableDownload(url)
+    download.attach(etl_process.fetch_from_github(url, download.request_headers(), stream=True)).read()
+    download.close()
+
+    assert ingest(conn, url, fetch_cache) == "no-op"
+    assert requests[-1][1] == 304
+    assert not table_exists(conn, "source", "_staging_raw_opportunites")
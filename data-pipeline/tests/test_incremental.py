@@ -0,0 +1,77 @@
+"""
+Chargement incrémental sur un fichier DuckDB local : staging (stage_merge), publication
+(apply_merge) et watermark (save_watermark).
+"""
+import duckdb
+import pandas as pd
+import pytest
+
+from config.database import create_schema_if_not_exists, publish_staged, stage_dataframe
+from config.incremental import get_watermark, table_exists
+
+LOAD_TIMESTAMP = "2024-03-01 00:00:00"
+
+
+def extract(*rows):
+    return pd.DataFrame(rows, columns=["Id", "Montant", "CreatedDate", "IsDeleted"])
+
+
+def load(conn, df, incremental=True):
+    """Stage puis publie df dans source.raw_opportunites et retourne la table de staging publiée"""
+    staged = stage_dataframe(conn, df, "raw_opportunites", LOAD_TIMESTAMP, incremental=incremental)
+    publish_staged(conn, [staged])
+    return staged
+
+
+def stored(conn):
+    return conn.execute("SELECT Id, Montant FROM source.raw_opportunites ORDER BY Id").fetchall()
+
+
+@pytest.fixture
+def conn(tmp_path):
+    with duckdb.connect(str(tmp_path / "incremental.duckdb")) as conn:
+        create_schema_if_not_exists(conn)
+        load(conn, extract(
+            ("006A", 100, "2024-01-05 10:00:00", "false"),
+            ("006B", 200, "2024-01-10 10:00:00", "false"),
+            ("006C", 300, "2024-01-15 10:00:00", "false"),
+        ), incremental=False)
+        yield conn
+
+
+def test_tombstone_deletes_stored_row(conn):
+    staged = load(conn, extract(
+        ("006A", 100, "2024-01-05 10:00:00", "false"),
+        ("006B", 200, "2024-01-10 10:00:00", "true"),
+        ("006C", 300, "2024-01-15 10:00:00", "false"),
+    ))
+
+    assert (staged.mode, staged.rows) == ("merge", 1)
+    assert stored(conn) == [("006A", 100), ("006C", 300)]
+    # La table de staging est supprimée une fois fusionnée
+    assert not table_exists(conn, "source", "_staging_raw_opportunites")
+
+
+def test_watermark_never_decreases(conn):
+    assert get_watermark(conn, "raw_opportunites") == pd.Timestamp("2024-01-15 10:00:00")
+
+    # Extrait plus ancien que le watermark, avec une ligne modifiée : fusionnée sans faire reculer le watermark
+    staged = load(conn, extract(("006A", 150, "2024-01-05 10:00:00", "false")))
+
+    assert (staged.mode, staged.rows) == ("merge", 1)
+    assert stored(conn) == [("006A", 150), ("006B", 200), ("006C", 300)]
+    assert get_watermark(conn, "raw_opportunites") == pd.Timestamp("2024-01-15 10:00:00")
+
+    load(conn, extract(("006D", 400, "2024-02-01 09:00:00", "false")))
+    assert get_watermark(conn, "raw_opportunites") == pd.Timestamp("2024-02-01 09:00:00")
+
+
+def test_unchanged_extract_stages_no_rows(conn):
+    staged = load(conn, extract(
+        ("006A", 100, "2024-01-05 10:00:00", "false"),
+        ("006B", 200, "2024-01-10 10:00:00", "false"),
+        ("006C", 300, "2024-01-15 10:00:00", "false"),
+    ))
+
+    assert (staged.mode, staged.rows) == ("merge", 0)
+    assert stored(conn) == [("006A", 100), ("006B", 200), ("006C", 300)]
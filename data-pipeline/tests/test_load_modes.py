@@ -0,0 +1,87 @@
+"""
+Équivalence des modes de chargement : un même extrait CSV, servi par un serveur HTTP local
+et chargé dans un fichier DuckDB local, donne la même table en mode batch et en mode stream
+(types, NULL et valeurs).
+"""
+from functools import partial
+
+import duckdb
+import pyarrow as pa
+import pytest
+
+import etl_process
+from config.database import create_schema_if_not_exists, publish_staged, stage_stream
+from config.fetch_cache import ResumableDownload
+from config.incremental import table_exists
+from config.schema import load_schema
+from config.sources import Source
+
+CSV = (
+    "Id,RecordTypeId,Id_ApporteurWeb__c,Age_emprunteur__c,Deja_souscrit_credit_immo__c,"
+    "MontPretPricip__c,TechMail_CategorieProfessionnelleCoEmpru__c,PropFinal__c,CreatedDate\n"
+    "006A,0121a,AW1,34,true,185000.50,Fonctionnaire,P1,2024-01-05 10:15:00\n"
+    '006B,0121a,,41,false,,,"",2024-02-11 08:00:00\n'
+    "006C,0121b,AW2,,,92000,Retraité,,\n"
+)
+
+
+def load(conn, url, mode, monkeypatch, tmp_path):
+    """Charge l'extrait url dans source.raw_opportunites en mode mode et retourne la table"""
+    monkeypatch.setattr(etl_process, "LOAD_MODE", mode)
+    monkeypatch.setattr(etl_process, "ResumableDownload", partial(ResumableDownload, directory=str(tmp_path / mode)))
+    source = Source(
+        name="opportunites", url=url, table="raw_opportunites", dtypes=load_schema()["raw_opportunites"]
+    )
+
+    create_schema_if_not_exists(conn)
+    status, rows, size, publication = etl_process.ingest_source(conn, source)
+    assert status == "success"
+    publish_staged(conn, [publication.staged])
+    publication.on_published()
+
+    columns = conn.execute("DESCRIBE source.raw_opportunites").fetchall()
+    return [column[:2] for column in columns], conn.execute("SELECT * FROM source.raw_opportunites ORDER BY Id").fetchall()
+
+
+@pytest.fixture
+def url(tmp_path, serve):
+    (tmp_path / "opportunites.csv").write_text(CSV, encoding="utf-8")
+    return serve(tmp_path) + "/opportunites.csv"
+
+
+def test_batch_and_stream_load_identical_tables(url, monkeypatch, tmp_path):
+    tables = {}
+    for mode in ("batch", "stream"):
+        with duckdb.connect(str(tmp_path / f"{mode}.duckdb")) as conn:
+            tables[mode] = load(conn, url, mode, monkeypatch, tmp_path)
+
+    assert tables["batch"] == tables["stream"]
+
+    types, rows = tables["stream"]
+    assert dict(types)["CreatedDate"] == "TIMESTAMP"
+    # Champs vides, entre guillemets ou non : NULL et non '' dans les deux modes
+    by_id = {row[0]: dict(zip((name for name, _ in types), row)) for row in rows}
+    assert by_id["006B"]["Id_ApporteurWeb__c"] is None
+    assert by_id["006B"]["TechMail_CategorieProfessionnelleCoEmpru__c"] is None
+    assert by_id["006B"]["PropFinal__c"] is None
+    assert by_id["006C"]["CreatedDate"] is None
+
+
+class FailingReader:
+    """Lecteur Arrow dont le flux est coupé après le schéma"""
+
+    def __init__(self, schema):
+        self.schema = schema
+
+    def __iter__(self):
+        raise ConnectionError("flux interrompu")
+
+
+def test_failed_stream_raises_original_error(tmp_path):
+    with duckdb.connect(str(tmp_path / "stream.duckdb")) as conn:
+        create_schema_if_not_exists(conn)
+        schema = pa.schema([("Id", pa.string())])
+        with pytest.raises(ConnectionError, match="flux interrompu"):
+            stage_stream(conn, FailingReader(schema), "raw_opportunites", "2024-01-01 00:00:00")
+        # La transaction est annulée : aucune table de staging partielle
+        assert not table_exists(conn, "source", "_staging_raw_opportunites")
@@ -0,0 +1,28 @@
+"""
+Profils écrits par DuckDB pendant l'exécution d'une requête (macros/profiling.sql) :
+lecture du fichier JSON et enregistrement dans pipeline.query_profiles.
+"""
+import duckdb
+
+from config.profiling import load_profile, save_profiles
+
+
+def test_profile_written_during_build_is_loaded_and_saved(tmp_path):
+    path = tmp_path / "segment_cube.json"
+    with duckdb.connect(str(tmp_path / "profiles.duckdb")) as conn:
+        # Séquence des hooks : profilage actif pendant la requête du modèle, désactivé juste après
+        conn.execute(f"SET enable_profiling = 'json'; SET profiling_output = '{path}'")
+        conn.execute(
+            "CREATE TABLE segment_cube AS SELECT range % 7 AS segment, COUNT(*) AS n FROM range(100000) GROUP BY 1;"
+            " RESET enable_profiling; RESET profiling_output"
+        )
+        conn.execute("INSERT INTO segment_cube SELECT * FROM segment_cube")
+
+        profile = load_profile(path, top=3)
+        assert [operator["rank"] for operator in profile.operators] == [1, 2, 3]
+        assert "HASH_GROUP_BY" in {operator["operator"] for operator in profile.operators}
+        assert profile.latency > 0
+
+        save_profiles(conn, "run-1", {"model.immobilier_courtage.segment_cube": profile}, "abc123")
+        rows = conn.execute("SELECT target, code_version, rank FROM pipeline.query_profiles ORDER BY rank").fetchall()
+    assert rows == [("model.immobilier_courtage.segment_cube", "abc123", rank) for rank in (1, 2, 3)]
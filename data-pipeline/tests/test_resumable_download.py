@@ -0,0 +1,88 @@
+"""
+Reprise d'un téléchargement interrompu (ResumableDownload) contre un serveur HTTP local
+qui gère ETag et Range/If-Range.
+"""
+import pytest
+
+import etl_process
+from config.fetch_cache import ResumableDownload
+
+CSV = (
+    "Id,RecordTypeId,Id_ApporteurWeb__c,Age_emprunteur__c,Deja_souscrit_credit_immo__c,"
+    "MontPretPricip__c,TechMail_CategorieProfessionnelleCoEmpru__c,PropFinal__c,CreatedDate\n"
+    "006A,0121a,AW1,34,true,185000.50,Fonctionnaire,P1,2024-01-05 10:15:00\n"
+    "006B,0121a,AW2,41,false,92000,Retraité,P2,2024-02-11 08:00:00\n"
+)
+
+
+@pytest.fixture
+def extract(tmp_path):
+    path = tmp_path / "www" / "opportunites.csv"
+    path.parent.mkdir()
+    path.write_text(CSV, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def server(extract, serve_validated):
+    base_url, requests = serve_validated(extract.parent)
+    return base_url + "/opportunites.csv", requests
+
+
+def interrupted_download(url, directory):
+    """Commence le téléchargement de url puis l'interrompt après quelques octets"""
+    download = ResumableDownload(url, directory=directory)
+    download.attach(etl_process.fetch_from_github(url, download.request_headers(), stream=True))
+    download.read(40)
+    download.close()
+    return download.size
+
+
+def resume(url, directory):
+    """Nouvelle tentative sur url : retourne le contenu relu et le téléchargement"""
+    download = ResumableDownload(url, directory=directory)
+    response = etl_process.fetch_from_github(url, download.request_headers(), stream=True)
+    content = download.attach(response).read()
+    download.close()
+    return content, download
+
+
+def test_interrupted_download_resumes_with_range(server, tmp_path):
+    url, requests = server
+    received = interrupted_download(url, str(tmp_path / "partial"))
+
+    content, download = resume(url, str(tmp_path / "partial"))
+
+    headers, status = requests[-1]
+    assert headers["Range"] == f"bytes={received}-"
+    assert status == 206
+    assert content == CSV.encode()
+    # Seule la suite de l'extrait a été téléchargée
+    assert download.downloaded == len(CSV.encode()) - received
+
+
+def test_changed_content_restarts_interrupted_download(server, extract, tmp_path):
+    url, requests = server
+    interrupted_download(url, str(tmp_path / "partial"))
+    changed = CSV.replace("185000.50", "190000.00")
+    extract.write_text(changed, encoding="utf-8")
+
+    content, download = resume(url, str(tmp_path / "partial"))
+
+    # If-Range ne correspond plus à l'ETag : le serveur renvoie tout le contenu, relu depuis le début
+    assert requests[-1][1] == 200
+    assert content == changed.encode()
+    assert download.downloaded == len(changed.encode())
+
+
+def test_complete_partial_file_revalidated_with_304(server, tmp_path):
+    url, requests = server
+    download = ResumableDownload(url, directory=str(tmp_path / "partial"))
+    download.attach(etl_process.fetch_from_github(url, download.request_headers(), stream=True)).read()
+    download.close()
+
+    content, download = resume(url, str(tmp_path / "partial"))
+
+    assert requests[-1][1] == 304
+    assert content == CSV.encode()
+    assert download.downloaded == 0
@@ -0,0 +1,142 @@
+"""
+Exécution de l'ETL sur plusieurs sources : chargement concurrent, mode strict, réessais avec
+délai exponentiel et registre des sources surchargé par un fichier JSON.
+"""
+import json
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler
+
+import duckdb
+import pytest
+
+import etl_process
+from config.database import connect_to_motherduck, create_schema_if_not_exists
+from config.incremental import table_exists
+from config.schema import load_schema
+from config.sources import Source, load_sources
+
+
+class FlakyHandler(SimpleHTTPRequestHandler):
+    """
+    Répond 503 aux failures[0] premières requêtes, puis sert les fichiers. Avec barrier, chaque
+    requête attend que toutes les requêtes attendues par la barrière soient en cours.
+    """
+
+    def __init__(self, *args, failures, barrier=None, **kwargs):
+        self.failures, self.barrier = failures, barrier
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.barrier is not None:
+            self.barrier.wait()
+        if self.failures[0] > 0:
+            self.failures[0] -= 1
+            self.send_error(503)
+            return
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def extracts(tmp_path):
+    directory = tmp_path / "www"
+    directory.mkdir()
+    for name in ("agences", "courtiers"):
+        (directory / f"{name}.csv").write_text(
+            "Id,CreatedDate\n" f"{name}-1,2024-01-05 10:00:00\n" f"{name}-2,2024-01-06 10:00:00\n", encoding="utf-8"
+        )
+    return directory
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Fichier DuckDB local utilisé par run_etl à la place de MotherDuck"""
+    path = str(tmp_path / "etl.duckdb")
+    monkeypatch.setattr(etl_process, "connect_to_motherduck", partial(connect_to_motherduck, path))
+    monkeypatch.setattr(etl_process, "FETCH_CACHE_ENABLED", False)
+    monkeypatch.setattr(etl_process, "RETRY_BACKOFF_SECONDS", 0.01)
+    return path
+
+
+def sources(base_url, *names):
+    return [Source(name=name, url=f"{base_url}/{name}.csv", table=f"raw_{name}") for name in names]
+
+
+def ingest_with_retries(path, source, retries):
+    with duckdb.connect(path) as conn:
+        create_schema_if_not_exists(conn)
+        return etl_process.ingest_with_retries(conn, source, retries=retries)
+
+
+def published_tables(path):
+    with duckdb.connect(path, read_only=True) as conn:
+        return {table for table in ("raw_agences", "raw_courtiers") if table_exists(conn, "source", table)}
+
+
+def test_sources_load_concurrently(extracts, database, serve):
+    # Les deux téléchargements ne passent la barrière que s'ils sont en cours en même temps
+    barrier = threading.Barrier(2, timeout=10)
+    base_url = serve(extracts, handler=partial(FlakyHandler, failures=[0], barrier=barrier))
+
+    results = etl_process.run_etl(sources=sources(base_url, "agences", "courtiers"), max_workers=2, retries=0)
+
+    assert {(result.source, result.status, result.rows) for result in results} == {
+        ("agences", "success", 2), ("courtiers", "success", 2),
+    }
+    assert published_tables(database) == {"raw_agences", "raw_courtiers"}
+
+
+def test_strict_mode_stops_on_first_failure(extracts, database, serve):
+    base_url = serve(extracts, handler=partial(FlakyHandler, failures=[0]))
+    registry = [Source(name="absente", url=f"{base_url}/absente.csv", table="raw_absente"), *sources(base_url, "agences")]
+
+    with pytest.raises(RuntimeError, match="absente"):
+        etl_process.run_etl(sources=registry, max_workers=1, retries=0, strict=True)
+
+    # Exécution interrompue : rien n'est publié
+    assert published_tables(database) == set()
+
+
+def test_failed_download_retried_with_exponential_backoff(extracts, database, serve, monkeypatch):
+    base_url = serve(extracts, handler=partial(FlakyHandler, failures=[2]))
+    delays = []
+    monkeypatch.setattr(etl_process.time, "sleep", delays.append)
+
+    result = ingest_with_retries(database, sources(base_url, "agences")[0], retries=3)
+
+    assert (result.status, result.attempts) == ("success", 3)
+    assert delays == [0.01, 0.02]
+
+
+def test_missing_required_column_not_retried(extracts, database, serve, monkeypatch):
+    base_url = serve(extracts, handler=partial(FlakyHandler, failures=[0]))
+    delays = []
+    monkeypatch.setattr(etl_process.time, "sleep", delays.append)
+    source = Source(name="agences", url=f"{base_url}/agences.csv", table="raw_agences", required_columns=("Code",))
+
+    result = ingest_with_retries(database, source, retries=3)
+
+    assert (result.status, result.attempts) == ("failed", 1)
+    assert "Code" in result.error
+    assert delays == []
+
+
+def test_json_registry_replaces_and_adds_sources(tmp_path):
+    path = tmp_path / "sources.json"
+    path.write_text(json.dumps([
+        {"name": "opportunites", "url": "http://127.0.0.1/opportunites.csv", "table": "raw_opportunites"},
+        {"name": "agences", "url": "http://127.0.0.1/agences.csv", "table": "raw_agences", "dtypes": {"Code": "string"}},
+    ]), encoding="utf-8")
+
+    registry = {source.name: source for source in load_sources(str(path))}
+
+    assert list(registry) == ["propositions", "opportunites", "agences"]
+    assert registry["opportunites"].url == "http://127.0.0.1/opportunites.csv"
+    # Une source remplacée garde le schéma déclaré dans sources.yml
+    assert "Id" in registry["opportunites"].required_columns
+    assert registry["opportunites"].dtypes == load_schema()["raw_opportunites"]
+    assert registry["agences"].dtypes == {"Code": "string"}
+    assert registry["agences"].required_columns == ()
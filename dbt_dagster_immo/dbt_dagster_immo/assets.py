@@ -1,10 +1,217 @@
-from dagster import AssetExecutionContext
-from dagster_dbt import DbtCliResource, dbt_assets
+import json
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime
+
+from dagster import (
+    AssetExecutionContext, AssetObservation, BackfillPolicy, Config, MetadataValue, MonthlyPartitionsDefinition,
+)
+from dagster_dbt import DbtCliResource, dbt_assets, get_asset_key_for_model
 
 from .project import immobilier_courtage_project
+from config.constants import PROFILE_DBT_MODELS
+from config.database import connect_to_motherduck
+from config.memory import MemorySampler
+from config.profiling import code_version, load_profile, save_profiles
+from config.telemetry import Telemetry
+
+# Partitions mensuelles sur date_creation ; end_offset=1 inclut le mois en cours
+PARTITIONS_START_DATE = os.getenv("PARTITIONS_START_DATE", "2022-01-01")
+monthly_partitions = MonthlyPartitionsDefinition(start_date=PARTITIONS_START_DATE, end_offset=1)
+
+# Nombre de mois traités par run lors d'un backfill (le parallélisme entre runs se règle dans dagster.yaml)
+BACKFILL_MAX_PARTITIONS_PER_RUN = int(os.getenv("BACKFILL_MAX_PARTITIONS_PER_RUN", "1"))
+
+# Export Parquet (partitions Hive par mois, ZSTD) des tables gold après chaque build, si défini
+PARQUET_EXPORT_DIR = os.getenv("PARQUET_EXPORT_DIR")
+
+# Une étape Dagster par couche dbt, exécutées dans cet ordre. Pour chaque couche : nombre de modèles
+# construits en parallèle (dbt --threads) et pool de concurrence Dagster, qui limite le nombre
+# d'étapes de la couche en cours d'exécution tous runs confondus (limites dans dagster.yaml).
+# Les modèles parallèles se partagent le budget de threads DuckDB (DUCKDB_THREADS, profiles.yml).
+DBT_LAYERS = {
+    "bronze": {"threads": int(os.getenv("DBT_THREADS_BRONZE", "2")), "pool": "dbt_bronze"},
+    "silver": {"threads": int(os.getenv("DBT_THREADS_SILVER", "2")), "pool": "dbt_silver"},
+    "gold": {"threads": int(os.getenv("DBT_THREADS_GOLD", "4")), "pool": "dbt_gold"},
+}
+
+
+class DbtBuildConfig(Config):
+    # Profile chaque modèle pendant son build (macros/profiling.sql) et conserve ses opérateurs les plus coûteux
+    profile_models: bool = PROFILE_DBT_MODELS
+    # Retire des modèles incrémentaux les clés supprimées en amont, en relisant tout l'historique
+    # (macros/incremental.sql) : job planifié reconcile_dbt_deletions, pas les builds incrémentaux
+    reconcile_deletions: bool = False
+    # Réécrit les tables incrémentales dans l'ordre de leurs sort_keys (macros/physical_layout.sql),
+    # que les lots delete+insert successifs dégradent : même job planifié
+    resort_tables: bool = False
+
+
+def record_dbt_run_results(telemetry, run_results):
+    """
+    Ajoute une étape par nœud exécuté (dbt_model, dbt_test...), avec le temps et les lignes rapportés par dbt
+    """
+    for result in run_results["results"]:
+        execute = next((timing for timing in result.get("timing", []) if timing["name"] == "execute"), None)
+        rows = (result.get("adapter_response") or {}).get("rows_affected")
+        telemetry.record(
+            f"dbt_{result['unique_id'].split('.')[0]}",
+            result["unique_id"],
+            status=result["status"],
+            started_at=datetime.fromisoformat(execute["started_at"].replace("Z", "+00:00")) if execute else None,
+            wall_seconds=result["execution_time"],
+            rows=rows if rows is not None and rows >= 0 else None,
+            error=result["message"] if result["status"] in ("error", "fail") else None,
+        )
+
+
+def write_telemetry(context, telemetry, status):
+    try:
+        conn = connect_to_motherduck()
+    except Exception as e:
+        context.log.warning(f"Télémétrie non enregistrée: {e}")
+        return
+    try:
+        telemetry.write(conn, status)
+    finally:
+        conn.close()
+
+
+def profile_models(context, run_results, profile_dir, run_id, window):
+    """
+    Lit le profil JSON de chaque modèle construit avec succès, écrit par DuckDB dans profile_dir pendant
+    son build (macros/profiling.sql), enregistre les profils dans pipeline.query_profiles avec la fenêtre
+    de partition window (début, fin) et retourne une AssetObservation par modèle.
+    Les vues, dont la requête n'est pas exécutée à la création, n'ont pas de profil.
+    """
+    profiles, observations = {}, []
+    for result in run_results["results"]:
+        if not result["unique_id"].startswith("model.") or result["status"] != "success":
+            continue
+        model = result["unique_id"].split(".")[-1]
+        path = os.path.join(profile_dir, f"{model}.json")
+        if not os.path.exists(path):
+            continue
+        try:
+            profile = load_profile(path)
+        except (OSError, ValueError) as e:
+            context.log.warning(f"Profil de {model} illisible: {e}")
+            continue
+        profiles[result["unique_id"]] = profile
+        slowest = profile.operators[0] if profile.operators else None
+        observations.append(AssetObservation(
+            asset_key=get_asset_key_for_model([context.assets_def], model),
+            metadata={
+                "profile_latency_seconds": profile.latency,
+                "profile_cpu_seconds": profile.cpu_time,
+                "profile_rows_scanned": profile.rows_scanned,
+                "profile_slowest_operator": slowest["operator"] if slowest else None,
+                "profile_top_operators": MetadataValue.md(profile.as_markdown()),
+                "profile_run_id": run_id,
+                "profile_window": f"{window[0]} → {window[1]}",
+            },
+        ))
+
+    if profiles:
+        try:
+            conn = connect_to_motherduck()
+        except Exception as e:
+            context.log.warning(f"Profils non enregistrés: {e}")
+            return observations
+        try:
+            save_profiles(conn, run_id, profiles, code_version(), window)
+        finally:
+            conn.close()
+    return observations
+
+
+def build_vars(config, time_window, parquet_export_dir=PARQUET_EXPORT_DIR):
+    """
+    Variables dbt d'un build : fenêtre [début, fin) de la partition, transmise aux modèles
+    incrémentaux (macros/incremental.sql), et options du DbtBuildConfig
+    """
+    dbt_vars = {
+        "min_date": time_window.start.isoformat(),
+        "max_date": time_window.end.isoformat(),
+    }
+    if config.reconcile_deletions:
+        dbt_vars["reconcile_deletions"] = True
+    if config.resort_tables:
+        dbt_vars["resort_tables"] = True
+    if parquet_export_dir:
+        # COPY ... TO ne crée pas les répertoires parents
+        os.makedirs(parquet_export_dir, exist_ok=True)
+        dbt_vars["parquet_export_dir"] = parquet_export_dir
+    return dbt_vars
+
+
+def build_layer(context, dbt, config, layer):
+    """
+    dbt build des modèles (et de leurs tests) de la couche layer, pour la fenêtre de la partition
+    """
+    time_window = context.partition_time_window
+    dbt_vars = build_vars(config, time_window)
+
+    # dbt s'exécute dans un sous-processus : le CPU est lu dans RUSAGE_CHILDREN (écart avant/après),
+    # le pic RSS échantillonné sur le processus dbt lui-même. ru_maxrss de RUSAGE_CHILDREN serait
+    # le pic du plus gros sous-processus déjà terminé, y compris les builds des couches précédentes.
+    telemetry = Telemetry("dbt")
+    started_at, start = datetime.now(), time.perf_counter()
+    usage_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    status = "failed"
+    # Profils JSON écrits par DuckDB pendant le build, un fichier par modèle
+    profile_dir = tempfile.TemporaryDirectory(prefix="dbt_profiles_") if config.profile_models else None
+    if profile_dir:
+        dbt_vars["profile_dir"] = profile_dir.name
+    args = ["build", "--vars", json.dumps(dbt_vars), "--threads", str(DBT_LAYERS[layer]["threads"])]
+    invocation = dbt.cli(args, context=context)
+    memory = MemorySampler(pid=invocation.process.pid)
+    try:
+        with memory:
+            yield from invocation.stream()
+        status = "success"
+        if profile_dir:
+            yield from profile_models(
+                context, invocation.get_artifact("run_results.json"), profile_dir.name, telemetry.run_id,
+                (time_window.start, time_window.end),
+            )
+    finally:
+        if profile_dir:
+            profile_dir.cleanup()
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        telemetry.record(
+            "dbt_build",
+            layer,
+            status=status,
+            started_at=started_at,
+            wall_seconds=time.perf_counter() - start,
+            cpu_seconds=(usage.ru_utime + usage.ru_stime) - (usage_start.ru_utime + usage_start.ru_stime),
+            peak_rss_mb=memory.peak_mb,
+        )
+        try:
+            record_dbt_run_results(telemetry, invocation.get_artifact("run_results.json"))
+        except FileNotFoundError:
+            context.log.warning("run_results.json introuvable, temps par modèle non enregistrés")
+        write_telemetry(context, telemetry, status)
+
+
+def layer_dbt_assets(layer):
+    """Assets dbt de la couche layer (tag dbt du même nom), construits dans une étape dédiée"""
+
+    @dbt_assets(
+        manifest=immobilier_courtage_project.manifest_path,
+        select=f"tag:{layer}",
+        name=f"{layer}_dbt_assets",
+        partitions_def=monthly_partitions,
+        backfill_policy=BackfillPolicy.multi_run(BACKFILL_MAX_PARTITIONS_PER_RUN),
+        pool=DBT_LAYERS[layer]["pool"],
+    )
+    def _layer_dbt_assets(context: AssetExecutionContext, dbt: DbtCliResource, config: DbtBuildConfig):
+        yield from build_layer(context, dbt, config, layer)
+
+    return _layer_dbt_assets
 
 
-@dbt_assets(manifest=immobilier_courtage_project.manifest_path)
-def immobilier_courtage_dbt_assets(context: AssetExecutionContext, dbt: DbtCliResource):
-    yield from dbt.cli(["build"], context=context).stream()
-    
\ No newline at end of file
+immobilier_courtage_dbt_assets = [layer_dbt_assets(layer) for layer in DBT_LAYERS]
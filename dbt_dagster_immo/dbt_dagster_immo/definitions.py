@@ -1,13 +1,24 @@
+import time
+
 from dagster import Definitions
 from dagster_dbt import DbtCliResource
 from .assets import immobilier_courtage_dbt_assets
-from .project import immobilier_courtage_project
-from .schedules import schedules
+from .ingestion import raw_sources
+from .project import LOAD_STARTED, MANIFEST_STATS, immobilier_courtage_project
+from .schedules import ingest_raw_sources, materialize_dbt_models, reconcile_dbt_deletions, schedules
+from .sensors import sensors
 
 defs = Definitions(
-    assets=[immobilier_courtage_dbt_assets],
+    assets=[raw_sources, *immobilier_courtage_dbt_assets],
+    jobs=[ingest_raw_sources, materialize_dbt_models, reconcile_dbt_deletions],
     schedules=schedules,
+    sensors=sensors,
     resources={
         "dbt": DbtCliResource(project_dir=immobilier_courtage_project),
     },
-)
\ No newline at end of file
+    # Mesures du chargement de la code location : cache du manifest dbt et durée totale
+    metadata={
+        "dbt_manifest": MANIFEST_STATS,
+        "load_seconds": round(time.perf_counter() - LOAD_STARTED, 3),
+    },
+)
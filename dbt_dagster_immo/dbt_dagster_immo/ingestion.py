@@ -0,0 +1,66 @@
+from dagster import AssetExecutionContext, AssetKey, AssetSpec, Failure, MaterializeResult, multi_asset
+
+from . import project  # noqa: F401  (rend data-pipeline/src importable)
+from config.sources import load_sources
+from config.telemetry import Telemetry
+from etl_process import run_etl
+
+SOURCES = load_sources()
+
+
+def source_asset_key(table):
+    """Clé de l'asset d'une table brute, identique à celle de la source dbt correspondante"""
+    return AssetKey(["source", table])
+
+
+RAW_ASSET_KEYS = [source_asset_key(source.table) for source in SOURCES]
+
+
+@multi_asset(
+    specs=[
+        AssetSpec(
+            source_asset_key(source.table),
+            description=f"Extrait CSV {source.name} chargé depuis {source.url}",
+            group_name="ingestion",
+            skippable=True,
+        )
+        for source in SOURCES
+    ],
+    can_subset=True,
+)
+def raw_sources(context: AssetExecutionContext):
+    """
+    Charge les sources sélectionnées avec run_etl.
+    Une source inchangée (no-op) n'est pas matérialisée : les modèles dbt en aval ne sont pas relancés.
+    """
+    selected = [source for source in SOURCES if source_asset_key(source.table) in context.selected_asset_keys]
+    telemetry = Telemetry("etl")
+    results = run_etl(sources=selected, telemetry=telemetry)
+
+    for result in results:
+        if result.status == "success":
+            yield MaterializeResult(
+                asset_key=source_asset_key(result.table),
+                metadata={
+                    "rows": result.rows,
+                    "bytes": result.bytes,
+                    "duration_seconds": round(result.duration, 2),
+                    "attempts": result.attempts,
+                    # Mesures par étape (download, parse, load), aussi dans pipeline.pipeline_stage_metrics
+                    **{
+                        name: value
+                        for metrics in telemetry.for_target(result.table) if metrics.status == "success"
+                        for name, value in metrics.as_metadata().items()
+                    },
+                    "telemetry_run_id": telemetry.run_id,
+                },
+            )
+        elif result.status == "no-op":
+            context.log.info(f"{result.source} inchangée depuis le dernier chargement, aucune matérialisation")
+
+    failed = [result for result in results if result.status == "failed"]
+    if failed:
+        raise Failure(
+            description=f"Échec du chargement de {', '.join(result.source for result in failed)}",
+            metadata={result.source: result.error for result in failed},
+        )
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""
+Cache du manifest dbt lu par les assets Dagster au chargement de la code location.
+
+Sous `dagster dev` (ou avec DAGSTER_DBT_PARSE_PROJECT_ON_LOAD=1), chaque chargement ou rechargement
+relançait dbt deps puis dbt parse avant que @dbt_assets ne lise manifest.json. Le manifest est
+désormais associé à une empreinte SHA-256 du projet : fichiers des modèles, macros, seeds, snapshots,
+tests et analyses, dbt_project.yml, profiles.yml, dépendances, version de dbt et valeurs des variables
+d'environnement lues par env_var(). Tant qu'elle ne change pas, manifest.json est réutilisé sans lancer
+dbt. Sinon dbt parse est relancé et, grâce à target/partial_parse.msgpack, ne réanalyse que les
+fichiers modifiés ; dbt deps n'est relancé que si les dépendances ont changé ou ne sont pas installées.
+
+Usage, depuis le dossier dbt_dagster_immo/ (avant de démarrer webserver et daemon, ou en CI) :
+    python -m dbt_dagster_immo.manifest [--force]
+"""
+import argparse
+import fcntl
+import hashlib
+import importlib.metadata
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import yaml
+from dagster import get_dagster_logger
+from dagster_dbt import DbtCliResource
+
+logger = get_dagster_logger()
+
+# Prépare le projet au chargement hors `dagster dev` aussi (dagster-webserver et dagster-daemon lancés séparément)
+PARSE_PROJECT_ON_LOAD = os.getenv("DAGSTER_DBT_PARSE_PROJECT_ON_LOAD", "").lower() in ("1", "true")
+# false : dbt parse est relancé à chaque chargement, comme sans cache
+MANIFEST_CACHE_ENABLED = os.getenv("DBT_MANIFEST_CACHE_ENABLED", "true").lower() == "true"
+
+# Dossiers du projet lus par dbt parse, avec leur valeur par défaut
+PROJECT_PATHS = {
+    "model-paths": ["models"],
+    "macro-paths": ["macros"],
+    "seed-paths": ["seeds"],
+    "snapshot-paths": ["snapshots"],
+    "test-paths": ["tests"],
+    "analysis-paths": ["analyses"],
+}
+DEPENDENCY_FILES = ("packages.yml", "dependencies.yml", "package-lock.yml")
+ENV_VAR_PATTERN = re.compile(rb"env_var\(\s*['\"](\w+)['\"]")
+
+CACHE_FILE = "manifest_cache.json"
+LOCK_FILE = ".manifest_cache.lock"
+
+
+def project_files(project):
+    """Fichiers dont dépend le manifest de project (hors dépendances), dans un ordre stable"""
+    with open(project.project_dir / "dbt_project.yml") as f:
+        config = yaml.safe_load(f)
+    files = [project.project_dir / "dbt_project.yml", project.profiles_dir / "profiles.yml"]
+    for key, default in PROJECT_PATHS.items():
+        for directory in config.get(key, default):
+            root = project.project_dir / directory
+            if root.is_dir():
+                files.extend(sorted(path for path in root.rglob("*") if path.is_file()))
+    return [path for path in files if path.is_file()]
+
+
+def digest_files(paths, root):
+    """
+    Empreinte SHA-256 des chemins (relatifs à root) et contenus de paths,
+    et noms des variables d'environnement qu'ils lisent avec env_var()
+    """
+    digest = hashlib.sha256()
+    env_vars = set()
+    for path in paths:
+        content = path.read_bytes()
+        digest.update(os.path.relpath(path, root).encode() + b"\0")
+        digest.update(hashlib.sha256(content).digest())
+        env_vars.update(name.decode() for name in ENV_VAR_PATTERN.findall(content))
+    return digest, env_vars
+
+
+def project_fingerprint(project):
+    """
+    Empreintes du projet dbt : 'project' (tout ce qui détermine le manifest) et
+    'dependencies' (fichiers de dépendances seuls), avec le nombre de fichiers lus
+    """
+    files = project_files(project)
+    dependency_files = [project.project_dir / name for name in DEPENDENCY_FILES]
+    dependency_files = [path for path in dependency_files if path.is_file()]
+
+    dependencies, _ = digest_files(dependency_files, project.project_dir)
+    digest, env_vars = digest_files(files + dependency_files, project.project_dir)
+    digest.update(importlib.metadata.version("dbt-core").encode())
+    for name in sorted(env_vars):
+        digest.update(f"\0{name}={os.getenv(name)}".encode())
+    for option in (project.profile, project.target):
+        digest.update(f"\0{option}".encode())
+    return {
+        "project": digest.hexdigest(),
+        "dependencies": dependencies.hexdigest(),
+        "files": len(files) + len(dependency_files),
+    }
+
+
+@contextmanager
+def locked(path):
+    """Verrou exclusif sur path : webserver et daemon peuvent charger le projet en même temps"""
+    with open(path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def manifest_signature(project):
+    """Taille et date de modification de manifest.json, None s'il n'existe pas"""
+    try:
+        stat = project.manifest_path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def run_dbt(project, args):
+    """Lance une commande dbt sur project et retourne sa durée"""
+    start = time.perf_counter()
+    DbtCliResource(project_dir=project).cli(args, target_path=project.target_path).wait()
+    return time.perf_counter() - start
+
+
+def prepare_manifest(project, force=False):
+    """
+    Garantit que project.manifest_path correspond au projet, en relançant dbt deps / dbt parse
+    seulement si son empreinte a changé depuis le dernier parse (ou si manifest.json a été
+    réécrit entre-temps). Retourne les mesures de la préparation.
+    """
+    start = time.perf_counter()
+    fingerprint = project_fingerprint(project)
+    stats = {
+        "cache": "hit",
+        "files": fingerprint["files"],
+        "fingerprint": fingerprint["project"][:12],
+        "fingerprint_seconds": round(time.perf_counter() - start, 3),
+        "deps_seconds": 0.0,
+        "parse_seconds": 0.0,
+    }
+
+    target_dir = project.project_dir / project.target_path
+    target_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = target_dir / CACHE_FILE
+    with locked(target_dir / LOCK_FILE):
+        # Relu sous le verrou : un autre processus a pu parser le projet pendant l'attente
+        cached = read_cache(cache_path)
+        signature = manifest_signature(project)
+        if force or cached.get("project") != fingerprint["project"] or signature is None \
+                or cached.get("manifest") != signature:
+            stats["cache"] = "miss"
+            deps_changed = cached.get("dependencies") not in (None, fingerprint["dependencies"])
+            if project.has_uninstalled_deps or deps_changed:
+                stats["deps_seconds"] = round(run_dbt(project, ["deps", "--quiet"]), 3)
+            stats["parse_seconds"] = round(run_dbt(project, ["parse", "--quiet"]), 3)
+
+            cache = dict(fingerprint, manifest=manifest_signature(project), parsed_at=datetime.now().isoformat(timespec="seconds"))
+            tmp_path = cache_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(cache, indent=2))
+            os.replace(tmp_path, cache_path)
+
+    stats["total_seconds"] = round(time.perf_counter() - start, 3)
+    logger.info(
+        f"Manifest dbt {'réutilisé' if stats['cache'] == 'hit' else 'régénéré'} "
+        f"({stats['files']} fichiers, empreinte {stats['fingerprint']}) en {stats['total_seconds']}s"
+    )
+    return stats
+
+
+def prepare_manifest_if_dev(project):
+    """
+    Remplace project.prepare_if_dev() : prépare le manifest sous `dagster dev` ou avec
+    DAGSTER_DBT_PARSE_PROJECT_ON_LOAD=1. Ailleurs, le manifest est construit au déploiement
+    et lu tel quel (cache 'skipped').
+    """
+    if not (project.preparer.using_dagster_dev() or PARSE_PROJECT_ON_LOAD):
+        return {"cache": "skipped"}
+    return prepare_manifest(project, force=not MANIFEST_CACHE_ENABLED)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prépare le manifest dbt du projet Dagster")
+    parser.add_argument("--force", action="store_true", help="Relance dbt parse même si le projet n'a pas changé")
+    args = parser.parse_args()
+
+    from .project import immobilier_courtage_project
+
+    print(json.dumps(prepare_manifest(immobilier_courtage_project, force=args.force), indent=2))
+
+
+if __name__ == "__main__":
+    main()
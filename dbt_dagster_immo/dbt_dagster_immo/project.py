@@ -1,9 +1,22 @@
+import sys
+import time
 from pathlib import Path
 
 from dagster_dbt import DbtProject
 
+from .manifest import prepare_manifest_if_dev
+
+# Début du chargement de la code location, pour la durée totale exposée par definitions.py
+LOAD_STARTED = time.perf_counter()
+
 immobilier_courtage_project = DbtProject(
     project_dir=Path(__file__).joinpath("..", "..", "..", "immobilier_courtage").resolve(),
     packaged_project_dir=Path(__file__).joinpath("..", "..", "dbt-project").resolve(),
 )
-immobilier_courtage_project.prepare_if_dev()
\ No newline at end of file
+# Comme prepare_if_dev(), mais dbt n'est relancé que si le projet a changé depuis le dernier parse
+MANIFEST_STATS = prepare_manifest_if_dev(immobilier_courtage_project)
+
+# Le code ETL de data-pipeline/src n'est pas un paquet installé : il est importé depuis le dépôt
+ETL_SRC_DIR = Path(__file__).joinpath("..", "..", "..", "data-pipeline", "src").resolve()
+if str(ETL_SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_SRC_DIR))
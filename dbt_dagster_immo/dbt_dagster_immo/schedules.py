@@ -1,15 +1,56 @@
 """
-To add a daily schedule that materializes your dbt assets, uncomment the following lines.
+Planification de l'interrogation des sources brutes. Les modèles dbt ne sont plus planifiés :
+le capteur raw_sources_changed les déclenche une fois de nouvelles données brutes chargées.
+Seules la réconciliation des suppressions en amont et le retri des tables incrémentales,
+qui relisent tout l'historique, restent planifiés.
 """
-from dagster_dbt import build_schedule_from_dbt_selection
+import os
+
+from dagster import AssetSelection, RunRequest, ScheduleDefinition, define_asset_job, schedule
+
+from .assets import DBT_LAYERS, immobilier_courtage_dbt_assets, monthly_partitions
+from .ingestion import RAW_ASSET_KEYS
+
+# Une source inchangée ne coûte qu'une requête conditionnelle (304), d'où un intervalle court
+INGESTION_CRON = os.getenv("INGESTION_CRON", "*/15 * * * *")
+# Réconciliation des suppressions en amont, hebdomadaire par défaut (dimanche 3h)
+RECONCILE_DELETIONS_CRON = os.getenv("RECONCILE_DELETIONS_CRON", "0 3 * * 0")
+
+ingest_raw_sources = define_asset_job(
+    name="ingest_raw_sources",
+    selection=AssetSelection.assets(*RAW_ASSET_KEYS),
+)
+
+materialize_dbt_models = define_asset_job(
+    name="materialize_dbt_models",
+    selection=AssetSelection.assets(*immobilier_courtage_dbt_assets),
+    partitions_def=monthly_partitions,
+)
+
+reconcile_dbt_deletions = define_asset_job(
+    name="reconcile_dbt_deletions",
+    selection=AssetSelection.assets(*immobilier_courtage_dbt_assets),
+    partitions_def=monthly_partitions,
+    config={
+        "ops": {
+            f"{layer}_dbt_assets": {"config": {"reconcile_deletions": True, "resort_tables": True}}
+            for layer in DBT_LAYERS
+        }
+    },
+)
+
+
+@schedule(job=reconcile_dbt_deletions, cron_schedule=RECONCILE_DELETIONS_CRON)
+def reconcile_deletions_schedule(context):
+    """
+    Retire des modèles incrémentaux les lignes supprimées en amont depuis la dernière réconciliation,
+    puis les réécrit dans l'ordre de leurs sort_keys.
+    Les suppressions portent sur toute la table : la partition du mois en cours sert de fenêtre au build.
+    """
+    return RunRequest(partition_key=monthly_partitions.get_last_partition_key())
 
-from .assets import immobilier_courtage_dbt_assets
 
 schedules = [
-    build_schedule_from_dbt_selection(
-        [immobilier_courtage_dbt_assets],
-        job_name="materialize_dbt_models",
-        cron_schedule="0 0 * * *",
-        dbt_select="fqn:*",
-    ),
-]
\ No newline at end of file
+    ScheduleDefinition(job=ingest_raw_sources, cron_schedule=INGESTION_CRON),
+    reconcile_deletions_schedule,
+]
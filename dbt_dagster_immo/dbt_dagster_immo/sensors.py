@@ -0,0 +1,45 @@
+from functools import reduce
+from operator import or_
+
+from dagster import RunRequest, SkipReason, multi_asset_sensor
+from dagster_dbt import build_dbt_asset_selection
+
+from .assets import immobilier_courtage_dbt_assets, monthly_partitions
+from .ingestion import RAW_ASSET_KEYS
+from .schedules import materialize_dbt_models
+
+
+def downstream_dbt_selection(raw_key):
+    """Modèles dbt, toutes couches confondues, qui dépendent directement ou non de la table brute raw_key"""
+    source_name, table = raw_key.path
+    return reduce(or_, (
+        build_dbt_asset_selection([layer_assets], dbt_select=f"source:{source_name}.{table}+")
+        for layer_assets in immobilier_courtage_dbt_assets
+    ))
+
+
+@multi_asset_sensor(monitored_assets=RAW_ASSET_KEYS, job=materialize_dbt_models, minimum_interval_seconds=60)
+def raw_sources_changed(context):
+    """
+    Lance, pour le mois en cours, les seuls modèles dbt en aval des sources qui viennent d'être
+    rechargées. Les sources inchangées ne sont pas matérialisées et ne déclenchent donc rien.
+    """
+    records = context.latest_materialization_records_by_key()
+    changed = [key for key, record in records.items() if record is not None]
+    if not changed:
+        return SkipReason("Aucune source rechargée depuis la dernière évaluation")
+
+    asset_graph = context.repository_def.asset_graph
+    selection = set()
+    for key in changed:
+        selection |= downstream_dbt_selection(key).resolve(asset_graph)
+
+    context.advance_all_cursors()
+    return RunRequest(
+        partition_key=monthly_partitions.get_last_partition_key(),
+        asset_selection=sorted(selection),
+        tags={"source_tables": ",".join(key.path[-1] for key in changed)},
+    )
+
+
+sensors = [raw_sources_changed]
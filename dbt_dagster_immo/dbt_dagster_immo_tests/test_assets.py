@@ -0,0 +1,45 @@
+"""
+Variables dbt d'un build partitionné : fenêtre [min_date, max_date) du mois de la partition,
+lue par les modèles incrémentaux (macros/incremental.sql), et options du DbtBuildConfig.
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import duckdb
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from dbt_dagster_immo.assets import DbtBuildConfig, build_vars, monthly_partitions  # noqa: E402
+
+
+def window(partition_key):
+    return monthly_partitions.time_window_for_partition_key(partition_key)
+
+
+def test_partition_window_vars():
+    dbt_vars = build_vars(DbtBuildConfig(), window("2024-02-01"), parquet_export_dir=None)
+
+    assert dbt_vars == {"min_date": "2024-02-01T00:00:00+00:00", "max_date": "2024-03-01T00:00:00+00:00"}
+
+
+def test_window_bounds_cast_to_month_boundaries():
+    # Même conversion que in_partition_window : CAST('...' AS TIMESTAMP)
+    dbt_vars = build_vars(DbtBuildConfig(), window("2024-12-01"), parquet_export_dir=None)
+
+    bounds = duckdb.execute(
+        "SELECT CAST(? AS TIMESTAMP), CAST(? AS TIMESTAMP)", [dbt_vars["min_date"], dbt_vars["max_date"]]
+    ).fetchone()
+
+    assert bounds == (datetime(2024, 12, 1), datetime(2025, 1, 1))
+
+
+def test_config_options_are_passed(tmp_path):
+    export_dir = tmp_path / "parquet" / "gold"
+    config = DbtBuildConfig(profile_models=False, reconcile_deletions=True, resort_tables=True)
+
+    dbt_vars = build_vars(config, window("2024-02-01"), parquet_export_dir=str(export_dir))
+
+    assert dbt_vars["reconcile_deletions"] is True
+    assert dbt_vars["resort_tables"] is True
+    assert dbt_vars["parquet_export_dir"] == str(export_dir)
+    assert export_dir.is_dir()
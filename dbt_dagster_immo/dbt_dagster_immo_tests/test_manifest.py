@@ -0,0 +1,94 @@
+"""
+Empreinte du projet dbt qui décide de la réutilisation de manifest.json : elle change avec les
+fichiers du projet, les valeurs des variables lues par env_var() et la cible, pas avec le reste.
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from dbt_dagster_immo.manifest import digest_files, project_fingerprint  # noqa: E402
+
+MODEL = "SELECT 1 AS id FROM {{ source('source', env_var('IMMO_FINGERPRINT_TABLE', 'raw_opportunites')) }}\n"
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "dbt_project.yml").write_text("name: 'fingerprint'\nprofile: 'fingerprint'\n")
+    (tmp_path / "profiles.yml").write_text("fingerprint:\n  target: local\n")
+    (tmp_path / "packages.yml").write_text("packages: []\n")
+    (tmp_path / "models").mkdir()
+    (tmp_path / "models" / "model.sql").write_text(MODEL)
+    (tmp_path / "target").mkdir()
+    (tmp_path / "target" / "manifest.json").write_text("{}")
+    return SimpleNamespace(project_dir=tmp_path, profiles_dir=tmp_path, profile=None, target="local")
+
+
+def test_unchanged_project_keeps_fingerprint(project):
+    fingerprint = project_fingerprint(project)
+
+    assert project_fingerprint(project) == fingerprint
+    # dbt_project.yml, profiles.yml, le modèle et packages.yml ; target/ n'est pas lu
+    assert fingerprint["files"] == 4
+
+
+def test_edited_model_changes_fingerprint(project):
+    fingerprint = project_fingerprint(project)
+
+    (project.project_dir / "models" / "model.sql").write_text(MODEL.replace("1 AS id", "2 AS id"))
+
+    changed = project_fingerprint(project)
+    assert changed["project"] != fingerprint["project"]
+    assert changed["dependencies"] == fingerprint["dependencies"]
+
+
+def test_new_model_changes_fingerprint(project):
+    fingerprint = project_fingerprint(project)
+
+    (project.project_dir / "models" / "other.sql").write_text(MODEL)
+
+    assert project_fingerprint(project)["project"] != fingerprint["project"]
+
+
+def test_env_var_value_changes_fingerprint(project, monkeypatch):
+    monkeypatch.delenv("IMMO_FINGERPRINT_TABLE", raising=False)
+    fingerprint = project_fingerprint(project)
+
+    # Une variable que le projet ne lit pas est ignorée
+    monkeypatch.setenv("IMMO_FINGERPRINT_UNUSED", "1")
+    assert project_fingerprint(project) == fingerprint
+
+    monkeypatch.setenv("IMMO_FINGERPRINT_TABLE", "raw_propositions")
+    assert project_fingerprint(project)["project"] != fingerprint["project"]
+
+
+def test_dependencies_change_both_fingerprints(project):
+    fingerprint = project_fingerprint(project)
+
+    (project.project_dir / "packages.yml").write_text("packages:\n  - package: dbt-labs/dbt_utils\n")
+
+    changed = project_fingerprint(project)
+    assert changed["project"] != fingerprint["project"]
+    assert changed["dependencies"] != fingerprint["dependencies"]
+
+
+def test_target_changes_fingerprint(project):
+    fingerprint = project_fingerprint(project)
+
+    project.target = "motherduck"
+
+    assert project_fingerprint(project)["project"] != fingerprint["project"]
+
+
+def test_digest_files_reads_env_vars_and_paths(tmp_path):
+    (tmp_path / "a.sql").write_text("{{ env_var('DUCKDB_PATH') }} {{ env_var(\"DUCKDB_THREADS\", '4') }}")
+    (tmp_path / "b.sql").write_text("{{ env_var('DUCKDB_PATH') }} {{ env_var(\"DUCKDB_THREADS\", '4') }}")
+
+    digest, env_vars = digest_files([tmp_path / "a.sql"], tmp_path)
+    renamed, _ = digest_files([tmp_path / "b.sql"], tmp_path)
+
+    assert env_vars == {"DUCKDB_PATH", "DUCKDB_THREADS"}
+    # Même contenu sous un autre chemin : un autre fichier pour dbt
+    assert digest.hexdigest() != renamed.hexdigest()
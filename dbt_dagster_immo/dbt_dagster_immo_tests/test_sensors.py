@@ -0,0 +1,67 @@
+"""
+Capteur raw_sources_changed : seuls les modèles dbt en aval des sources rechargées sont lancés,
+pour le mois en cours. Nécessite le manifest du projet dbt (dbt parse, ou dagster dev).
+"""
+import sys
+from pathlib import Path
+
+import pytest
+from dagster import AssetKey, AssetMaterialization, DagsterInstance, RunRequest, SkipReason, build_multi_asset_sensor_context
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from dbt_dagster_immo.assets import monthly_partitions  # noqa: E402
+from dbt_dagster_immo.definitions import defs  # noqa: E402
+from dbt_dagster_immo.ingestion import RAW_ASSET_KEYS, source_asset_key  # noqa: E402
+from dbt_dagster_immo.sensors import raw_sources_changed  # noqa: E402
+
+
+@pytest.fixture
+def instance():
+    with DagsterInstance.ephemeral() as instance:
+        yield instance
+
+
+@pytest.fixture
+def context(instance):
+    return build_multi_asset_sensor_context(monitored_assets=RAW_ASSET_KEYS, instance=instance, definitions=defs)
+
+
+def materialize(instance, table):
+    instance.report_runless_asset_event(AssetMaterialization(asset_key=source_asset_key(table)))
+
+
+def test_no_reloaded_source_skips(context):
+    assert isinstance(raw_sources_changed(context), SkipReason)
+
+
+def test_reloaded_source_selects_downstream_models(context, instance):
+    materialize(instance, "raw_propositions")
+
+    request = raw_sources_changed(context)
+
+    assert isinstance(request, RunRequest)
+    assert request.partition_key == monthly_partitions.get_last_partition_key()
+    assert request.tags == {"source_tables": "raw_propositions"}
+    selection = set(request.asset_selection)
+    assert {
+        AssetKey(["bronze", "bronze_propositions"]),
+        AssetKey(["silver", "propositions_enrichies"]),
+        AssetKey(["gold", "metriques_banques"]),
+    } <= selection
+    # Modèles qui ne lisent que les opportunités
+    assert AssetKey(["bronze", "bronze_opportunites"]) not in selection
+    assert AssetKey(["gold", "taux_conversion_opportunites"]) not in selection
+
+
+def test_materializations_are_consumed_once(context, instance):
+    materialize(instance, "raw_opportunites")
+    assert isinstance(raw_sources_changed(context), RunRequest)
+
+    assert isinstance(raw_sources_changed(context), SkipReason)
+
+    materialize(instance, "raw_opportunites")
+    materialize(instance, "raw_propositions")
+    request = raw_sources_changed(context)
+    assert request.tags == {"source_tables": "raw_opportunites,raw_propositions"}
+    assert AssetKey(["bronze", "bronze_opportunites"]) in request.asset_selection
+    assert AssetKey(["bronze", "bronze_propositions"]) in request.asset_selection
@@ -0,0 +1,84 @@
+{#
+    Colonnes catégorielles des tables silver et gold, stockées en ENUM DuckDB
+    (un code de 1 ou 2 octets par ligne au lieu d'une chaîne, regroupements et jointures sur entiers).
+
+    - Domaines fermés (segments, phases calculés en SQL) : valeurs déclarées dans
+      var('categories') de dbt_project.yml.
+    - Listes de valeurs Salesforce (colonnes meta.categorical de sources.yml) : valeurs
+      observées dans le modèle amont. En incrémental, seules les lignes amont du lot (condition
+      where) sont lues, ajoutées au domaine de l'ENUM de la table cible : le coût suit le volume
+      du lot et non tout l'historique. Quand une nouvelle valeur apparaît,
+      on_schema_change='sync_all_columns' élargit le type de la colonne cible.
+#}
+
+{% macro category_values(name, extra=[]) %}
+    {{ return(var('categories')[name] + extra) }}
+{% endmacro %}
+
+{# Domaine de l'ENUM de column dans la table relation, [] si la colonne n'est pas un ENUM #}
+{% macro enum_type_values(relation, column) %}
+    {%- set column_type = run_query(
+        "SELECT data_type FROM information_schema.columns WHERE table_catalog = '" ~ relation.database
+        ~ "' AND table_schema = '" ~ relation.schema ~ "' AND table_name = '" ~ relation.identifier
+        ~ "' AND column_name = '" ~ column ~ "'"
+    ).columns[0].values() | list -%}
+    {%- if not column_type or not column_type[0].startswith('ENUM') -%}
+        {{ return([]) }}
+    {%- endif -%}
+    {{ return(run_query('SELECT unnest(enum_range(any_value(' ~ column ~ '))) FROM ' ~ relation).columns[0].values() | list) }}
+{% endmacro %}
+
+{#
+    Valeurs distinctes non nulles de column dans relation, triées. En incrémental, avec where,
+    seules les lignes de relation qui vérifient where sont lues et le domaine de l'ENUM de
+    {{ this }} est ajouté ; sans where, relation est lue entièrement.
+#}
+{% macro enum_values(column, relation, this_column=none, extra=[], where=none) %}
+    {%- if not execute -%}
+        {{ return([]) }}
+    {%- endif -%}
+    {%- set query -%}
+        SELECT DISTINCT CAST({{ column }} AS VARCHAR) AS value FROM {{ relation }} WHERE {{ column }} IS NOT NULL
+        {%- if is_incremental() and where %} AND ({{ where }}){% endif %}
+    {%- endset -%}
+    {%- set values = run_query(query).columns[0].values() | list -%}
+    {%- if is_incremental() -%}
+        {%- set values = values + enum_type_values(this, this_column or column) -%}
+    {%- endif -%}
+    {{ return((values + extra) | unique | sort) }}
+{% endmacro %}
+
+{# Domaine d'une colonne ENUM d'un modèle amont, sans lire ses lignes (repli sur enum_values sinon) #}
+{% macro upstream_enum_values(column, relation, extra=[]) %}
+    {%- if not execute -%}
+        {{ return([]) }}
+    {%- endif -%}
+    {%- set values = enum_type_values(relation, column) -%}
+    {%- if not values -%}
+        {{ return(enum_values(column, relation, extra=extra)) }}
+    {%- endif -%}
+    {{ return((values + extra) | unique | sort) }}
+{% endmacro %}
+
+{# CAST de expression en ENUM de values ; laissée en VARCHAR si aucune valeur n'est connue #}
+{% macro as_enum(expression, values) %}
+    {%- if values -%}
+        CAST({{ expression }} AS ENUM(
+            {%- for value in values -%}
+                '{{ value | replace("'", "''") }}'{{ ", " if not loop.last }}
+            {%- endfor -%}
+        ))
+    {%- else -%}
+        {{ expression }}
+    {%- endif -%}
+{% endmacro %}
+
+{#
+    Changement de type d'une colonne par on_schema_change (ENUM élargi, FLOAT vers DECIMAL) :
+    ALTER ... TYPE natif de DuckDB, la colonne garde sa position dans la table
+#}
+{% macro duckdb__alter_column_type(relation, column_name, new_column_type) %}
+    {% call statement('alter_column_type') %}
+        ALTER TABLE {{ relation }} ALTER COLUMN {{ adapter.quote(column_name) }} TYPE {{ new_column_type }}
+    {% endcall %}
+{% endmacro %}
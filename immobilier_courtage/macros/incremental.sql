@@ -0,0 +1,92 @@
+{#
+    Filtres des modèles incrémentaux.
+
+    Une exécution incrémentale traite les lignes chargées depuis le dernier build
+    (_loaded_at postérieur au maximum de la cible) et, si Dagster passe une fenêtre de
+    partition (--vars '{"min_date": "...", "max_date": "..."}'), toutes les lignes de
+    [min_date, max_date) pour les backfills. Un --full-refresh recalcule tout.
+#}
+
+{% macro in_partition_window(column) %}
+    {%- if var('min_date', none) and var('max_date', none) -%}
+        ({{ column }} >= CAST('{{ var("min_date") }}' AS TIMESTAMP) AND {{ column }} < CAST('{{ var("max_date") }}' AS TIMESTAMP))
+    {%- else -%}
+        FALSE
+    {%- endif -%}
+{% endmacro %}
+
+{% macro loaded_after_target(column='_loaded_at', target_column='_loaded_at') %}
+    {#- _loaded_at est au format 'YYYY-MM-DD HH:MM:SS' : l'ordre des chaînes est chronologique -#}
+    {{ column }} > (SELECT COALESCE(MAX({{ target_column }}), '') FROM {{ this }})
+{%- endmacro %}
+
+{# Condition des lignes à retraiter par un modèle silver #}
+{% macro incremental_predicate(date_column) %}
+    {{- loaded_after_target() }} OR {{ in_partition_window(date_column) -}}
+{% endmacro %}
+
+{# Lignes à retraiter par un modèle silver, clause WHERE incluse #}
+{% macro incremental_rows(date_column) %}
+    {%- if is_incremental() -%}
+        WHERE {{ incremental_predicate(date_column) }}
+    {%- endif -%}
+{% endmacro %}
+
+{#
+    Mois à recalculer par un modèle gold agrégé par mois : tout mois contenant au moins une
+    ligne de relation modifiée depuis le dernier build, ou compris dans la fenêtre de partition
+#}
+{% macro incremental_months(relation, date_column, target_column='derniere_mise_a_jour') %}
+    {%- if is_incremental() -%}
+        WHERE DATE_TRUNC('month', {{ date_column }}) IN (
+            SELECT DISTINCT DATE_TRUNC('month', {{ date_column }})
+            FROM {{ relation }}
+            WHERE {{ loaded_after_target('_loaded_at', target_column) }}
+        )
+        OR {{ in_partition_window(date_column) }}
+    {%- endif -%}
+{% endmacro %}
+
+{#
+    Suppressions en amont (lignes retirées de l'extrait, tombstones IsDeleted) : delete+insert ne
+    remplace que les clés du lot, une clé disparue resterait dans la cible. Les retrouver oblige à
+    comparer la cible à tout l'historique amont : cette réconciliation ne fait donc pas partie des
+    builds incrémentaux, dont la durée suit le volume du lot. Elle s'exécute avec
+    --vars '{"reconcile_deletions": true}' (job Dagster planifié reconcile_dbt_deletions) ;
+    un --full-refresh n'en a pas besoin, les tables étant reconstruites.
+#}
+{% macro reconcile_deletions() %}
+    {{ return(var('reconcile_deletions', false) and is_incremental()) }}
+{% endmacro %}
+
+{#
+    Post-hook (silver et gold, avant l'export Parquet) : avec reconcile_deletions, les clés de la
+    cible absentes du modèle amont sont effacées, comme les aurait écartées un --full-refresh.
+    Config du modèle :
+        delete_missing_keys={'key': <colonne de la cible>, 'ref': <modèle amont>, 'ref_key': <colonne amont, key par défaut>}
+#}
+{% macro delete_missing_keys() %}
+    {%- set missing_keys = config.get('delete_missing_keys') -%}
+    {%- if missing_keys and var('reconcile_deletions', false) -%}
+        {%- set ref_key = missing_keys.get('ref_key', missing_keys['key']) -%}
+        DELETE FROM {{ this }} WHERE {{ missing_keys['key'] }} NOT IN (
+            SELECT {{ ref_key }} FROM {{ ref(missing_keys['ref']) }} WHERE {{ ref_key }} IS NOT NULL
+        )
+    {%- endif -%}
+{%- endmacro %}
+
+{#
+    Valeurs de group_key (expression sur la cible) dont le nombre de lignes agrégées,
+    SUM(count_column) dans la cible, ne correspond plus au décompte upstream_count par relation_key
+    dans relation : des lignes amont ont été supprimées depuis le dernier build.
+    Sous-requête pour un filtre IN, lisant toute la cible : à n'utiliser que sous reconcile_deletions().
+#}
+{% macro keys_with_deletions(group_key, count_column, relation, relation_key, upstream_count='COUNT(*)') %}
+    SELECT target.group_key FROM (
+        SELECT {{ group_key }} AS group_key, SUM({{ count_column }}) AS row_count FROM {{ this }} GROUP BY 1
+    ) target
+    LEFT JOIN (
+        SELECT {{ relation_key }} AS group_key, {{ upstream_count }} AS row_count FROM {{ relation }} GROUP BY 1
+    ) upstream ON target.group_key = upstream.group_key
+    WHERE COALESCE(upstream.row_count, 0) <> target.row_count
+{%- endmacro %}
@@ -0,0 +1,50 @@
+{#
+    Organisation physique des tables silver et gold.
+
+    sort_keys (config du modèle ou +sort_keys dans dbt_project.yml) : colonnes de tri des
+    lignes écrites. Les tables triées ont des zone maps (min/max par row group) sélectives,
+    DuckDB saute alors les row groups hors des filtres de mois ou de segment du dashboard.
+    Un modèle incrémental (delete+insert) ne trie que chaque lot ajouté : l'ordre de la table se
+    dégrade d'un build à l'autre, jusqu'au prochain --full-refresh ou à resort_table.
+#}
+{% macro order_by_sort_keys() %}
+    {%- set sort_keys = config.get('sort_keys') -%}
+    {%- if sort_keys -%}
+        ORDER BY {{ sort_keys | join(', ') }}
+    {%- endif -%}
+{% endmacro %}
+
+{#
+    Post-hook (silver et gold, avant l'export Parquet) : avec --vars '{"resort_tables": true}'
+    (job Dagster planifié reconcile_dbt_deletions), une table incrémentale est réécrite entière
+    dans l'ordre de sort_keys, ce qui rend leur sélectivité aux zone maps.
+#}
+{% macro resort_table() %}
+    {%- if var('resort_tables', false) and is_incremental() and config.get('sort_keys') -%}
+        CREATE OR REPLACE TABLE {{ this }} AS SELECT * FROM {{ this }} {{ order_by_sort_keys() }}
+    {%- endif -%}
+{% endmacro %}
+
+{#
+    Export Parquet de la table construite (post-hook des modèles gold), actif seulement si
+    --vars '{"parquet_export_dir": "..."}' est fourni. Avec export_partition_by (colonne de mois),
+    la table est écrite en partitions Hive mois=AAAA-MM ; sinon en un seul fichier. Compression ZSTD.
+#}
+{% macro export_parquet() %}
+    {%- set export_dir = var('parquet_export_dir', none) -%}
+    {%- if export_dir and execute -%}
+        {%- set partition_by = config.get('export_partition_by') -%}
+        {%- if partition_by -%}
+            COPY (
+                SELECT *, strftime({{ partition_by }}, '%Y-%m') AS mois FROM {{ this }}
+                {{ order_by_sort_keys() }}
+            )
+            TO '{{ export_dir }}/{{ this.identifier }}'
+            (FORMAT PARQUET, COMPRESSION ZSTD, PARTITION_BY (mois), OVERWRITE_OR_IGNORE)
+        {%- else -%}
+            COPY (SELECT * FROM {{ this }} {{ order_by_sort_keys() }})
+            TO '{{ export_dir }}/{{ this.identifier }}.parquet'
+            (FORMAT PARQUET, COMPRESSION ZSTD)
+        {%- endif -%}
+    {%- endif -%}
+{% endmacro %}
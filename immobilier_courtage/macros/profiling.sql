@@ -0,0 +1,35 @@
+{#
+    Profilage DuckDB des modèles pendant leur build, actif seulement si
+    --vars '{"profile_dir": "..."}' est fourni (Dagster, option profile_models).
+
+    Le pre-hook active la sortie JSON du profileur vers <profile_dir>/<modèle>.json, le post-hook
+    (premier des post-hooks) la désactive. DuckDB réécrit ce fichier à chaque requête exécutée :
+    create_table_as désactive le profilage dès la requête du modèle terminée, le fichier garde son
+    profil et non celui des requêtes suivantes de la matérialisation (delete+insert depuis la table
+    temporaire d'un modèle incrémental, post-hooks). Une vue n'exécute pas sa requête à la création :
+    elle est profilée dans les modèles qui la lisent.
+#}
+{% macro start_profiling() %}
+    {%- if var('profile_dir', none) -%}
+        SET enable_profiling = 'json';
+        SET profiling_output = '{{ var("profile_dir") }}/{{ this.name }}.json'
+    {%- endif -%}
+{% endmacro %}
+
+{% macro stop_profiling() %}
+    {%- if var('profile_dir', none) -%}
+        RESET enable_profiling;
+        RESET profiling_output
+    {%- endif -%}
+{% endmacro %}
+
+{# CREATE TABLE ... AS de dbt-duckdb, suivi de l'arrêt du profilage quand il est actif #}
+{% macro duckdb__create_table_as(temporary, relation, compiled_code, language='sql') %}
+    {%- set sql = dbt.duckdb__create_table_as(temporary, relation, compiled_code, language) -%}
+    {%- if language == 'sql' and var('profile_dir', none) -%}
+        {{ sql }};
+        {{ stop_profiling() }}
+    {%- else -%}
+        {{ sql }}
+    {%- endif -%}
+{% endmacro %}
@@ -7,7 +7,7 @@
 }}
 
 WITH source AS (
-    SELECT * FROM source.raw_opportunites
+    SELECT * FROM {{ source('source', 'raw_opportunites') }}
 ),
 
 renamed AS (
@@ -79,6 +79,8 @@ renamed AS (
     FROM source
 ),
 
+-- Types déclarés dans sources.yml : montants en DECIMAL(18, 2) (centimes exacts),
+-- taux en pourcentage en DECIMAL(9, 4)
 clean_types AS (
     SELECT 
         opportunity_id,
@@ -96,20 +98,20 @@ clean_types AS (
         usage_bien,
         CAST(deja_souscrit_credit AS BOOLEAN) AS deja_souscrit_credit,
         CAST(connaissances_immobilier AS FLOAT) AS connaissances_immobilier,
-        CAST(montant_pret_principal AS FLOAT) AS montant_pret_principal,
-        CAST(montant_ptz AS FLOAT) AS montant_ptz,
-        CAST(montant_pel AS FLOAT) AS montant_pel,
-        CAST(montant_cel AS FLOAT) AS montant_cel,
-        CAST(montant_pret_relais AS FLOAT) AS montant_pret_relais,
-        CAST(montant_apport_personnel AS FLOAT) AS montant_apport_personnel,
-        CAST(montant_travaux AS FLOAT) AS montant_travaux,
+        CAST(montant_pret_principal AS DECIMAL(18, 2)) AS montant_pret_principal,
+        CAST(montant_ptz AS DECIMAL(18, 2)) AS montant_ptz,
+        CAST(montant_pel AS DECIMAL(18, 2)) AS montant_pel,
+        CAST(montant_cel AS DECIMAL(18, 2)) AS montant_cel,
+        CAST(montant_pret_relais AS DECIMAL(18, 2)) AS montant_pret_relais,
+        CAST(montant_apport_personnel AS DECIMAL(18, 2)) AS montant_apport_personnel,
+        CAST(montant_travaux AS DECIMAL(18, 2)) AS montant_travaux,
         CAST(duree_souhaitee AS FLOAT) AS duree_souhaitee,
-        CAST(mensualite_souhaitee AS FLOAT) AS mensualite_souhaitee,
-        CAST(taux_apport AS FLOAT) AS taux_apport,
-        CAST(taux_endettement AS FLOAT) AS taux_endettement,
-        CAST(total_revenus AS FLOAT) AS total_revenus,
-        CAST(total_charges AS FLOAT) AS total_charges,
-        CAST(revenu_residuel AS FLOAT) AS revenu_residuel,
+        CAST(mensualite_souhaitee AS DECIMAL(18, 2)) AS mensualite_souhaitee,
+        CAST(taux_apport AS DECIMAL(9, 4)) AS taux_apport,
+        CAST(taux_endettement AS DECIMAL(9, 4)) AS taux_endettement,
+        CAST(total_revenus AS DECIMAL(18, 2)) AS total_revenus,
+        CAST(total_charges AS DECIMAL(18, 2)) AS total_charges,
+        CAST(revenu_residuel AS DECIMAL(18, 2)) AS revenu_residuel,
         CAST(date_creation AS TIMESTAMP) AS date_creation,
         origine,
         etape,
@@ -122,11 +124,11 @@ clean_types AS (
         CAST(points_profil_initiaux AS FLOAT) AS points_profil_initiaux,
         CAST(points_profil_franchise AS FLOAT) AS points_profil_franchise,
         CAST(points_profil_initiaux_franchise AS FLOAT) AS points_profil_initiaux_franchise,
-        CAST(esperance_gain_plateforme AS FLOAT) AS esperance_gain_plateforme,
-        CAST(esperance_gain_plateforme_initiale AS FLOAT) AS esperance_gain_plateforme_initiale,
-        CAST(esperance_gain_franchise AS FLOAT) AS esperance_gain_franchise,
-        CAST(esperance_gain_franchise_initiale AS FLOAT) AS esperance_gain_franchise_initiale,
-        CAST(honoraires AS FLOAT) AS honoraires,
+        CAST(esperance_gain_plateforme AS DECIMAL(18, 2)) AS esperance_gain_plateforme,
+        CAST(esperance_gain_plateforme_initiale AS DECIMAL(18, 2)) AS esperance_gain_plateforme_initiale,
+        CAST(esperance_gain_franchise AS DECIMAL(18, 2)) AS esperance_gain_franchise,
+        CAST(esperance_gain_franchise_initiale AS DECIMAL(18, 2)) AS esperance_gain_franchise_initiale,
+        CAST(honoraires AS DECIMAL(18, 2)) AS honoraires,
         _loaded_at,
         _source_file
     FROM renamed
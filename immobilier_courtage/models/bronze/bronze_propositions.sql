@@ -7,7 +7,7 @@
 }}
 
 WITH source AS (
-    SELECT * FROM source.raw_propositions
+    SELECT * FROM {{ source('source', 'raw_propositions') }}
 ),
 
 renamed AS (
@@ -32,14 +32,15 @@ renamed AS (
     FROM source
 ),
 
+-- Taux en pourcentage en DECIMAL(9, 4), comme déclaré dans sources.yml
 clean_types AS (
     SELECT 
         proposition_id,
         opportunity_id,
         partenaire_id,
-        CAST(taux_hors_assurance AS FLOAT) AS taux_hors_assurance,
+        CAST(taux_hors_assurance AS DECIMAL(9, 4)) AS taux_hors_assurance,
         CAST(duree_pret_mois AS INTEGER) AS duree_pret_mois,
-        CAST(taux_assurance AS FLOAT) AS taux_assurance,
+        CAST(taux_assurance AS DECIMAL(9, 4)) AS taux_assurance,
         etape_source,
         CAST(date_creation AS TIMESTAMP) AS date_creation,
         _loaded_at,
@@ -2,7 +2,8 @@
     config(
         materialized='table',
         schema='gold',
-        tags=['gold', 'metrics', 'banques']
+        tags=['gold', 'metrics', 'banques'],
+        sort_keys=['partenaire_id']
     )
 }}
 
@@ -16,6 +17,12 @@ metriques_banques AS (
         partenaire_id,
         COUNT(*) AS nombre_propositions,
         COUNT(DISTINCT opportunity_id) AS nombre_opportunites,
+
+        -- Sommes et effectifs, additifs entre banques : moyennes pondérées sur plusieurs banques
+        COUNT(taux_hors_assurance) AS nombre_taux_hors_assurance,
+        SUM(taux_hors_assurance) AS somme_taux_hors_assurance,
+        COUNT(montant_pret_principal) AS nombre_montants,
+        SUM(montant_pret_principal) AS somme_montants,
         
         -- Taux moyens
         AVG(taux_hors_assurance) AS taux_moyen_hors_assurance,
@@ -53,4 +60,5 @@ metriques_banques AS (
     GROUP BY partenaire_id
 )
 
-SELECT * FROM metriques_banques
\ No newline at end of file
+SELECT * FROM metriques_banques
+{{ order_by_sort_keys() }}
\ No newline at end of file
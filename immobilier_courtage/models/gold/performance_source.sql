@@ -1,50 +1,78 @@
 {{
     config(
-        materialized='table',
+        materialized='incremental',
+        incremental_strategy='delete+insert',
+        unique_key='mois_acquisition',
         schema='gold',
-        tags=['gold', 'metrics', 'acquisition']
+        tags=['gold', 'metrics', 'acquisition'],
+        sort_keys=['mois_acquisition', 'origine'],
+        export_partition_by='mois_acquisition',
+        delete_missing_keys={'key': 'mois_acquisition', 'ref': 'opportunites_enrichies', 'ref_key': 'mois_creation'}
     )
 }}
 
 WITH opportunites AS (
     SELECT * FROM {{ ref('opportunites_enrichies') }}
+    {{ incremental_months(ref('opportunites_enrichies'), 'date_creation') }}
+    {% if is_incremental() %}
+        -- Mois des opportunités dont le résumé des propositions a changé depuis le dernier build
+        OR DATE_TRUNC('month', date_creation) IN (
+            SELECT DISTINCT DATE_TRUNC('month', o.date_creation)
+            FROM {{ ref('opportunites_enrichies') }} o
+            JOIN {{ ref('propositions_par_opportunite') }} p ON o.opportunity_id = p.opportunity_id
+            WHERE {{ loaded_after_target('p._loaded_at', 'derniere_mise_a_jour') }}
+        )
+    {% endif %}
+    {% if reconcile_deletions() %}
+        -- Mois dont des opportunités ou des propositions ont été supprimées depuis le dernier build
+        OR mois_creation IN (
+            {{ keys_with_deletions('mois_acquisition', 'nombre_opportunites', ref('opportunites_enrichies'), 'mois_creation') }}
+        )
+        OR mois_creation IN (
+            {{ keys_with_deletions(
+                'mois_acquisition', 'ROUND(ratio_propositions_par_opportunite * nombre_opportunites)',
+                '(SELECT o.mois_creation, p.nombre_propositions FROM ' ~ ref('opportunites_enrichies') ~ ' o JOIN '
+                    ~ ref('propositions_par_opportunite') ~ ' p ON o.opportunity_id = p.opportunity_id)',
+                'mois_creation', 'SUM(nombre_propositions)'
+            ) }}
+        )
+    {% endif %}
 ),
 
 propositions AS (
-    SELECT * FROM {{ ref('propositions_enrichies') }}
+    SELECT * FROM {{ ref('propositions_par_opportunite') }}
 ),
 
--- Agrégation des opportunités par source d'acquisition
+-- Agrégation des opportunités par source d'acquisition, jointes 1:1 à leur résumé de propositions
 performance_source AS (
     SELECT
         o.origine,
         DATE_TRUNC('month', o.date_creation) AS mois_acquisition,
         
         -- Volume d'acquisitions
-        COUNT(DISTINCT o.opportunity_id) AS nombre_opportunites,
+        COUNT(*) AS nombre_opportunites,
         
         -- Conversions
         SUM(o.is_converted) AS nombre_converties,
-        SUM(o.is_converted) / CAST(COUNT(DISTINCT o.opportunity_id) AS FLOAT) * 100 AS taux_conversion,
+        SUM(o.is_converted) / CAST(COUNT(*) AS FLOAT) * 100 AS taux_conversion,
         
         -- Taux de génération de propositions
-        COUNT(DISTINCT CASE WHEN p.proposition_id IS NOT NULL THEN o.opportunity_id ELSE NULL END) AS opportunites_avec_propositions,
-        COUNT(DISTINCT CASE WHEN p.proposition_id IS NOT NULL THEN o.opportunity_id ELSE NULL END) / 
-            CAST(COUNT(DISTINCT o.opportunity_id) AS FLOAT) * 100 AS taux_generation_propositions,
+        COUNT(p.opportunity_id) AS opportunites_avec_propositions,
+        COUNT(p.opportunity_id) / CAST(COUNT(*) AS FLOAT) * 100 AS taux_generation_propositions,
         
         -- Nombre moyen de propositions par opportunité
-        COUNT(DISTINCT p.proposition_id) / CAST(COUNT(DISTINCT o.opportunity_id) AS FLOAT) AS ratio_propositions_par_opportunite,
+        COALESCE(SUM(p.nombre_propositions), 0) / CAST(COUNT(*) AS FLOAT) AS ratio_propositions_par_opportunite,
         
         -- Valeur des opportunités
         AVG(o.montant_total_pret) AS montant_moyen_pret,
         SUM(o.esperance_gain_plateforme) AS esperance_gain_total,
-        SUM(o.esperance_gain_plateforme) / COUNT(DISTINCT o.opportunity_id) AS esperance_gain_moyen_par_opportunite,
+        SUM(o.esperance_gain_plateforme) / COUNT(*) AS esperance_gain_moyen_par_opportunite,
         
         -- ROI théorique (basé sur l'espérance de gain)
         SUM(CASE WHEN o.is_converted = 1 THEN o.esperance_gain_plateforme ELSE 0 END) AS gain_realise,
         
         -- Données de traçabilité
-        MAX(o._loaded_at) AS derniere_mise_a_jour
+        GREATEST(MAX(o._loaded_at), MAX(p._loaded_at)) AS derniere_mise_a_jour
     FROM opportunites o
     LEFT JOIN propositions p ON o.opportunity_id = p.opportunity_id
     GROUP BY
@@ -52,4 +80,5 @@ performance_source AS (
         DATE_TRUNC('month', o.date_creation)
 )
 
-SELECT * FROM performance_source
\ No newline at end of file
+SELECT * FROM performance_source
+{{ order_by_sort_keys() }}
\ No newline at end of file
@@ -0,0 +1,89 @@
+{{
+    config(
+        materialized='table',
+        schema='gold',
+        tags=['gold', 'metrics', 'taux'],
+        sort_keys=['segment_age', 'segment_revenus', 'usage_bien', 'type_projet', 'categorie_professionnelle']
+    )
+}}
+
+WITH propositions AS (
+    SELECT * FROM {{ ref('propositions_enrichies') }}
+),
+
+-- Segmentation client, identique à taux_par_profil
+propositions_segmentees AS (
+    SELECT
+        CASE
+            WHEN age_emprunteur < 30 THEN 'Jeune'
+            WHEN age_emprunteur BETWEEN 30 AND 45 THEN 'Milieu de vie'
+            WHEN age_emprunteur > 45 THEN 'Senior'
+            ELSE 'Non défini'
+        END AS segment_age,
+
+        CASE
+            WHEN total_revenus <= 3000 THEN 'Revenus modestes'
+            WHEN total_revenus BETWEEN 3001 AND 6000 THEN 'Revenus moyens'
+            WHEN total_revenus > 6000 THEN 'Revenus élevés'
+            ELSE 'Non défini'
+        END AS segment_revenus,
+
+        COALESCE(usage_bien, 'Non défini') AS usage_bien,
+        COALESCE(type_projet, 'Non défini') AS type_projet,
+        COALESCE(categorie_professionnelle, 'Non défini') AS categorie_professionnelle,
+
+        taux_hors_assurance,
+        taux_assurance,
+        _loaded_at
+    FROM propositions
+),
+
+-- Une cellule par combinaison de filtres : une dimension agrégée vaut 'Tous',
+-- la valeur « pas de filtre » des listes déroulantes du dashboard
+segment_cube AS (
+    SELECT
+        CASE WHEN GROUPING(segment_age) = 1 THEN 'Tous' ELSE segment_age END AS segment_age,
+        CASE WHEN GROUPING(segment_revenus) = 1 THEN 'Tous' ELSE segment_revenus END AS segment_revenus,
+        CASE WHEN GROUPING(usage_bien) = 1 THEN 'Tous' ELSE usage_bien END AS usage_bien,
+        CASE WHEN GROUPING(type_projet) = 1 THEN 'Tous' ELSE type_projet END AS type_projet,
+        CASE WHEN GROUPING(categorie_professionnelle) = 1 THEN 'Tous' ELSE categorie_professionnelle END AS categorie_professionnelle,
+        GROUPING(segment_age, segment_revenus, usage_bien, type_projet, categorie_professionnelle) AS niveau_agregation,
+
+        -- Sommes et effectifs, additifs entre cellules
+        COUNT(*) AS nombre_propositions,
+        COUNT(taux_hors_assurance) AS nombre_taux_hors_assurance,
+        SUM(taux_hors_assurance) AS somme_taux_hors_assurance,
+        COUNT(taux_assurance) AS nombre_taux_assurance,
+        SUM(taux_assurance) AS somme_taux_assurance,
+
+        -- Moyennes pondérées par le nombre de propositions de la cellule
+        SUM(taux_hors_assurance) / NULLIF(COUNT(taux_hors_assurance), 0) AS taux_moyen_hors_assurance,
+        SUM(taux_assurance) / NULLIF(COUNT(taux_assurance), 0) AS taux_moyen_assurance,
+        MIN(taux_hors_assurance) AS taux_min_hors_assurance,
+        MAX(taux_hors_assurance) AS taux_max_hors_assurance,
+
+        -- Histogramme des taux au centième de point : fusionnable entre cellules
+        -- (somme des effectifs par taux), d'où l'on peut recalculer n'importe quel percentile
+        histogram(ROUND(taux_hors_assurance, 2)) FILTER (WHERE taux_hors_assurance IS NOT NULL) AS histogramme_taux_hors_assurance,
+        approx_quantile(taux_hors_assurance, 0.25) AS taux_q1,
+        approx_quantile(taux_hors_assurance, 0.5) AS taux_median,
+        approx_quantile(taux_hors_assurance, 0.75) AS taux_q3,
+
+        -- Données de traçabilité
+        MAX(_loaded_at) AS derniere_mise_a_jour
+    FROM propositions_segmentees
+    GROUP BY CUBE (segment_age, segment_revenus, usage_bien, type_projet, categorie_professionnelle)
+)
+
+-- Dimensions en ENUM, « Tous » et « Non défini » compris.
+-- Trié par dimensions (sort_keys) : les recherches d'une cellule ne lisent que quelques row groups
+SELECT * REPLACE (
+    {%- for column in ['segment_age', 'segment_revenus'] %}
+    {{ as_enum(column, category_values(column, ['Tous'])) }} AS {{ column }},
+    {%- endfor %}
+    {%- for column in ['usage_bien', 'type_projet', 'categorie_professionnelle'] %}
+    {{ as_enum(column, upstream_enum_values(column, ref('propositions_enrichies'), extra=['Non défini', 'Tous'])) }} AS {{ column }}{{ "," if not loop.last }}
+    {%- endfor %}
+)
+FROM segment_cube
+{{ order_by_sort_keys() }}
\ No newline at end of file
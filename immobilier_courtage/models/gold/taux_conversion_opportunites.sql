@@ -1,13 +1,25 @@
 {{
     config(
-        materialized='table',
+        materialized='incremental',
+        incremental_strategy='delete+insert',
+        unique_key='mois_creation',
         schema='gold',
-        tags=['gold', 'metrics', 'conversion']
+        tags=['gold', 'metrics', 'conversion'],
+        sort_keys=['mois_creation', 'origine'],
+        export_partition_by='mois_creation',
+        delete_missing_keys={'key': 'mois_creation', 'ref': 'opportunites_enrichies'}
     )
 }}
 
 WITH opportunites AS (
     SELECT * FROM {{ ref('opportunites_enrichies') }}
+    {{ incremental_months(ref('opportunites_enrichies'), 'date_creation') }}
+    {% if reconcile_deletions() %}
+        -- Mois dont des opportunités ont été supprimées depuis le dernier build
+        OR mois_creation IN (
+            {{ keys_with_deletions('mois_creation', 'total_opportunites', ref('opportunites_enrichies'), 'mois_creation') }}
+        )
+    {% endif %}
 ),
 
 -- Calcul des taux de conversion par différentes dimensions
@@ -62,4 +74,5 @@ conversions AS (
         usage_bien
 )
 
-SELECT * FROM conversions
\ No newline at end of file
+SELECT * FROM conversions
+{{ order_by_sort_keys() }}
\ No newline at end of file
@@ -2,7 +2,8 @@
     config(
         materialized='table',
         schema='gold',
-        tags=['gold', 'metrics', 'taux']
+        tags=['gold', 'metrics', 'taux'],
+        sort_keys=['segment_age', 'segment_revenus', 'usage_bien', 'type_projet']
     )
 }}
 
@@ -86,4 +87,11 @@ taux_par_profil AS (
         usage_bien
 )
 
-SELECT * FROM taux_par_profil
\ No newline at end of file
+-- Segments en ENUM ; les autres dimensions le sont déjà en silver
+SELECT * REPLACE (
+    {%- for column in ['segment_age', 'segment_revenus', 'segment_endettement'] %}
+    {{ as_enum(column, category_values(column)) }} AS {{ column }}{{ "," if not loop.last }}
+    {%- endfor %}
+)
+FROM taux_par_profil
+{{ order_by_sort_keys() }}
\ No newline at end of file
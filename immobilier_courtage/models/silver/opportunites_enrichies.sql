@@ -1,13 +1,18 @@
 {{
     config(
-        materialized='table',
+        materialized='incremental',
+        incremental_strategy='delete+insert',
+        unique_key='opportunity_id',
         schema='silver',
-        tags=['silver', 'opportunities']
+        tags=['silver', 'opportunities'],
+        sort_keys=['mois_creation', 'origine'],
+        delete_missing_keys={'key': 'opportunity_id', 'ref': 'bronze_opportunites'}
     )
 }}
 
 WITH opportunites AS (
     SELECT * FROM {{ ref('bronze_opportunites') }}
+    {{ incremental_rows('date_creation') }}
 ),
 
 -- Enrichissement avec les métriques calculées
@@ -109,4 +114,16 @@ opportunites_enrichies AS (
     FROM opportunites
 )
 
-SELECT * FROM opportunites_enrichies
\ No newline at end of file
+-- Colonnes catégorielles en ENUM (macros/categorical.sql)
+{%- set bronze = ref('bronze_opportunites') %}
+SELECT * REPLACE (
+    {%- for column in ['origine', 'etape', 'banque_principale', 'categorie_professionnelle', 'contrat_travail',
+                       'situation_actuelle', 'type_bien', 'type_projet', 'usage_bien'] %}
+    {{ as_enum(column, enum_values(column, bronze, where=incremental_predicate('date_creation'))) }} AS {{ column }},
+    {%- endfor %}
+    {%- for column in ['phase_commerciale', 'segment_age', 'segment_revenus', 'segment_emploi'] %}
+    {{ as_enum(column, category_values(column)) }} AS {{ column }}{{ "," if not loop.last }}
+    {%- endfor %}
+)
+FROM opportunites_enrichies
+{{ order_by_sort_keys() }}
\ No newline at end of file
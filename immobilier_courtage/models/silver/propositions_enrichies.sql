@@ -1,13 +1,37 @@
 {{
     config(
-        materialized='table',
+        materialized='incremental',
+        incremental_strategy='delete+insert',
+        unique_key='proposition_id',
         schema='silver',
-        tags=['silver', 'propositions']
+        tags=['silver', 'propositions'],
+        sort_keys=['mois_creation', 'partenaire_id'],
+        delete_missing_keys={'key': 'proposition_id', 'ref': 'bronze_propositions'}
     )
 }}
 
 WITH propositions AS (
     SELECT * FROM {{ ref('bronze_propositions') }}
+    {{ incremental_rows('date_creation') }}
+    {% if is_incremental() %}
+        -- Opportunités arrivées ou modifiées après leurs propositions : celles-ci sont ré-enrichies
+        OR opportunity_id IN (
+            SELECT opportunity_id FROM {{ ref('bronze_opportunites') }} WHERE {{ loaded_after_target() }}
+        )
+    {% endif %}
+    {% if reconcile_deletions() %}
+        -- Propositions encore enrichies d'une opportunité supprimée depuis : leurs colonnes d'opportunité repassent à NULL
+        OR proposition_id IN (
+            SELECT proposition_id FROM {{ this }}
+            WHERE opportunity_id NOT IN (
+                SELECT opportunity_id FROM {{ ref('bronze_opportunites') }} WHERE opportunity_id IS NOT NULL
+            )
+            AND COALESCE(
+                CAST(origine_opportunite AS VARCHAR), CAST(type_projet AS VARCHAR), CAST(usage_bien AS VARCHAR),
+                CAST(montant_pret_principal AS VARCHAR), CAST(total_revenus AS VARCHAR), CAST(age_emprunteur AS VARCHAR)
+            ) IS NOT NULL
+        )
+    {% endif %}
 ),
 
 opportunites AS (
@@ -74,10 +98,34 @@ propositions_enrichies AS (
         p.date_creation,
         DATE_TRUNC('month', p.date_creation) AS mois_creation,
         
-        -- Données de traçabilité
-        p._loaded_at
+        -- Données de traçabilité : dernier chargement de la proposition ou de son opportunité
+        GREATEST(p._loaded_at, COALESCE(o._loaded_at, p._loaded_at)) AS _loaded_at
     FROM propositions p
     LEFT JOIN opportunites o ON p.opportunity_id = o.opportunity_id
 )
 
-SELECT * FROM propositions_enrichies
\ No newline at end of file
+-- Colonnes catégorielles en ENUM (macros/categorical.sql), en incrémental d'après les seules lignes du lot :
+-- opportunités modifiées ou jointes aux propositions du lot, propositions du lot
+{%- set bronze = ref('bronze_opportunites') %}
+{%- set opportunites_du_lot -%}
+    {{ loaded_after_target() }} OR opportunity_id IN (
+        SELECT opportunity_id FROM {{ ref('bronze_propositions') }} WHERE {{ incremental_predicate('date_creation') }}
+    )
+{%- endset %}
+{%- set propositions_du_lot -%}
+    {{ incremental_predicate('date_creation') }} OR opportunity_id IN (
+        SELECT opportunity_id FROM {{ bronze }} WHERE {{ loaded_after_target() }}
+    )
+{%- endset %}
+SELECT * REPLACE (
+    {%- for column in ['type_projet', 'usage_bien', 'categorie_professionnelle', 'contrat_travail'] %}
+    {{ as_enum(column, enum_values(column, bronze, where=opportunites_du_lot)) }} AS {{ column }},
+    {%- endfor %}
+    {{ as_enum('origine_opportunite', enum_values('origine', bronze, 'origine_opportunite', where=opportunites_du_lot)) }} AS origine_opportunite,
+    {{ as_enum('partenaire_id', enum_values('partenaire_id', ref('bronze_propositions'), where=propositions_du_lot)) }} AS partenaire_id,
+    {%- for column in ['categorie_taux', 'source_proposition', 'eligibilite'] %}
+    {{ as_enum(column, category_values(column)) }} AS {{ column }}{{ "," if not loop.last }}
+    {%- endfor %}
+)
+FROM propositions_enrichies
+{{ order_by_sort_keys() }}
\ No newline at end of file
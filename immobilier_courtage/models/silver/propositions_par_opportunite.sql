@@ -0,0 +1,57 @@
+{{
+    config(
+        materialized='incremental',
+        incremental_strategy='delete+insert',
+        unique_key='opportunity_id',
+        schema='silver',
+        tags=['silver', 'propositions'],
+        sort_keys=['opportunity_id'],
+        delete_missing_keys={'key': 'opportunity_id', 'ref': 'propositions_enrichies'}
+    )
+}}
+
+-- Toutes les propositions des opportunités dont au moins une proposition a changé
+WITH propositions AS (
+    SELECT * FROM {{ ref('propositions_enrichies') }}
+    WHERE opportunity_id IS NOT NULL
+    {% if is_incremental() %}
+        AND opportunity_id IN (
+            SELECT opportunity_id FROM {{ ref('propositions_enrichies') }}
+            WHERE {{ loaded_after_target() }} OR {{ in_partition_window('date_creation') }}
+        )
+    {% endif %}
+    {% if reconcile_deletions() %}
+        -- Opportunités dont des propositions ont été supprimées
+        OR opportunity_id IN (
+            {{ keys_with_deletions('opportunity_id', 'nombre_propositions', ref('propositions_enrichies'), 'opportunity_id') }}
+        )
+    {% endif %}
+),
+
+-- Une ligne par opportunité : les modèles gold la joignent en 1:1
+propositions_par_opportunite AS (
+    SELECT
+        opportunity_id,
+
+        -- Volume de propositions
+        COUNT(*) AS nombre_propositions,
+        COUNT(DISTINCT partenaire_id) AS nombre_banques,
+        SUM(CASE WHEN eligibilite = 'Éligible' THEN 1 ELSE 0 END) AS nombre_propositions_eligibles,
+
+        -- Meilleures conditions obtenues
+        MIN(taux_hors_assurance) AS meilleur_taux_hors_assurance,
+        MIN(taux_effectif_global) AS meilleur_taux_effectif_global,
+        AVG(taux_hors_assurance) AS taux_moyen_hors_assurance,
+
+        -- Dates
+        MIN(date_creation) AS date_premiere_proposition,
+        MAX(date_creation) AS date_derniere_proposition,
+
+        -- Données de traçabilité
+        MAX(_loaded_at) AS _loaded_at
+    FROM propositions
+    GROUP BY opportunity_id
+)
+
+SELECT * FROM propositions_par_opportunite
+{{ order_by_sort_keys() }}
\ No newline at end of file
@@ -1,19 +1,16 @@
 import streamlit as st
-import duckdb
-import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
-import sys
-from streamlit_extras.app_logo import add_logo
-from config import COLORS, PLOT_CONFIG, TEXTS
+from config import PLOT_CONFIG
+from queries import (
+    load_concurrently, load_metrics_banques, load_kpis_banques, load_durees_pret, load_taux_par_dimension,
+    load_kpis_opportunites, load_performance_source, load_conversion_opportunites,
+)
 # Ajout du chemin racine au path pour pouvoir importer utils et config
 script_dir = os.path.dirname(os.path.abspath(__file__))
 css_path = os.path.join(script_dir, "assets", "css", "style.css")
 
-DATABASE_NAME = os.getenv('DATABASE_NAME', 'immobilier_courtage')
-
 # Configuration de la page
 st.set_page_config(
     page_title="Dashboard Courtage Immobilier",
@@ -32,70 +29,56 @@ try:
 except FileNotFoundError:
     st.error(f"Could not find CSS file at: {css_path}")
 
-@st.cache_resource
-def get_connect_to_motherduck():
-    """
-    Establishes a connection to MotherDuck using a token from environment variable or Streamlit secrets
-    """
-    try:
-        # First check for token in environment variables
-        token = os.environ.get("MOTHERDUCK_TOKEN")
-        
-        # If not in environment variables, try to get from Streamlit secrets
-        if not token and hasattr(st, "secrets") and "MOTHERDUCK_TOKEN" in st.secrets:
-            token = st.secrets["default"]["MOTHERDUCK_TOKEN"]
-        
-        if not token:
-            st.error("MotherDuck token not found. Please set MOTHERDUCK_TOKEN environment variable or add it to Streamlit secrets.")
-            st.stop()
-        
-        # Set the token in the environment for DuckDB to use
-        os.environ["MOTHERDUCK_TOKEN"] = token
-        
-        # Connect to MotherDuck
-        conn = duckdb.connect(f"md:{DATABASE_NAME}", read_only=True)
-        return conn
-    except Exception as e:
-        st.error(f"Error connecting to MotherDuck: {e}")
-        st.stop()
-
-
-# Fonction générique pour charger les données
-@st.cache_data(ttl=3600)
-def load_data(query, periode=None, date_column=None):
-    """Charge les données depuis la base avec un filtre de période facultatif"""
-    conn = get_connect_to_motherduck()
-    if periode and date_column:
-        date_limite = (datetime.now() - timedelta(days=periode)).strftime('%Y-%m-%d')
-        query += f" WHERE {date_column} >= '{date_limite}'"
-    try:
-        return conn.execute(query).fetchdf()
-    except Exception as e:
-        st.error(f"Erreur lors du chargement des données: {e}")
-        st.stop()
+# Sections du dashboard : chaque fragment charge ses propres données à l'affichage
+# et se réexécute seul quand l'un de ses filtres change
+@st.fragment(parallel=True)
+def section_banques():
+    """KPIs, aperçu et durées des prêts, issus de metriques_banques (indépendants des filtres)"""
+    # Requêtes indépendantes exécutées en parallèle
+    with st.spinner("Chargement des indicateurs..."):
+        kpis_banques, df_banques, df_durees = load_concurrently(
+            load_kpis_banques, lambda: load_metrics_banques(limit=10), load_durees_pret,
+        )
+    kpis_banques = kpis_banques.iloc[0]
 
-# Chargement des différentes métriques
-def load_metrics_banques():
-    return load_data("SELECT * FROM main_gold.metriques_banques")
+    # KPIs principaux
+    st.header("Indicateurs clés de performance")
+    col1, col2, col3, col4 = st.columns(4)
+    
+    #col1.metric("Nombre d'opportunités", f"{total_opportunites:,}".replace(",", " "))
+    col1.metric("🏦 Nombre de banques", int(kpis_banques['nombre_banques']))
+    col2.metric("💰 Nombre de propositions", f"{kpis_banques['nombre_propositions']:,.0f}".replace(",", " ") if kpis_banques['nombre_banques'] else 0)
+    #col3.metric("☁️ Taux de conversion", f"{taux_conversion_global:.1f}%")
+    col3.metric("☁️ Montant moyen du prêt", f"{kpis_banques['montant_moyen']:,.0f} €")
+    col4.metric("🌟 Taux moyen hors assurance", f"{kpis_banques['taux_moyen_hors_assurance']:.2f}%" if kpis_banques['nombre_banques'] else "0.00%")
+    
+    # Aperçu des données filtrées
+    with st.expander("Aperçu des données"):
+        st.dataframe(df_banques, use_container_width=True)
 
-def load_conversion_opportunites(periode):
-    return load_data("SELECT * FROM main_gold.taux_conversion_opportunites")
+    if not df_banques.empty:
+        # Tri des banques par nombre de propositions                
+    
+        st.subheader("Répartition des durées de prêt")
+        duree_data = df_durees.iloc[0].fillna(0).reset_index()
 
-def load_taux_profil():
-    return load_data("SELECT * FROM main_gold.taux_par_profil")
+        duree_data.columns = ['Durée', 'Nombre']
+        duree_data['Durée'] = duree_data['Durée'].str.replace('count_duree_', '').str.replace('_', ' ').str.replace('ou moins', '≤ 15 ans').str.replace('plus 25ans', '> 25 ans')
 
-def load_performance_source(periode):
-    return load_data("SELECT * FROM main_gold.performance_source", periode, "mois_acquisition")
+        fig_duree = px.bar(
+            duree_data,
+            x='Durée',
+            y='Nombre',
+            title="Répartition globale des durées de prêt",
+            labels={"Durée": "Durée du prêt", "Nombre": "Nombre de prêts"}
+        )
+        st.plotly_chart(fig_duree, use_container_width=True)
 
-# Interface utilisateur Streamlit
-def main():
-    
-    #st.sidebar.image("../images/luffy.jpg")
 
-    # Sidebar pour les filtres
-    st.sidebar.title("Filtres")
-    
-    # Filtre de période
+@st.fragment
+def section_conversion():
+    """Acquisition et conversion des opportunités, filtrées par la période d'analyse de la barre latérale"""
+    # Filtre de période : ne réexécute que cette section, la période est évaluée dans DuckDB
     periode_options = {
         "Dernier mois": 30,
         "Dernier trimestre": 90,
@@ -108,8 +91,57 @@ def main():
         index=2  # Par défaut: dernière année
     )
     periode = periode_options[periode_selectionnee]
-    
-    # Filtres additionnels
+
+    with st.spinner("Chargement des conversions..."):
+        kpis_opportunites, df_perf_source, df_conversion = load_concurrently(
+            lambda: load_kpis_opportunites(periode),
+            lambda: load_performance_source(periode),
+            lambda: load_conversion_opportunites(periode),
+        )
+    kpis_opportunites = kpis_opportunites.iloc[0]
+    total_opportunites = int(kpis_opportunites['nombre_opportunites'])
+    total_converties = int(kpis_opportunites['nombre_converties'])
+    taux_conversion_global = (total_converties / total_opportunites * 100) if total_opportunites > 0 else 0
+
+    st.header(f"Acquisition et conversion : {periode_selectionnee.lower()}")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("📋 Nombre d'opportunités", f"{total_opportunites:,}".replace(",", " "))
+    col2.metric("✅ Opportunités converties", f"{total_converties:,}".replace(",", " "))
+    col3.metric("☁️ Taux de conversion", f"{taux_conversion_global:.1f}%")
+
+    if not df_perf_source.empty:
+        col1, col2 = st.columns(2)
+
+        with col1:
+            # Volume et conversion par source d'acquisition
+            fig_source = px.bar(
+                df_perf_source,
+                x='origine',
+                y='nombre_opportunites',
+                color='taux_conversion',
+                title="Opportunités par source d'acquisition",
+                labels={'origine': 'Source', 'nombre_opportunites': 'Opportunités', 'taux_conversion': 'Conversion (%)'},
+                color_continuous_scale=px.colors.sequential.Blues,
+            )
+            st.plotly_chart(fig_source, use_container_width=True)
+
+        with col2:
+            # Évolution mensuelle du taux de conversion
+            fig_conversion = px.line(
+                df_conversion,
+                x='mois_creation',
+                y='taux_conversion',
+                title="Taux de conversion mensuel",
+                labels={'mois_creation': 'Mois', 'taux_conversion': 'Taux de conversion (%)'},
+                markers=True,
+            )
+            st.plotly_chart(fig_conversion, use_container_width=True)
+
+
+@st.fragment
+def section_segments():
+    """Analyses par segment client, filtrées par les filtres avancés de la barre latérale"""
+    # Filtres additionnels : ne réexécutent que cette section
     with st.sidebar.expander("Filtres avancés"):
         # Filtre pour le segment client
         segment_age_options = ["Tous", "Jeune", "Milieu de vie", "Senior"]
@@ -120,53 +152,13 @@ def main():
         
         usage_bien_options = ["Tous", "Résidence principale", "Investissement locatif"]
         usage_bien = st.selectbox("Usage du bien", usage_bien_options, index=0)
-    
-    # Chargement des données avec indicateurs de chargement
-    with st.spinner("Chargement des données..."):
-        df_banques = load_metrics_banques()
-        df_conversion = load_conversion_opportunites(periode)
-        df_taux_profil = load_taux_profil()
-        df_perf_source = load_performance_source(periode)
-        
-        # Application des filtres avancés (si nécessaire)
-        if segment_age != "Tous" and "segment_age" in df_taux_profil.columns:
-            df_taux_profil = df_taux_profil[df_taux_profil["segment_age"] == segment_age]
-        
-        if segment_revenus != "Tous" and "segment_revenus" in df_taux_profil.columns:
-            df_taux_profil = df_taux_profil[df_taux_profil["segment_revenus"] == segment_revenus]
-            
-        if usage_bien != "Tous" and "usage_bien" in df_taux_profil.columns:
-            df_taux_profil = df_taux_profil[df_taux_profil["usage_bien"] == usage_bien]
-    
-    # En-tête de la page
-    st.title("📈 Dashboard Courtage Immobilier : France")
-    st.markdown(f"*Données à jour au {datetime.now().strftime('%d/%m/%Y')}*")
-    
-    # KPIs principaux
-    st.header("Indicateurs clés de performance")
-    col1, col2, col3, col4 = st.columns(4)
-    
-    total_opportunites = df_perf_source["nombre_opportunites"].count() if not df_perf_source.empty else 0
-    total_converties = df_perf_source["nombre_converties"].sum() if not df_perf_source.empty else 0
-    #taux_conversion_global = (total_converties / total_opportunites * 100) if total_opportunites > 0 else 0
-    
-    #col1.metric("Nombre d'opportunités", f"{total_opportunites:,}".replace(",", " "))
-    col1.metric("🏦 Nombre de banques", df_banques['partenaire_id'].nunique())
-    col2.metric("💰 Nombre de propositions", f"{df_banques['nombre_propositions'].sum():,}".replace(",", " ") if not df_banques.empty else 0)
-    #col3.metric("☁️ Taux de conversion", f"{taux_conversion_global:.1f}%")
-    col3.metric("☁️ Montant moyen du prêt", f"{df_banques['montant_moyen'].mean():,.0f} €")
-    col4.metric("🌟 Taux moyen hors assurance", f"{df_banques['taux_moyen_hors_assurance'].mean():.2f}%" if not df_banques.empty else "0.00%")
-    
-    # Aperçu des données filtrées
-    with st.expander("Aperçu des données"):
-        st.dataframe(df_banques.head(10), use_container_width=True)
+    segments = dict(segment_age=segment_age, segment_revenus=segment_revenus, usage_bien=usage_bien)
 
     # --------- SECTION 2: ANALYSE DES  PROPOSITION TES PAR SEGMENT D'AGE ---------
     st.header("Analyse des propositions par segment d'age")
     # Calcul des ventes par catégorie
-    proposition_per_age = df_taux_profil.groupby("segment_age")["nombre_propositions"].sum().reset_index()
-    proposition_per_age = proposition_per_age.rename(columns={"nombre_propositions": "total_propositions"})
-    proposition_per_age = proposition_per_age.sort_values("total_propositions", ascending=False)
+    age_data = load_taux_par_dimension(("segment_age",), **segments)
+    proposition_per_age = age_data.rename(columns={"nombre_propositions": "total_propositions"})
 
 
     # Visualisation des ventes par catégorie avec un graphique en barres
@@ -189,46 +181,19 @@ def main():
     )
 
     st.plotly_chart(fig1, use_container_width=True)
-    
-    
-    if not df_banques.empty:
-        # Tri des banques par nombre de propositions                
-    
-        st.subheader("Répartition des durées de prêt")
-        duree_data = df_banques[[
-            'count_duree_15ans_ou_moins',
-            'count_duree_15_20ans',
-            'count_duree_20_25ans',
-            'count_duree_plus_25ans']].sum().reset_index()
 
-        duree_data.columns = ['Durée', 'Nombre']
-        duree_data['Durée'] = duree_data['Durée'].str.replace('count_duree_', '').str.replace('_', ' ').str.replace('ou moins', '≤ 15 ans').str.replace('plus 25ans', '> 25 ans')
-
-        fig_duree = px.bar(
-            duree_data,
-            x='Durée',
-            y='Nombre',
-            title="Répartition globale des durées de prêt",
-            labels={"Durée": "Durée du prêt", "Nombre": "Nombre de prêts"}
-        )
-        st.plotly_chart(fig_duree, use_container_width=True)
-
-
-    
     # Profil des clients
     st.header("Analyse des profils clients")
     
-    if not df_taux_profil.empty:
-        # Regroupement par segment d'âge
-        tabs_profil = st.tabs(["Segment d'âge", "Niveau de revenus", "Situation professionnelle", "Type de projet"])
+    if not age_data.empty:
+        # Regroupement par segment d'âge ; seul l'onglet ouvert est calculé et charge ses données
+        tabs_profil = st.tabs(
+            ["Segment d'âge", "Niveau de revenus", "Situation professionnelle", "Type de projet"],
+            key="onglets_profil", on_change="rerun",
+        )
         
         with tabs_profil[0]:
-            if "segment_age" in df_taux_profil.columns:
-                age_data = df_taux_profil.groupby('segment_age').agg({
-                    'nombre_propositions': 'sum',
-                    'taux_moyen_hors_assurance': 'mean'
-                }).reset_index()
-                
+            if tabs_profil[0].open:
                 col1, col2 = st.columns(2)
                 
                 with col1:
@@ -259,12 +224,8 @@ def main():
                     st.plotly_chart(fig_age_taux, use_container_width=True)
         
         with tabs_profil[1]:
-            if "segment_revenus" in df_taux_profil.columns:
-                revenus_data = df_taux_profil.groupby('segment_revenus').agg({
-                    'nombre_propositions': 'sum',
-                    'taux_moyen_hors_assurance': 'mean'
-                }).reset_index()
-                
+            revenus_data = load_taux_par_dimension(("segment_revenus",), **segments) if tabs_profil[1].open else None
+            if revenus_data is not None and not revenus_data.empty:
                 col1, col2 = st.columns(2)
                 
                 with col1:
@@ -295,12 +256,8 @@ def main():
                     st.plotly_chart(fig_revenus_taux, use_container_width=True)
         
         with tabs_profil[2]:
-            if "categorie_professionnelle" in df_taux_profil.columns:
-                prof_data = df_taux_profil.groupby('categorie_professionnelle').agg({
-                    'nombre_propositions': 'sum',
-                    'taux_moyen_hors_assurance': 'mean'
-                }).reset_index().sort_values(by='nombre_propositions', ascending=False)
-                
+            prof_data = load_taux_par_dimension(("categorie_professionnelle",), **segments) if tabs_profil[2].open else None
+            if prof_data is not None and not prof_data.empty:
                 # Graphique des taux moyens par catégorie professionnelle
                 fig_prof_taux = px.bar(
                     prof_data.head(10),
@@ -317,13 +274,9 @@ def main():
                 st.plotly_chart(fig_prof_taux, use_container_width=True)
         
         with tabs_profil[3]:
-            if "usage_bien" in df_taux_profil.columns and "type_projet" in df_taux_profil.columns:
-                # Combinaison type de projet / usage du bien
-                projet_data = df_taux_profil.groupby(['type_projet', 'usage_bien']).agg({
-                    'nombre_propositions': 'sum',
-                    'taux_moyen_hors_assurance': 'mean'
-                }).reset_index()
-                
+            # Combinaison type de projet / usage du bien
+            projet_data = load_taux_par_dimension(("type_projet", "usage_bien"), **segments) if tabs_profil[3].open else None
+            if projet_data is not None and not projet_data.empty:
                 # Graphique des taux moyens par type de projet et usage du bien
                 fig_projet_taux = px.bar(
                     projet_data,
@@ -337,6 +290,24 @@ def main():
                 )
                 fig_projet_taux.update_traces(texttemplate='%{text}%', textposition='outside')
                 st.plotly_chart(fig_projet_taux, use_container_width=True)
+
+
+# Interface utilisateur Streamlit
+def main():
+    
+    #st.sidebar.image("../images/luffy.jpg")
+
+    # Sidebar pour les filtres
+    st.sidebar.title("Filtres")
+    
+    # En-tête de la page, affiché avant tout chargement de données
+    st.title("📈 Dashboard Courtage Immobilier : France")
+    st.markdown(f"*Données à jour au {datetime.now().strftime('%d/%m/%Y')}*")
+
+    # Les sections chargent leurs données elles-mêmes, section_banques en parallèle du reste
+    section_banques()
+    section_conversion()
+    section_segments()
     
     # Footer avec informations
     st.markdown("---")
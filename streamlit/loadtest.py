@@ -0,0 +1,236 @@
+"""
+Test de charge des requêtes du dashboard, sans navigateur ni serveur Streamlit.
+
+N sessions concurrentes rejouent en boucle les chargements d'un affichage de app.py
+(indicateurs banques et conversions de la période, chacun en un appel concurrent, segment d'âge et
+l'onglet ouvert du profil client) avec une période, des filtres de segments et un onglet tirés au hasard, contre un fichier DuckDB local, avec puis sans
+le cache de requêtes. Pour chaque requête : latences p50/p95/p99, débit et taille du résultat ;
+pour chaque passe : affichages par seconde, mémoire du processus et attente du pool de curseurs.
+
+Usage, depuis le dossier streamlit/ :
+    python loadtest.py --database /tmp/immobilier.duckdb --sessions 50 --duration 30 --output loadtest.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Options des listes déroulantes de app.py
+SEGMENTS = {
+    "segment_age": ("Tous", "Jeune", "Milieu de vie", "Senior"),
+    "segment_revenus": ("Tous", "Revenus modestes", "Revenus moyens", "Revenus élevés"),
+    "usage_bien": ("Tous", "Résidence principale", "Investissement locatif"),
+}
+# Périodes d'analyse de app.py, en jours (None : toutes les données)
+PERIODES = (30, 90, 365, None)
+# Dimensions chargées par chaque onglet du profil client (un seul ouvert à la fois) ;
+# le premier réutilise les données du segment d'âge
+ONGLETS = (None, ("segment_revenus",), ("categorie_professionnelle",), ("type_projet", "usage_bien"))
+
+
+def load_memory_sampler():
+    """
+    MemorySampler de data-pipeline/src/config/memory.py, chargé par son chemin :
+    le config.py du dashboard masque le paquet config de l'ETL
+    """
+    path = Path(__file__).resolve().parent.parent / "data-pipeline" / "src" / "config" / "memory.py"
+    spec = importlib.util.spec_from_file_location("etl_memory", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.MemorySampler
+
+
+MemorySampler = load_memory_sampler()
+
+
+def page_view(queries, rng):
+    """
+    Chargements d'un affichage du dashboard, (nom, fonction sans argument) dans l'ordre de app.py
+    """
+    segments = {column: rng.choice(options) for column, options in SEGMENTS.items()}
+    periode = rng.choice(PERIODES)
+    onglet = rng.choice(ONGLETS)
+    loaders = [
+        # section_banques : les trois requêtes partent ensemble sur le pool de threads
+        ("load_concurrently[kpis_banques,metrics_banques,durees_pret]", lambda: queries.load_concurrently(
+            queries.load_kpis_banques, lambda: queries.load_metrics_banques(limit=10), queries.load_durees_pret,
+        )),
+        # section_conversion : KPIs, performance par source et conversion mensuelle de la période
+        ("load_concurrently[kpis_opportunites,performance_source,conversion_opportunites]", lambda: queries.load_concurrently(
+            lambda: queries.load_kpis_opportunites(periode),
+            lambda: queries.load_performance_source(periode),
+            lambda: queries.load_conversion_opportunites(periode),
+        )),
+        ("load_taux_par_dimension[segment_age]", lambda: queries.load_taux_par_dimension(("segment_age",), **segments)),
+    ]
+    if onglet:
+        loaders.append((
+            f"load_taux_par_dimension[{','.join(onglet)}]",
+            lambda: queries.load_taux_par_dimension(onglet, **segments),
+        ))
+    return loaders
+
+
+class Recorder:
+    """Latences, tailles de résultat et erreurs par requête, partagées par les sessions"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.result_bytes = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.page_views = 0
+
+    def record(self, name, seconds, result):
+        """result : DataFrame, ou liste de DataFrames pour un chargement concurrent"""
+        frames = result if isinstance(result, list) else [result]
+        with self.lock:
+            if result is None or any(df is None for df in frames):
+                # Hors serveur Streamlit, st.stop() ne lève rien : une requête en échec retourne None
+                self.errors[name] += 1
+            else:
+                self.latencies[name].append(seconds)
+                self.result_bytes[name].append(sum(int(df.memory_usage(deep=True).sum()) for df in frames))
+
+
+def session(queries, recorder, deadline, seed, think_time):
+    rng = random.Random(seed)
+    while time.monotonic() < deadline:
+        for name, loader in page_view(queries, rng):
+            start = time.perf_counter()
+            try:
+                df = loader()
+            except Exception:
+                df = None
+            recorder.record(name, time.perf_counter() - start, df)
+        with recorder.lock:
+            recorder.page_views += 1
+        if think_time:
+            time.sleep(rng.uniform(0, think_time))
+
+
+def run_pass(queries, sessions, duration, seed, think_time, cache):
+    """
+    Exécute sessions sessions pendant duration secondes et retourne le rapport de la passe
+    """
+    queries.CACHE_ENABLED = cache
+    queries.load_data.clear()
+    pool = queries.get_pool()
+    pool_before = pool.stats()
+
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=session, args=(queries, recorder, deadline, seed + index, think_time))
+        for index in range(sessions)
+    ]
+    start = time.perf_counter()
+    with MemorySampler(interval=0.1) as memory:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - start
+
+    pool_after = pool.stats()
+    report = {
+        "cache": cache,
+        "sessions": sessions,
+        "seconds": round(elapsed, 2),
+        "page_views": recorder.page_views,
+        "page_views_per_second": round(recorder.page_views / elapsed, 2),
+        "rss_mb_mean": round(memory.mean_mb, 1) if memory.mean_mb is not None else None,
+        "rss_mb_max": round(memory.peak_mb, 1) if memory.peak_mb is not None else None,
+        "pool": {
+            "size": pool_after["size"],
+            "acquired": pool_after["acquired"] - pool_before["acquired"],
+            "timeouts": pool_after["timeouts"] - pool_before["timeouts"],
+            "mean_wait_ms": round(
+                1000 * (pool_after["wait_seconds"] - pool_before["wait_seconds"])
+                / max(pool_after["acquired"] - pool_before["acquired"], 1), 2,
+            ),
+        },
+        "queries": {},
+    }
+    for name in sorted(set(recorder.latencies) | set(recorder.errors)):
+        latencies = np.array(recorder.latencies[name]) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (None, None, None)
+        report["queries"][name] = {
+            "calls": len(latencies),
+            "errors": recorder.errors[name],
+            "p50_ms": round(float(p50), 2) if p50 is not None else None,
+            "p95_ms": round(float(p95), 2) if p95 is not None else None,
+            "p99_ms": round(float(p99), 2) if p99 is not None else None,
+            "per_second": round(len(latencies) / elapsed, 2),
+            "result_kb": round(float(np.mean(recorder.result_bytes[name])) / 1024, 1) if len(latencies) else None,
+        }
+    return report
+
+
+def print_report(report):
+    pool = report["pool"]
+    print(
+        f"\ncache={'on' if report['cache'] else 'off'}  sessions={report['sessions']}  "
+        f"{report['page_views']} affichages en {report['seconds']}s ({report['page_views_per_second']}/s)  "
+        f"RSS moyen {report['rss_mb_mean']} Mo, max {report['rss_mb_max']} Mo  "
+        f"pool {pool['size']} curseurs, attente moyenne {pool['mean_wait_ms']} ms, "
+        f"{pool['timeouts']} timeouts"
+    )
+    print(f"{'requête':<62} {'appels':>7} {'erreurs':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'Ko':>8}")
+    for name, stats in report["queries"].items():
+        print(
+            f"{name:<62} {stats['calls']:>7} {stats['errors']:>7} {stats['p50_ms'] or 0:>8.2f} "
+            f"{stats['p95_ms'] or 0:>8.2f} {stats['p99_ms'] or 0:>8.2f} {stats['per_second']:>8.2f} "
+            f"{stats['result_kb'] or 0:>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge des requêtes du dashboard")
+    parser.add_argument("--database", required=True, help="Fichier DuckDB contenant les tables main_gold")
+    parser.add_argument("--sessions", type=int, default=50, help="Sessions concurrentes")
+    parser.add_argument("--duration", type=float, default=30, help="Durée de chaque passe, en secondes")
+    parser.add_argument("--think-time", type=float, default=0, help="Pause maximale entre deux affichages d'une session")
+    parser.add_argument("--cache", choices=["both", "on", "off"], default="both", help="Passes avec et/ou sans cache")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    # queries lit la base cible à l'import ; pas de réplique : les requêtes portent sur le fichier
+    os.environ["DATABASE_PATH"] = str(Path(args.database).resolve())
+    os.environ["REPLICA_ENABLED"] = "false"
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import queries
+    from streamlit.logger import set_log_level
+
+    # Hors serveur, Streamlit signale chaque appel sans contexte de script
+    set_log_level("error")
+
+    passes = {"both": [False, True], "on": [True], "off": [False]}[args.cache]
+    reports = []
+    for cache in passes:
+        report = run_pass(queries, args.sessions, args.duration, args.seed, args.think_time, cache)
+        print_report(report)
+        reports.append(report)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "database": args.database,
+            "cpu_count": os.cpu_count(),
+            "passes": reports,
+        }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Pool de curseurs DuckDB pour le dashboard.
+
+Une connexion DuckDB unique, partagée par toutes les sessions Streamlit, sérialise leurs
+requêtes. Le pool ouvre une connexion à la base et prête à chaque requête un curseur dédié
+(une connexion DuckDB indépendante sur la même base), parmi au plus size curseurs : les
+sessions s'exécutent en parallèle, au-delà de size elles attendent qu'un curseur se libère.
+Un curseur resté inactif est vérifié avant d'être prêté, et une erreur de connexion
+(réseau MotherDuck, base fermée) provoque une reconnexion puis un nouvel essai.
+"""
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+# Erreurs signalant une connexion inutilisable plutôt qu'une requête invalide
+CONNECTION_ERRORS = (duckdb.ConnectionException, duckdb.IOException)
+
+
+class PoolTimeout(Exception):
+    """Aucun curseur libéré dans le délai d'attente du pool"""
+
+
+class ConnectionPool:
+    """
+    Pool borné de curseurs sur une connexion DuckDB, avec vérification, reconnexion
+    et mesures d'attente
+    """
+
+    def __init__(self, connect, size=4, timeout=30, health_check_interval=30):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.lock = threading.Lock()
+        self.conn = connect()
+        # Incrémentée à chaque reconnexion : les curseurs d'une génération antérieure sont remplacés
+        self.generation = 0
+        # Un emplacement par curseur : None tant que le curseur n'est pas créé,
+        # sinon (curseur, génération, dernière utilisation)
+        self.slots = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self.slots.put(None)
+        self.metrics = {
+            "acquired": 0,
+            "in_use": 0,
+            "timeouts": 0,
+            "health_checks": 0,
+            "reconnects": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def _record(self, **increments):
+        with self.lock:
+            for name, value in increments.items():
+                self.metrics[name] += value
+
+    def stats(self):
+        """Instantané des mesures du pool, dont l'attente moyenne pour obtenir un curseur"""
+        with self.lock:
+            stats = dict(self.metrics, size=self.size)
+        stats["mean_wait_seconds"] = stats["wait_seconds"] / stats["acquired"] if stats["acquired"] else 0.0
+        return stats
+
+    def reconnect(self, generation):
+        """
+        Rouvre la connexion à la base, sauf si un autre thread l'a déjà fait depuis generation
+        """
+        with self.lock:
+            if generation != self.generation:
+                return
+            logger.warning("Connexion DuckDB perdue, reconnexion")
+            try:
+                self.conn.close()
+            except duckdb.Error:
+                pass
+            self.conn = self.connect()
+            self.generation += 1
+            self.metrics["reconnects"] += 1
+
+    def _new_cursor(self):
+        generation = self.generation
+        try:
+            return self.conn.cursor(), generation
+        except CONNECTION_ERRORS:
+            self.reconnect(generation)
+            return self.conn.cursor(), self.generation
+
+    def _checkout(self, slot):
+        """Curseur utilisable pour un emplacement : créé, remplacé ou vérifié si nécessaire"""
+        if slot is None:
+            return self._new_cursor()
+
+        cursor, generation, last_used = slot
+        if generation != self.generation:
+            cursor.close()
+            return self._new_cursor()
+
+        if time.monotonic() - last_used > self.health_check_interval:
+            self._record(health_checks=1)
+            try:
+                cursor.execute("SELECT 1").fetchone()
+            except CONNECTION_ERRORS:
+                cursor.close()
+                self.reconnect(generation)
+                return self._new_cursor()
+        return cursor, generation
+
+    @contextmanager
+    def cursor(self):
+        """
+        Prête un curseur dédié pour la durée du bloc.
+        Lève PoolTimeout si aucun curseur ne se libère dans le délai d'attente.
+        """
+        start = time.perf_counter()
+        try:
+            slot = self.slots.get(timeout=self.timeout)
+        except queue.Empty:
+            self._record(timeouts=1)
+            raise PoolTimeout(f"Aucune connexion libre après {self.timeout}s ({self.size} connexions)")
+
+        wait = time.perf_counter() - start
+        with self.lock:
+            self.metrics["acquired"] += 1
+            self.metrics["in_use"] += 1
+            self.metrics["wait_seconds"] += wait
+            self.metrics["max_wait_seconds"] = max(self.metrics["max_wait_seconds"], wait)
+
+        cursor = generation = None
+        try:
+            cursor, generation = self._checkout(slot)
+            yield cursor
+        except CONNECTION_ERRORS:
+            if cursor is not None:
+                cursor.close()
+                cursor = None
+                self.reconnect(generation)
+            raise
+        finally:
+            self._record(in_use=-1)
+            # Une erreur de requête ordinaire laisse le curseur utilisable : il est rendu au pool
+            self.slots.put((cursor, generation, time.monotonic()) if cursor is not None else None)
+
+    def run(self, work):
+        """
+        Exécute work(curseur) sur un curseur du pool. Après une erreur de connexion,
+        réessaie une fois sur la connexion rouverte.
+        """
+        try:
+            with self.cursor() as cursor:
+                return work(cursor)
+        except CONNECTION_ERRORS:
+            with self.cursor() as cursor:
+                return work(cursor)
@@ -0,0 +1,349 @@
+"""
+Couche d'accès aux données du dashboard.
+
+Les filtres (période, segments), la projection des colonnes et les agrégations
+de chaque graphique sont évalués dans DuckDB : seules les lignes agrégées
+nécessaires à l'affichage sont transférées.
+"""
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import duckdb
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from pool import ConnectionPool
+from replica import GoldReplica
+
+DATABASE_NAME = os.getenv('DATABASE_NAME', 'immobilier_courtage')
+# md: pour MotherDuck, ou chemin d'un fichier DuckDB local
+DATABASE_PATH = os.getenv('DATABASE_PATH', f"md:{DATABASE_NAME}")
+GOLD_SCHEMA = "main_gold"
+
+# Réplique locale des tables gold : les lectures du dashboard ne sollicitent plus la base distante
+REPLICA_ENABLED = os.getenv('REPLICA_ENABLED', 'false').lower() == 'true'
+REPLICA_PATH = os.getenv('REPLICA_PATH', os.path.join(tempfile.gettempdir(), f"{DATABASE_NAME}_gold.duckdb"))
+REPLICA_CHECK_SECONDS = int(os.getenv('REPLICA_CHECK_SECONDS', '60'))
+
+# Pool de curseurs partagé par les sessions : taille, attente maximale d'un curseur libre,
+# inactivité au-delà de laquelle un curseur est vérifié avant d'être prêté
+POOL_SIZE = int(os.getenv('POOL_SIZE', '4'))
+POOL_TIMEOUT_SECONDS = float(os.getenv('POOL_TIMEOUT_SECONDS', '30'))
+POOL_HEALTH_CHECK_SECONDS = float(os.getenv('POOL_HEALTH_CHECK_SECONDS', '30'))
+
+# Cache des résultats de requête (st.cache_data) ; false : chaque affichage interroge la base
+CACHE_ENABLED = os.getenv('QUERY_CACHE_ENABLED', 'true').lower() == 'true'
+
+# Threads chargeant en parallèle les requêtes indépendantes d'une section
+QUERY_WORKERS = int(os.getenv('QUERY_WORKERS', str(POOL_SIZE)))
+
+# Valeur des listes déroulantes signifiant « pas de filtre », et valeur des dimensions agrégées du cube
+ALL = "Tous"
+
+# Dimensions de main_gold.segment_cube
+CUBE_DIMENSIONS = ("segment_age", "segment_revenus", "usage_bien", "type_projet", "categorie_professionnelle")
+
+# Colonnes catégorielles des tables gold, chargées en dtype pandas category (codes entiers
+# plutôt qu'un objet Python par ligne). Les colonnes ENUM le sont déjà à la lecture.
+CATEGORICAL_COLUMNS = CUBE_DIMENSIONS + (
+    "origine", "segment_emploi", "segment_endettement", "contrat_travail", "partenaire_id",
+)
+
+
+class Query:
+    """
+    Construit une requête SELECT paramétrée sur une table du schéma gold.
+    Les noms de colonnes sont des constantes du code ; toutes les valeurs
+    de filtre passent par des paramètres liés.
+    """
+
+    def __init__(self, table):
+        self.table = f"{GOLD_SCHEMA}.{table}"
+        self.columns = ["*"]
+        self.predicates = []
+        self.params = []
+        self.groups = []
+        self.orders = []
+        self.limit_rows = None
+
+    def select(self, *columns):
+        self.columns = list(columns)
+        return self
+
+    def where(self, column, value, operator="="):
+        """Ajoute un prédicat, ignoré si value vaut None ou « Tous »"""
+        if value is not None and value != ALL:
+            self.predicates.append(f"{column} {operator} ?")
+            self.params.append(value)
+        return self
+
+    def cube_slice(self, dimensions, filters):
+        """
+        Restreint segment_cube aux cellules détaillées selon dimensions : les autres dimensions
+        sont fixées à la valeur filtrée ou, sans filtre, au total « Tous »
+        """
+        for column in CUBE_DIMENSIONS:
+            value = filters.get(column) or ALL
+            if column in dimensions:
+                self.predicates.append(f"{column} <> ?")
+                self.params.append(ALL)
+                self.where(column, value)
+            else:
+                self.predicates.append(f"{column} = ?")
+                self.params.append(value)
+        return self
+
+    def since(self, column, days):
+        """Restreint aux days derniers jours, ignoré si days vaut None"""
+        if days:
+            return self.where(column, date.today() - timedelta(days=days), ">=")
+        return self
+
+    def group_by(self, *columns):
+        self.groups = list(columns)
+        return self
+
+    def order_by(self, *columns):
+        self.orders = list(columns)
+        return self
+
+    def limit(self, rows):
+        self.limit_rows = rows
+        return self
+
+    def build(self):
+        sql = f"SELECT {', '.join(self.columns)} FROM {self.table}"
+        if self.predicates:
+            sql += " WHERE " + " AND ".join(self.predicates)
+        if self.groups:
+            sql += " GROUP BY " + ", ".join(self.groups)
+        if self.orders:
+            sql += " ORDER BY " + ", ".join(self.orders)
+        if self.limit_rows is not None:
+            sql += f" LIMIT {int(self.limit_rows)}"
+        return sql, tuple(self.params)
+
+
+def set_motherduck_token():
+    """
+    Reads the MotherDuck token from environment variable or Streamlit secrets and exposes it to DuckDB
+    """
+    # First check for token in environment variables
+    token = os.environ.get("MOTHERDUCK_TOKEN")
+
+    # If not in environment variables, try to get from Streamlit secrets
+    if not token and hasattr(st, "secrets") and "MOTHERDUCK_TOKEN" in st.secrets:
+        token = st.secrets["default"]["MOTHERDUCK_TOKEN"]
+
+    if not token:
+        st.error("MotherDuck token not found. Please set MOTHERDUCK_TOKEN environment variable or add it to Streamlit secrets.")
+        st.stop()
+
+    # Set the token in the environment for DuckDB to use
+    os.environ["MOTHERDUCK_TOKEN"] = token
+
+
+def connect_to_motherduck():
+    """
+    Establishes a connection to MotherDuck using a token from environment variable or Streamlit secrets
+    """
+    if DATABASE_PATH.startswith("md:"):
+        set_motherduck_token()
+
+    # Connect to MotherDuck (or to the local DuckDB file)
+    return duckdb.connect(DATABASE_PATH, read_only=True)
+
+
+@st.cache_resource
+def get_pool():
+    """
+    Pool de curseurs partagé par toutes les sessions : chaque requête s'exécute sur son propre curseur
+    """
+    try:
+        return ConnectionPool(
+            connect_to_motherduck, size=POOL_SIZE, timeout=POOL_TIMEOUT_SECONDS,
+            health_check_interval=POOL_HEALTH_CHECK_SECONDS,
+        )
+    except Exception as e:
+        st.error(f"Error connecting to MotherDuck: {e}")
+        st.stop()
+
+
+@st.cache_resource
+def get_replica():
+    """
+    Crée la réplique locale des tables gold et la synchronise une première fois
+    """
+    try:
+        if DATABASE_PATH.startswith("md:"):
+            set_motherduck_token()
+
+        replica = GoldReplica(DATABASE_PATH, REPLICA_PATH, check_interval=REPLICA_CHECK_SECONDS)
+        replica.refresh_if_stale(force=True)
+        return replica
+    except Exception as e:
+        st.error(f"Erreur lors de la création de la réplique locale: {e}")
+        st.stop()
+
+
+def data_version():
+    """
+    Version des tables gold répliquées, ou None sans réplique.
+    Vérifie au passage si la base distante a changé depuis la dernière synchronisation.
+    """
+    if not REPLICA_ENABLED:
+        return None
+
+    replica = get_replica()
+    try:
+        replica.refresh_if_stale()
+    except Exception as e:
+        # Base distante indisponible : la dernière copie locale reste servie
+        st.warning(f"Réplique non rafraîchie, données du {min(replica.version.values(), default='?')}: {e}")
+    return tuple(sorted(replica.version.items()))
+
+
+def fetch(conn, sql, params=()):
+    """Exécute une requête paramétrée et retourne un DataFrame, sans cache"""
+    df = conn.execute(sql, list(params)).fetchdf()
+    return df.astype({
+        column: "category" for column in df.columns
+        if column in CATEGORICAL_COLUMNS and df[column].dtype != "category"
+    })
+
+
+def query_database(sql, params=()):
+    """Charge les données depuis la base (réplique locale ou pool de curseurs), sans cache"""
+    try:
+        if REPLICA_ENABLED:
+            cursor = get_replica().cursor()
+            try:
+                return fetch(cursor, sql, params)
+            finally:
+                cursor.close()
+        return get_pool().run(lambda cursor: fetch(cursor, sql, params))
+    except Exception as e:
+        st.error(f"Erreur lors du chargement des données: {e}")
+        st.stop()
+
+
+@st.cache_data(ttl=3600)
+def load_data(sql, params=(), version=None):
+    """
+    Charge les données depuis la base pour une requête paramétrée.
+    version fait partie de la clé du cache : il est invalidé dès qu'une table gold répliquée change.
+    """
+    return query_database(sql, params)
+
+
+def run(query):
+    sql, params = query.build()
+    # Sans cache, data_version() rafraîchit tout de même la réplique
+    version = data_version()
+    if not CACHE_ENABLED:
+        return query_database(sql, params)
+    return load_data(sql, params, version)
+
+
+@st.cache_resource
+def get_query_executor():
+    return ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix="dashboard-query")
+
+
+def load_concurrently(*loaders):
+    """
+    Exécute des chargements indépendants (fonctions sans argument) sur le pool de threads
+    et retourne leurs résultats dans l'ordre. Chaque thread reçoit le contexte de la session,
+    nécessaire au cache et aux messages d'erreur de Streamlit.
+    """
+    ctx = get_script_run_ctx()
+
+    def call(loader):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return loader()
+
+    futures = [get_query_executor().submit(call, loader) for loader in loaders]
+    return [future.result() for future in futures]
+
+
+# Requêtes du dashboard, partagées par les chargements ci-dessous et par benchmarks/run.py
+def metrics_banques_query(limit=None):
+    return Query("metriques_banques").limit(limit)
+
+def kpis_banques_query():
+    """Moyennes de toutes les propositions, à partir des sommes et effectifs par banque (pas de moyenne de moyennes)"""
+    return Query("metriques_banques").select(
+        "COUNT(DISTINCT partenaire_id) AS nombre_banques",
+        "SUM(nombre_propositions) AS nombre_propositions",
+        "SUM(somme_montants) / NULLIF(SUM(nombre_montants), 0) AS montant_moyen",
+        "SUM(somme_taux_hors_assurance) / NULLIF(SUM(nombre_taux_hors_assurance), 0) AS taux_moyen_hors_assurance",
+    )
+
+def durees_pret_query():
+    return Query("metriques_banques").select(
+        "SUM(count_duree_15ans_ou_moins) AS count_duree_15ans_ou_moins",
+        "SUM(count_duree_15_20ans) AS count_duree_15_20ans",
+        "SUM(count_duree_20_25ans) AS count_duree_20_25ans",
+        "SUM(count_duree_plus_25ans) AS count_duree_plus_25ans",
+    )
+
+def kpis_opportunites_query(periode=None):
+    """Opportunités et conversions de la période, sur les mois d'acquisition de performance_source"""
+    return Query("performance_source").select(
+        "COALESCE(SUM(nombre_opportunites), 0) AS nombre_opportunites",
+        "COALESCE(SUM(nombre_converties), 0) AS nombre_converties",
+    ).since("mois_acquisition", periode)
+
+def performance_source_query(periode=None):
+    """Opportunités, conversions et gain réalisé par source d'acquisition sur la période"""
+    return Query("performance_source").select(
+        "origine",
+        "SUM(nombre_opportunites) AS nombre_opportunites",
+        "SUM(nombre_converties) AS nombre_converties",
+        "SUM(nombre_converties) / SUM(nombre_opportunites) * 100 AS taux_conversion",
+        "SUM(gain_realise) AS gain_realise",
+    ).since("mois_acquisition", periode).group_by("origine").order_by("nombre_opportunites DESC")
+
+def conversion_mensuelle_query(periode=None):
+    """Taux de conversion par mois de création sur la période"""
+    return Query("taux_conversion_opportunites").select(
+        "mois_creation",
+        "SUM(total_opportunites) AS total_opportunites",
+        "SUM(nombre_converties) / SUM(total_opportunites) * 100 AS taux_conversion",
+    ).since("mois_creation", periode).group_by("mois_creation").order_by("mois_creation")
+
+def taux_par_dimension_query(dimensions, segment_age=ALL, segment_revenus=ALL, usage_bien=ALL):
+    """
+    Propositions et taux moyen hors assurance par dimensions, pour les onglets du profil client.
+    Lecture directe des cellules pré-agrégées du cube, sans regroupement.
+    """
+    filters = dict(segment_age=segment_age, segment_revenus=segment_revenus, usage_bien=usage_bien)
+    return Query("segment_cube").select(
+        *dimensions, "nombre_propositions", "taux_moyen_hors_assurance", "taux_median",
+    ).cube_slice(dimensions, filters).order_by("nombre_propositions DESC")
+
+
+# Chargement des différentes métriques
+def load_metrics_banques(limit=None):
+    return run(metrics_banques_query(limit))
+
+def load_kpis_banques():
+    return run(kpis_banques_query())
+
+def load_durees_pret():
+    return run(durees_pret_query())
+
+def load_kpis_opportunites(periode=None):
+    return run(kpis_opportunites_query(periode))
+
+def load_performance_source(periode=None):
+    return run(performance_source_query(periode))
+
+def load_conversion_opportunites(periode=None):
+    return run(conversion_mensuelle_query(periode))
+
+def load_taux_par_dimension(dimensions, segment_age=ALL, segment_revenus=ALL, usage_bien=ALL):
+    return run(taux_par_dimension_query(dimensions, segment_age, segment_revenus, usage_bien))
@@ -0,0 +1,103 @@
+"""
+Réplique locale des tables gold pour le dashboard.
+
+Les tables de main_gold sont copiées dans un fichier DuckDB local. La version de chaque table
+distante, MAX(derniere_mise_a_jour) et nombre de lignes, est comparée au plus une fois par intervalle
+à la version répliquée : seules les tables qui ont changé sont recopiées. Toutes les lectures du dashboard sont ensuite
+servies localement. La base distante peut être MotherDuck (md:) ou un simple fichier DuckDB.
+"""
+import threading
+import time
+
+import duckdb
+
+GOLD_SCHEMA = "main_gold"
+GOLD_TABLES = [
+    "metriques_banques",
+    "performance_source",
+    "segment_cube",
+    "taux_conversion_opportunites",
+    "taux_par_profil",
+]
+
+
+class GoldReplica:
+    """
+    Copie locale des tables gold, rafraîchie quand derniere_mise_a_jour ou le nombre de lignes
+    change côté distant
+    """
+
+    def __init__(self, remote_path, replica_path, tables=GOLD_TABLES, check_interval=60):
+        self.remote_path = remote_path
+        self.tables = list(tables)
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.last_check = None
+        self.conn = duckdb.connect(replica_path)
+        self.conn.execute(f"CREATE SCHEMA IF NOT EXISTS {GOLD_SCHEMA}")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS _replica_state (
+                table_name VARCHAR PRIMARY KEY,
+                derniere_mise_a_jour VARCHAR,
+                refreshed_at TIMESTAMP
+            )
+        """)
+        self.version = self._local_versions()
+
+    def _local_versions(self):
+        return dict(self.conn.execute("SELECT table_name, derniere_mise_a_jour FROM _replica_state").fetchall())
+
+    def _remote_versions(self):
+        # Le nombre de lignes détecte les suppressions (lignes supprimées en amont), qui ne font pas
+        # avancer derniere_mise_a_jour
+        query = " UNION ALL ".join(
+            f"SELECT '{table}', COALESCE(MAX(derniere_mise_a_jour)::VARCHAR, '') || ':' || COUNT(*) "
+            f"FROM remote.{GOLD_SCHEMA}.{table}"
+            for table in self.tables
+        )
+        return dict(self.conn.execute(query).fetchall())
+
+    def cursor(self):
+        """Curseur de lecture sur la réplique, un par requête ou par thread"""
+        return self.conn.cursor()
+
+    def refresh_if_stale(self, force=False):
+        """
+        Recopie les tables dont la version distante diffère de la version locale.
+        La vérification n'a lieu qu'une fois par check_interval secondes, sauf si force.
+        Retourne la liste des tables rafraîchies.
+        """
+        if not force and self.last_check is not None and time.monotonic() - self.last_check < self.check_interval:
+            return []
+
+        with self.lock:
+            self.last_check = time.monotonic()
+            self.conn.execute(f"ATTACH '{self.remote_path}' AS remote (READ_ONLY)")
+            try:
+                local = self._local_versions()
+                refreshed = []
+                for table, version in self._remote_versions().items():
+                    if table in local and local[table] == version:
+                        continue
+                    self.conn.begin()
+                    try:
+                        self.conn.execute(
+                            f"CREATE OR REPLACE TABLE {GOLD_SCHEMA}.{table} AS SELECT * FROM remote.{GOLD_SCHEMA}.{table}"
+                        )
+                        self.conn.execute(
+                            "INSERT OR REPLACE INTO _replica_state VALUES (?, ?, CURRENT_TIMESTAMP)", [table, version]
+                        )
+                        self.conn.commit()
+                    except Exception:
+                        # Sans rollback, la connexion partagée resterait dans une transaction avortée
+                        # et le DETACH ci-dessous masquerait l'erreur d'origine
+                        self.conn.rollback()
+                        raise
+                    refreshed.append(table)
+            finally:
+                # Après un éventuel rollback : ne pas conserver de verrou sur la base distante
+                # entre deux vérifications
+                self.conn.execute("DETACH remote")
+
+            self.version = self._local_versions()
+            return refreshed
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+Concurrence du pool de curseurs : N sessions parallèles sur un fichier DuckDB temporaire
+se terminent sans se bloquer mutuellement, et rendent leurs curseurs au pool.
+Le pool prête un curseur par requête (pool.run) : chaque session du test exécute une requête.
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+import duckdb
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pool import ConnectionPool, PoolTimeout  # noqa: E402
+
+SESSIONS = 16
+POOL_SIZE = 4
+# Délai d'attente des threads et du pool, borne d'un interblocage
+DEADLINE_SECONDS = 30
+# Attente à la barrière : les POOL_SIZE sessions servies ensemble doivent tenir leur curseur en même temps
+BARRIER_SECONDS = 10
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "pool.duckdb")
+    with duckdb.connect(path) as conn:
+        conn.execute("CREATE TABLE metrics AS SELECT range AS id, range % 7 AS segment FROM range(100000)")
+    return path
+
+
+def run_sessions(pool, work, sessions=SESSIONS):
+    """Lance sessions threads qui exécutent pool.run(work), retourne (résultats, erreurs, durée)"""
+    results, errors = [], []
+
+    def session(index):
+        try:
+            results.append(pool.run(lambda cursor: work(cursor, index)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=session, args=(index,)) for index in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=DEADLINE_SECONDS)
+    return results, errors, time.perf_counter() - start, threads
+
+
+def test_parallel_sessions_complete(database):
+    pool = ConnectionPool(lambda: duckdb.connect(database, read_only=True), size=POOL_SIZE, timeout=DEADLINE_SECONDS)
+    # Chaque session attend, curseur en main, que POOL_SIZE sessions aient exécuté leur requête :
+    # si le pool sérialisait les curseurs, la barrière expirerait (BrokenBarrierError)
+    barrier = threading.Barrier(POOL_SIZE, timeout=BARRIER_SECONDS)
+
+    def work(cursor, index):
+        result = cursor.execute(
+            "SELECT COUNT(*), SUM(id) FROM metrics WHERE segment = ?", [index % 7]
+        ).fetchone()
+        barrier.wait()
+        return result
+
+    results, errors, elapsed, threads = run_sessions(pool, work)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert errors == []
+    assert len(results) == SESSIONS
+
+    stats = pool.stats()
+    assert stats["acquired"] == SESSIONS
+    assert stats["timeouts"] == 0
+    assert stats["in_use"] == 0
+    # Tous les emplacements sont rendus, au plus size curseurs ont été créés
+    assert pool.slots.qsize() == POOL_SIZE
+
+
+def test_held_cursor_does_not_block_other_sessions(database):
+    pool = ConnectionPool(lambda: duckdb.connect(database, read_only=True), size=POOL_SIZE, timeout=DEADLINE_SECONDS)
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with pool.cursor() as cursor:
+            cursor.execute("SELECT 1").fetchone()
+            held.set()
+            release.wait(DEADLINE_SECONDS)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    assert held.wait(DEADLINE_SECONDS)
+
+    # Une session occupe un curseur : les autres se partagent les size - 1 restants
+    results, errors, elapsed, threads = run_sessions(
+        pool, lambda cursor, index: cursor.execute("SELECT COUNT(*) FROM metrics").fetchone()[0]
+    )
+    assert errors == []
+    assert results == [100000] * SESSIONS
+    assert pool.stats()["in_use"] == 1
+
+    release.set()
+    holder.join(DEADLINE_SECONDS)
+    assert pool.stats()["in_use"] == 0
+    assert pool.slots.qsize() == POOL_SIZE
+
+
+def test_exhausted_pool_times_out(database):
+    pool = ConnectionPool(lambda: duckdb.connect(database, read_only=True), size=1, timeout=0.1)
+
+    with pool.cursor():
+        with pytest.raises(PoolTimeout):
+            with pool.cursor():
+                pass
+
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["in_use"] == 0
+    assert pool.slots.qsize() == 1
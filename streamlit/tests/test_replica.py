@@ -0,0 +1,106 @@
+"""
+Réplique locale des tables gold : seules les tables dont la version distante a changé sont
+recopiées, et une base distante injoignable laisse la dernière copie servie et détachée.
+"""
+import os
+import sys
+from pathlib import Path
+
+import duckdb
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from replica import GOLD_SCHEMA, GoldReplica  # noqa: E402
+
+TABLES = ["metriques_banques", "performance_source"]
+
+
+@pytest.fixture
+def remote(tmp_path):
+    path = str(tmp_path / "remote.duckdb")
+    with duckdb.connect(path) as conn:
+        conn.execute(f"CREATE SCHEMA {GOLD_SCHEMA}")
+        for table in TABLES:
+            conn.execute(f"""
+                CREATE TABLE {GOLD_SCHEMA}.{table} AS
+                SELECT range AS id, '2024-03-01 00:00:00' AS derniere_mise_a_jour FROM range(3)
+            """)
+    return path
+
+
+@pytest.fixture
+def replica(remote, tmp_path):
+    replica = GoldReplica(remote, str(tmp_path / "replica.duckdb"), tables=TABLES, check_interval=3600)
+    assert sorted(replica.refresh_if_stale()) == TABLES
+    return replica
+
+
+def remote_execute(path, sql):
+    with duckdb.connect(path) as conn:
+        conn.execute(sql)
+
+
+def count(replica, table):
+    cursor = replica.cursor()
+    try:
+        return cursor.execute(f"SELECT COUNT(*) FROM {GOLD_SCHEMA}.{table}").fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def attached(replica):
+    return {row[0] for row in replica.conn.execute("SELECT database_name FROM duckdb_databases()").fetchall()}
+
+
+def test_unchanged_tables_are_not_copied(replica):
+    assert replica.refresh_if_stale(force=True) == []
+    assert count(replica, "metriques_banques") == 3
+
+
+def test_check_interval_skips_remote_check(replica, remote):
+    remote_execute(remote, f"INSERT INTO {GOLD_SCHEMA}.metriques_banques VALUES (3, '2024-03-02 00:00:00')")
+
+    # Vérification récente : la base distante n'est pas relue avant check_interval
+    assert replica.refresh_if_stale() == []
+    assert replica.refresh_if_stale(force=True) == ["metriques_banques"]
+
+
+def test_changed_table_is_copied(replica, remote):
+    remote_execute(remote, f"INSERT INTO {GOLD_SCHEMA}.metriques_banques VALUES (3, '2024-03-02 00:00:00')")
+
+    assert replica.refresh_if_stale(force=True) == ["metriques_banques"]
+    assert count(replica, "metriques_banques") == 4
+    assert replica.version["metriques_banques"] == "2024-03-02 00:00:00:4"
+
+
+def test_deleted_rows_change_the_version(replica, remote):
+    # Une suppression ne fait pas avancer derniere_mise_a_jour : le nombre de lignes la détecte
+    remote_execute(remote, f"DELETE FROM {GOLD_SCHEMA}.performance_source WHERE id = 0")
+
+    assert replica.refresh_if_stale(force=True) == ["performance_source"]
+    assert count(replica, "performance_source") == 2
+
+
+def test_unreachable_remote_keeps_local_copy(replica, remote):
+    version = dict(replica.version)
+    os.rename(remote, remote + ".moved")
+
+    with pytest.raises(duckdb.Error):
+        replica.refresh_if_stale(force=True)
+
+    assert replica.version == version
+    assert count(replica, "metriques_banques") == 3
+
+    os.rename(remote + ".moved", remote)
+    assert replica.refresh_if_stale(force=True) == []
+
+
+def test_failed_check_detaches_remote(replica, remote):
+    remote_execute(remote, f"DROP TABLE {GOLD_SCHEMA}.performance_source")
+
+    with pytest.raises(duckdb.CatalogException):
+        replica.refresh_if_stale(force=True)
+
+    # Aucun verrou conservé sur la base distante, la réplique reste lisible
+    assert "remote" not in attached(replica)
+    assert count(replica, "performance_source") == 3